@@ -10,6 +10,7 @@ from config.settings import (
 from flask import Flask
 from flask_cors import CORS
 from sqlalchemy.sql import text
+from utils.commands import register_commands
 
 logger = logging.getLogger(__name__)
 
@@ -57,16 +58,20 @@ def create_app():
         from controllers.rating_controller import rating_controller
         from controllers.recipe_controller import recipe_controller
         from controllers.user_controller import user_controller
+        from controllers.user_nutrition_controller import user_nutrition_controller
 
         app.register_blueprint(admin_controller, url_prefix="/api/admin")
         app.register_blueprint(auth_controller, url_prefix="/api/auth")
         app.register_blueprint(user_controller, url_prefix="/api/users")
+        app.register_blueprint(user_nutrition_controller, url_prefix="/api/users")
         app.register_blueprint(recipe_controller, url_prefix="/api/recipes")
         app.register_blueprint(eats_controller, url_prefix="/api/eats")
         app.register_blueprint(rating_controller, url_prefix="/api/rating")
 
         # app.register_blueprint(auth_controller, url_prefix="/api/auth")
 
+    register_commands(app)
+
     return app
 
 
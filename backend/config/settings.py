@@ -21,3 +21,25 @@ SECRET_KEY = os.getenv("SECRET_KEY", "dev")
 # JWT Settings
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-jwt-secret")
 JWT_ACCESS_TOKEN_EXPIRES = 24 * 60 * 60  # 24 hours in seconds
+
+# Recommendation model (item-item neighbour lists built by `flask build-recommendations`)
+RECOMMENDER_MODEL_DIR = os.getenv(
+    "RECOMMENDER_MODEL_DIR", os.path.join(os.path.dirname(__file__), "..", "data", "recommender")
+)
+
+# Recipe x nutrient matrix (built by `flask build-nutrient-matrix` or on first use)
+NUTRIENT_MATRIX_DIR = os.getenv(
+    "NUTRIENT_MATRIX_DIR", os.path.join(os.path.dirname(__file__), "..", "data", "nutrients")
+)
+
+# Password verification pool used by /api/auth/login
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+# Meal plan solver pool used by /api/users/meal-plan
+MEAL_PLAN_WORKERS = int(os.getenv("MEAL_PLAN_WORKERS", "2"))
+MEAL_PLAN_MAX_PENDING = int(os.getenv("MEAL_PLAN_MAX_PENDING", "16"))
+MEAL_PLAN_TIME_BUDGET_SECONDS = float(os.getenv("MEAL_PLAN_TIME_BUDGET_SECONDS", "0.8"))
+
+# Memory budget of the per-user eaten recipe sets (utils/eaten.py), per worker
+EATEN_CACHE_MAX_BYTES = int(os.getenv("EATEN_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
@@ -1,17 +1,37 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 from config.database import db
 from flask import Blueprint, jsonify, request
 from models.admin import Admin
 from models.user import User
-from sqlalchemy.sql import text
-from utils.auth import admin_required
+from sqlalchemy.sql import bindparam, text
+from utils.activity_rollups import eats_between
+from utils.auth import admin_required, admin_set
+from utils.calorie_window import calorie_window
+from utils.leaderboard import LEADERBOARD_PERIODS
+from utils.leaderboard import MAX_RANKED as LEADERBOARD_MAX_RANKED
+from utils.leaderboard import rating_leaderboard
+from utils.passwords import password_check_pool
+from utils.popularity import MAX_RANKED, POPULARITY_WINDOWS, recipe_popularity
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Days before today covered by /stats/weekly unless ?days= is given
+WEEKLY_STATS_DAYS = 7
+TOP_RECIPES_DAYS = 30
+TOP_RECIPES_LIMIT = 5
+TOP_RATED_LIMIT = 10
+DIET_VIOLATION_DAYS = 7
+USER_VIOLATION_LIMIT = 50
+MAX_USER_VIOLATION_LIMIT = 500
+# Defaults for /stats/calorie-violations: average above 140% of the recommendation over 7 days
+CALORIE_THRESHOLD_PERCENT = 140
+CALORIE_WINDOW_DAYS = 7
+CALORIE_VIOLATION_LIMIT = 10
+
 admin_controller = Blueprint("admin_controller", __name__)
 
 
@@ -36,6 +56,7 @@ def create_admin():
             text("INSERT INTO admin (user_id) VALUES (:user_id)"), {"user_id": user_id}
         )
         db.session.commit()
+        admin_set.add(user.user_id)
         result = db.session.execute(
             text("SELECT * FROM admin WHERE user_id = :user_id"), {"user_id": user_id}
         ).first()
@@ -50,22 +71,33 @@ def get_weekly_stats(current_user):
     try:
         logger.info(f"Getting weekly stats for admin user: {current_user.user_id}")
 
-        # Get eats count for each day in the last week
-        query = """
-            SELECT 
-                DATE(created_at) as day,
-                COUNT(*) as eats
-            FROM eats
-            WHERE created_at >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
-            GROUP BY DATE(created_at)
-            ORDER BY day;
-        """
-        logger.info(f"Executing query: {query}")
-        result = db.session.execute(text(query))
-        weekly_stats = [{"day": row.day.strftime("%a"), "eats": row.eats} for row in result]
+        days = request.args.get("days", WEEKLY_STATS_DAYS, type=int)
+        if days is None or days < 1:
+            return jsonify({"status": "error", "message": "days must be a positive integer"}), 400
+
+        # Per-day eats come from the eats_daily_counts rollup, one row per day,
+        # and the window total from its running counts
+        today = date.today()
+        first = today - timedelta(days=days)
+        result = db.session.execute(
+            text(
+                """
+                SELECT day, count AS eats
+                FROM eats_daily_counts
+                WHERE day BETWEEN :first AND :last
+                ORDER BY day
+            """
+            ),
+            {"first": first, "last": today},
+        )
+        weekly_stats = [
+            {"day": row.day.strftime("%a"), "date": row.day.isoformat(), "eats": row.eats}
+            for row in result
+        ]
+        total = eats_between(first, today)
         logger.info(f"Weekly stats results: {weekly_stats}")
 
-        return jsonify({"status": "success", "data": weekly_stats})
+        return jsonify({"status": "success", "data": weekly_stats, "total": total})
     except Exception as e:
         logger.error(f"Error in get_weekly_stats: {str(e)}", exc_info=True)
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -77,20 +109,37 @@ def get_top_recipes(current_user):
     try:
         logger.info(f"Getting top recipes for admin user: {current_user.user_id}")
 
-        query = """
-            SELECT 
-                r.recipe_name,
-                COUNT(*) as eats
-            FROM eats e
-            JOIN recipe r ON e.recipe_id = r.recipe_id
-            WHERE e.created_at >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-            GROUP BY r.recipe_id, r.recipe_name
-            ORDER BY eats DESC
-            LIMIT 5;
-        """
-        logger.info(f"Executing query: {query}")
-        result = db.session.execute(text(query))
-        top_recipes = [{"name": row.recipe_name, "eats": row.eats} for row in result]
+        days = request.args.get("days", TOP_RECIPES_DAYS, type=int)
+        limit = min(request.args.get("limit", TOP_RECIPES_LIMIT, type=int), MAX_RANKED)
+        if days not in POPULARITY_WINDOWS:
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "message": f"days must be one of {', '.join(map(str, POPULARITY_WINDOWS))}",
+                    }
+                ),
+                400,
+            )
+        if limit <= 0:
+            return jsonify({"status": "error", "message": "limit must be positive"}), 400
+
+        # Counts come from the in-memory per-day counters, not from eats
+        top = recipe_popularity.top(limit, days)
+        names = {}
+        if top:
+            result = db.session.execute(
+                text(
+                    "SELECT recipe_id, recipe_name FROM recipe WHERE recipe_id IN :recipe_ids"
+                ).bindparams(bindparam("recipe_ids", expanding=True)),
+                {"recipe_ids": [recipe_id for recipe_id, _ in top]},
+            )
+            names = {row.recipe_id: row.recipe_name for row in result}
+        top_recipes = [
+            {"recipe_id": recipe_id, "name": names[recipe_id], "eats": eats}
+            for recipe_id, eats in top
+            if recipe_id in names
+        ]
         logger.info(f"Top recipes results: {top_recipes}")
 
         return jsonify({"status": "success", "data": top_recipes})
@@ -105,28 +154,23 @@ def get_diet_violations(current_user):
     try:
         logger.info(f"Getting diet violations for admin user: {current_user.user_id}")
 
+        # Violations are recorded when the eat is logged, so this is a
+        # backward read of idx_diet_violation_created_at
         query = """
-            SELECT 
+            SELECT
                 u.user_id,
                 u.name as user_name,
                 r.recipe_name,
                 d.name as diet_name,
-                e.created_at as violation_date
-            FROM eats e
-            JOIN user u ON e.user_id = u.user_id 
-            JOIN recipe r ON e.recipe_id = r.recipe_id
-            JOIN user_diet ud ON u.user_id = ud.user_id
-            JOIN diet d ON ud.diet_id = d.diet_id
-            WHERE NOT EXISTS (
-                SELECT 1 FROM fits f 
-                WHERE f.recipe_id = e.recipe_id 
-                AND f.diet_id = ud.diet_id
-            )
-            AND e.created_at >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
-            ORDER BY e.created_at DESC
+                dv.created_at as violation_date
+            FROM diet_violation dv
+            JOIN user u ON dv.user_id = u.user_id
+            JOIN recipe r ON dv.recipe_id = r.recipe_id
+            JOIN diet d ON dv.diet_id = d.diet_id
+            WHERE dv.created_at >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
+            ORDER BY dv.created_at DESC
             LIMIT 10;
         """
-        logger.info(f"Executing query: {query}")
         result = db.session.execute(text(query))
         violations = [
             {
@@ -145,72 +189,126 @@ def get_diet_violations(current_user):
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@admin_controller.route("/stats/diet-violations/by-diet", methods=["GET"])
+@admin_required
+def get_diet_violation_counts(current_user):
+    try:
+        days = request.args.get("days", DIET_VIOLATION_DAYS, type=int)
+        if days is None or days < 1:
+            return jsonify({"status": "error", "message": "days must be a positive integer"}), 400
+
+        result = db.session.execute(
+            text(
+                """
+                SELECT d.name as diet_name, counts.violations
+                FROM (
+                    SELECT diet_id, COUNT(*) as violations
+                    FROM diet_violation
+                    WHERE created_at >= DATE_SUB(CURDATE(), INTERVAL :days DAY)
+                    GROUP BY diet_id
+                ) counts
+                JOIN diet d ON d.diet_id = counts.diet_id
+                ORDER BY counts.violations DESC, d.name
+            """
+            ),
+            {"days": days},
+        )
+        counts = [{"diet": row.diet_name, "violations": row.violations} for row in result]
+
+        return jsonify({"status": "success", "data": counts})
+    except Exception as e:
+        logger.error(f"Error in get_diet_violation_counts: {str(e)}", exc_info=True)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@admin_controller.route("/stats/diet-violations/users/<int:user_id>", methods=["GET"])
+@admin_required
+def get_user_diet_violations(current_user, user_id):
+    try:
+        limit = min(
+            request.args.get("limit", USER_VIOLATION_LIMIT, type=int), MAX_USER_VIOLATION_LIMIT
+        )
+        if limit <= 0:
+            return jsonify({"status": "error", "message": "limit must be positive"}), 400
+
+        # A primary-key range read: diet_violation is keyed by (user_id, created_at, ...)
+        result = db.session.execute(
+            text(
+                """
+                SELECT r.recipe_id, r.recipe_name, d.name as diet_name, dv.created_at
+                FROM diet_violation dv
+                JOIN recipe r ON dv.recipe_id = r.recipe_id
+                JOIN diet d ON dv.diet_id = d.diet_id
+                WHERE dv.user_id = :user_id
+                ORDER BY dv.created_at DESC
+                LIMIT :limit
+            """
+            ),
+            {"user_id": user_id, "limit": limit},
+        )
+        violations = [
+            {
+                "recipeId": row.recipe_id,
+                "recipe": row.recipe_name,
+                "diet": row.diet_name,
+                "date": row.created_at.isoformat(),
+            }
+            for row in result
+        ]
+
+        return jsonify({"status": "success", "data": violations})
+    except Exception as e:
+        logger.error(f"Error in get_user_diet_violations: {str(e)}", exc_info=True)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 @admin_controller.route("/stats/calorie-violations", methods=["GET"])
 @admin_required
 def get_calorie_violations(current_user):
     try:
         logger.info(f"Getting calorie violations for admin user: {current_user.user_id}")
 
-        query = """
-            WITH UserDailyCalories AS (
-                SELECT 
-                    u.user_id,
-                    u.name as user_name,
-                    uag.age_group,
-                    u.sex,
-                    DATE(e.created_at) as eat_date,
-                    SUM(c.amount) as daily_calories,
-                    npa.recommended_daily_value as recommended_calories
-                FROM eats e
-                JOIN user u ON e.user_id = u.user_id
-                JOIN recipe r ON e.recipe_id = r.recipe_id
-                JOIN contains c ON r.recipe_id = c.recipe_id
-                JOIN nutrition n ON c.nutrition_name = n.name
-                JOIN user_age_group uag ON u.user_id = uag.user_id
-                JOIN nutrition_per_age npa ON (
-                    uag.age_group = npa.age_group 
-                    AND u.sex = npa.sex 
-                    AND n.name = npa.nutrition_name
-                )
-                WHERE 
-                    n.name = 'Calories'
-                    AND e.created_at >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
-                GROUP BY 
-                    u.user_id, u.name, uag.age_group, u.sex, 
-                    DATE(e.created_at), npa.recommended_daily_value
+        threshold = request.args.get("threshold", CALORIE_THRESHOLD_PERCENT, type=float)
+        days = request.args.get("days", CALORIE_WINDOW_DAYS, type=int)
+        limit = min(request.args.get("limit", CALORIE_VIOLATION_LIMIT, type=int), 100)
+        if threshold is None or limit <= 0:
+            return (
+                jsonify({"status": "error", "message": "threshold and limit must be numbers"}),
+                400,
             )
-            SELECT 
-                user_id,
-                user_name,
-                age_group,
-                sex,
-                ROUND(AVG(daily_calories), 2) as avg_daily_calories,
-                recommended_calories,
-                ROUND(
-                    (AVG(daily_calories) - recommended_calories) 
-                    / recommended_calories * 100, 
-                    1
-                ) as excess_percentage
-            FROM UserDailyCalories
-            GROUP BY 
-                user_id, user_name, age_group, sex, recommended_calories
-            HAVING AVG(daily_calories) > (recommended_calories * 1.4)
-            ORDER BY excess_percentage DESC
-            LIMIT 10;
-        """
-        logger.info(f"Executing query: {query}")
-        result = db.session.execute(text(query))
+
+        # The worst offenders are read from the front of the in-memory ranking
+        try:
+            offenders = calorie_window.over_threshold(threshold / 100, days, limit)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        users = {}
+        if offenders:
+            result = db.session.execute(
+                text(
+                    """
+                    SELECT u.user_id, u.name as user_name, uag.age_group, u.sex
+                    FROM user u
+                    JOIN user_age_group uag ON u.user_id = uag.user_id
+                    WHERE u.user_id IN :user_ids
+                """
+                ).bindparams(bindparam("user_ids", expanding=True)),
+                {"user_ids": [user_id for user_id, _, _, _ in offenders]},
+            )
+            users = {row.user_id: row for row in result}
         violations = [
             {
-                "userId": row.user_id,
-                "user": row.user_name,
-                "ageGroup": row.age_group,
-                "sex": row.sex,
-                "avgCalories": row.avg_daily_calories,
-                "recommended": row.recommended_calories,
-                "excessPercentage": row.excess_percentage,
+                "userId": user_id,
+                "user": users[user_id].user_name,
+                "ageGroup": users[user_id].age_group,
+                "sex": users[user_id].sex,
+                "avgCalories": round(average, 2),
+                "recommended": recommended,
+                "excessPercentage": round((ratio - 1) * 100, 1),
             }
-            for row in result
+            for user_id, average, recommended, ratio in offenders
+            if user_id in users
         ]
         logger.info(f"Calorie violations results: {violations}")
 
@@ -224,39 +322,43 @@ def get_calorie_violations(current_user):
 @admin_required
 def get_top_rated(current_user):
     try:
-        period = request.args.get("period", "all")  # 'week' or 'all'
+        period = request.args.get("period", "all")  # 'day', 'week', 'month' or 'all'
+        limit = min(request.args.get("limit", TOP_RATED_LIMIT, type=int), LEADERBOARD_MAX_RANKED)
+        if period not in LEADERBOARD_PERIODS:
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "message": f"period must be one of {', '.join(LEADERBOARD_PERIODS)}",
+                    }
+                ),
+                400,
+            )
+        if limit <= 0:
+            return jsonify({"status": "error", "message": "limit must be positive"}), 400
         logger.info(f"Getting top rated recipes for period: {period}")
 
-        time_filter = (
-            "AND rt.created_at >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)" if period == "week" else ""
-        )
-
-        query = f"""
-            SELECT 
-                r.recipe_id,
-                r.recipe_name,
-                ROUND(AVG(rt.rating), 2) as avg_rating,
-                COUNT(rt.rating) as rating_count
-            FROM recipe r
-            LEFT JOIN rating rt ON r.recipe_id = rt.recipe_id
-            WHERE rt.rating IS NOT NULL
-            {time_filter}
-            GROUP BY r.recipe_id, r.recipe_name
-            HAVING rating_count >= 3  -- Minimum ratings threshold
-            ORDER BY avg_rating DESC, rating_count DESC
-            LIMIT 10;
-        """
-
-        logger.info(f"Executing query: {query}")
-        result = db.session.execute(text(query))
+        # Ranked by Bayesian average from the in-memory leaderboard, not from rating
+        top = rating_leaderboard.top(period, limit)
+        names = {}
+        if top:
+            result = db.session.execute(
+                text(
+                    "SELECT recipe_id, recipe_name FROM recipe WHERE recipe_id IN :recipe_ids"
+                ).bindparams(bindparam("recipe_ids", expanding=True)),
+                {"recipe_ids": [recipe_id for recipe_id, *_ in top]},
+            )
+            names = {row.recipe_id: row.recipe_name for row in result}
         top_rated = [
             {
-                "recipeId": row.recipe_id,
-                "recipeName": row.recipe_name,
-                "avgRating": float(row.avg_rating),
-                "ratingCount": row.rating_count,
+                "recipeId": recipe_id,
+                "recipeName": names[recipe_id],
+                "avgRating": average,
+                "ratingCount": count,
+                "score": score,
             }
-            for row in result
+            for recipe_id, score, average, count in top
+            if recipe_id in names
         ]
         logger.info(f"Top rated results: {top_rated}")
 
@@ -264,3 +366,10 @@ def get_top_rated(current_user):
     except Exception as e:
         logger.error(f"Error in get_top_rated: {str(e)}", exc_info=True)
         return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@admin_controller.route("/stats/login-pool", methods=["GET"])
+@admin_required
+def get_login_pool_stats(current_user):
+    # Password check pool of this worker: queue depth, peak and rejected logins
+    return jsonify({"status": "success", "data": password_check_pool.stats()})
@@ -2,7 +2,6 @@ import logging
 from datetime import datetime, timedelta, timezone
 from typing import Optional, TypedDict
 
-import bcrypt
 import jwt
 from config.database import db
 from config.settings import SECRET_KEY
@@ -10,6 +9,8 @@ from flask import Blueprint, jsonify, request
 from models.admin import Admin
 from models.user import User
 from sqlalchemy.sql import text
+from utils.auth import token_denylist, token_required
+from utils.passwords import PasswordPoolFull, password_check_pool
 
 logger = logging.getLogger(__name__)
 
@@ -47,54 +48,55 @@ def calculate_age_group(date_of_birth):
         return "51+"
 
 
+# User, age group, admin flag and token version in one round trip
+AUTH_USER_QUERY = """
+    SELECT u.user_id, u.name, u.email, u.password_hash, u.date_of_birth,
+        uag.age_group,
+        a.user_id IS NOT NULL AS is_admin,
+        COALESCE(tr.min_version, 0) AS token_version
+    FROM user u
+    LEFT JOIN user_age_group uag ON u.user_id = uag.user_id
+    LEFT JOIN admin a ON u.user_id = a.user_id
+    LEFT JOIN token_revocation tr ON u.user_id = tr.user_id
+    WHERE {condition}
+"""
+
+
 @auth_controller.route("/login", methods=["POST"])
 def login():
     data: LoginRequest = request.get_json()
-    logger.info(f"Login attempt with data: {data}")
+    logger.info(f"Login attempt for {data.get('email') or data.get('userId')}")
 
     try:
         # Check if we're using email or user_id for login
         if "email" in data:
             result = db.session.execute(
-                text(
-                    """
-                    SELECT u.*, uag.age_group 
-                    FROM user u 
-                    LEFT JOIN user_age_group uag ON u.user_id = uag.user_id 
-                    WHERE u.email = :email
-                """
-                ),
-                {"email": data["email"]},
+                text(AUTH_USER_QUERY.format(condition="u.email = :email")), {"email": data["email"]}
             ).first()
         elif "userId" in data:
             result = db.session.execute(
-                text(
-                    """
-                    SELECT u.*, uag.age_group 
-                    FROM user u 
-                    LEFT JOIN user_age_group uag ON u.user_id = uag.user_id 
-                    WHERE u.user_id = :user_id
-                """
-                ),
+                text(AUTH_USER_QUERY.format(condition="u.user_id = :user_id")),
                 {"user_id": data["userId"]},
             ).first()
         else:
             return jsonify({"error": "Email or User ID is required"}), 400
 
+        # Don't hold a pooled connection while bcrypt runs
+        db.session.close()
+
         if not result:
             return jsonify({"error": "User not found"}), 404
 
-        if not bcrypt.checkpw(
-            data["password"].encode("utf-8"), result.password_hash.encode("utf-8")
-        ):
+        try:
+            password_ok = password_check_pool.check(data["password"], result.password_hash)
+        except PasswordPoolFull:
+            response = jsonify({"error": "Too many login attempts, please retry shortly"})
+            response.headers["Retry-After"] = "1"
+            return response, 503
+        if not password_ok:
             return jsonify({"error": "Invalid password"}), 401
 
-        # Check if user is admin
-        admin_result = db.session.execute(
-            text("SELECT * FROM admin WHERE user_id = :user_id"),
-            {"user_id": result.user_id},
-        ).first()
-        is_admin = admin_result is not None
+        is_admin = bool(result.is_admin)
 
         # Update age group if needed
         if not result.age_group:
@@ -118,6 +120,7 @@ def login():
                 "user_id": result.user_id,
                 "email": result.email,
                 "is_admin": is_admin,
+                "ver": result.token_version,
                 "exp": expiration.timestamp(),  # Use timestamp instead of datetime
             },
             SECRET_KEY,
@@ -141,6 +144,18 @@ def login():
         return jsonify({"error": "An error occurred during login"}), 500
 
 
+@auth_controller.route("/logout", methods=["POST"])
+@token_required
+def logout(current_user):
+    # Revokes every token issued to the user so far, on all devices
+    try:
+        token_denylist.revoke(current_user.user_id)
+        return jsonify({"message": "Logged out"}), 200
+    except Exception as e:
+        logger.error(f"Logout error: {str(e)}", exc_info=True)
+        return jsonify({"error": "An error occurred during logout"}), 500
+
+
 @auth_controller.route("/verify", methods=["GET"])
 def verify_token():
     auth_header = request.headers.get("Authorization")
@@ -152,26 +167,15 @@ def verify_token():
         payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
 
         result = db.session.execute(
-            text(
-                """
-                SELECT u.*, uag.age_group 
-                FROM user u 
-                LEFT JOIN user_age_group uag ON u.user_id = uag.user_id 
-                WHERE u.user_id = :user_id
-            """
-            ),
+            text(AUTH_USER_QUERY.format(condition="u.user_id = :user_id")),
             {"user_id": payload["user_id"]},
         ).first()
 
         if not result:
             return jsonify({"error": "User not found"}), 404
-
-        # Check if user is admin
-        admin_result = db.session.execute(
-            text("SELECT * FROM admin WHERE user_id = :user_id"),
-            {"user_id": result.user_id},
-        ).first()
-        is_admin = admin_result is not None
+        if payload.get("ver", 0) < result.token_version:
+            return jsonify({"error": "Token has been revoked"}), 401
+        is_admin = bool(result.is_admin)
 
         return jsonify(
             {
@@ -3,6 +3,8 @@ from flask import Blueprint, jsonify, request
 from models.nutrition import Nutrition
 from models.recipe import Recipe
 from models.relationships.contains import Contains
+from utils.cache import recipe_detail_cache
+from utils.nutrients import nutrient_matrix
 
 contains_controller = Blueprint("contains_controller", __name__)
 
@@ -26,5 +28,7 @@ def add_nutrition_to_recipe():
         contains = Contains(recipe_id=recipe_id, nutrition_name=nutrition_name, amount=amount)
         db.session.add(contains)
         db.session.commit()
+        recipe_detail_cache.invalidate(recipe_id)
+        nutrient_matrix.set_amount(recipe_id, nutrition_name, amount)
         return jsonify(contains.to_dict()), 201
     return jsonify({"error": "Recipe or Nutrition not found"}), 404
@@ -1,6 +1,7 @@
 from config.database import db
 from flask import Blueprint, jsonify, request
 from models.diet import Diet
+from utils.diet_index import diet_bitmap_index
 
 diet_controller = Blueprint("diet_controller", __name__)
 
@@ -34,6 +35,7 @@ def create_diet():
     new_diet = Diet(name=name, keywords=keywords, description=description)
     db.session.add(new_diet)
     db.session.commit()
+    diet_bitmap_index.set_diet(new_diet.diet_id, new_diet.name)
     return jsonify(new_diet.to_dict()), 201
 
 
@@ -49,6 +51,7 @@ def update_diet(diet_id):
     diet.description = request.json.get("description", diet.description)
 
     db.session.commit()
+    diet_bitmap_index.set_diet(diet.diet_id, diet.name)
     return jsonify(diet.to_dict())
 
 
@@ -61,4 +64,5 @@ def delete_diet(diet_id):
 
     db.session.delete(diet)
     db.session.commit()
+    diet_bitmap_index.remove_diet(diet_id)
     return jsonify({"message": "Diet deleted successfully"})
@@ -6,6 +6,12 @@ from flask import Blueprint, jsonify, request
 from models.recipe import Recipe
 from models.user import User
 from sqlalchemy.sql import text
+from utils.activity_rollups import record_eat
+from utils.calorie_window import calorie_window
+from utils.diet_violations import record_diet_violations
+from utils.eaten import eaten_recipe_sets
+from utils.nutrition_totals import record_eaten
+from utils.popularity import recipe_popularity
 
 logger = logging.getLogger(__name__)
 
@@ -41,7 +47,13 @@ def log_user_eats():
         db.session.execute(
             text(query), {"user_id": user_id, "recipe_id": recipe_id, "created_at": created_at}
         )
+        record_eaten(user_id, recipe_id, created_at)
+        record_eat(recipe_id, created_at)
+        record_diet_violations(user_id, recipe_id, created_at)
         db.session.commit()
+        recipe_popularity.record(recipe_id, created_at.date())
+        calorie_window.record(user_id, recipe_id, created_at.date())
+        eaten_recipe_sets.add(user_id, recipe_id)
 
         # Return response with data
         response_data = {
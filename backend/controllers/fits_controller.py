@@ -3,6 +3,7 @@ from flask import Blueprint, jsonify, request
 from models.diet import Diet
 from models.recipe import Recipe
 from models.relationships.fits import Fits
+from utils.diet_index import diet_bitmap_index
 
 fits_controller = Blueprint("fits_controller", __name__)
 
@@ -20,5 +21,6 @@ def add_recipe_to_diet():
         fits = Fits(recipe_id=recipe_id, diet_id=diet_id)
         db.session.add(fits)
         db.session.commit()
+        diet_bitmap_index.add(recipe.recipe_id, diet.diet_id)
         return jsonify(fits.to_dict()), 201
     return jsonify({"error": "Recipe or Diet not found"}), 404
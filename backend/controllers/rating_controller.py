@@ -5,13 +5,19 @@ from config.database import db
 from flask import Blueprint, jsonify, request
 from models.recipe import Recipe
 from models.user import User
-from sqlalchemy.sql import text
+from sqlalchemy.sql import bindparam, text
 from utils.auth import token_required
+from utils.eaten import eaten_recipe_sets
+from utils.leaderboard import rating_leaderboard
+from utils.rating_stats import record_rating
 
 logger = logging.getLogger(__name__)
 
 rating_controller = Blueprint("rating_controller", __name__)
 
+# Maximum number of recipes per /batch request
+MAX_BATCH_IDS = 100
+
 
 @rating_controller.route("/rate", methods=["POST"])
 @token_required
@@ -28,26 +34,52 @@ def rate_recipe(current_user):
         if not recipe_id or not rating:
             return jsonify({"error": "Missing recipe_id or rating"}), 400
 
+        if not isinstance(recipe_id, int):
+            return jsonify({"error": "recipe_id must be an integer"}), 400
+
         if not isinstance(rating, int) or rating < 1 or rating > 5:
             return jsonify({"error": "Rating must be between 1 and 5"}), 400
 
-        # Check if user has eaten this recipe
-        has_eaten = db.session.execute(
-            text(
+        # Check if user has eaten this recipe; the cached set may not have seen
+        # an eat logged through another worker yet, so a "no" is confirmed
+        has_eaten = eaten_recipe_sets.contains(user_id, recipe_id)
+        if not has_eaten:
+            has_eaten = db.session.execute(
+                text(
+                    """
+                    SELECT 1 FROM eats
+                    WHERE user_id = :user_id AND recipe_id = :recipe_id
+                    LIMIT 1
                 """
-                SELECT 1 FROM eats 
-                WHERE user_id = :user_id AND recipe_id = :recipe_id
-                LIMIT 1
-            """
-            ),
-            {"user_id": user_id, "recipe_id": recipe_id},
-        ).scalar()
+                ),
+                {"user_id": user_id, "recipe_id": recipe_id},
+            ).scalar()
+            if has_eaten:
+                eaten_recipe_sets.invalidate(user_id)
 
         if not has_eaten:
             return jsonify({"error": "You can only rate recipes you have eaten"}), 403
 
-        # Insert or update rating
-        created_at = datetime.now(timezone.utc)
+        # rating holds one current row per user and recipe; the row being
+        # replaced (if any) is read first so the per-recipe totals can be
+        # adjusted by the difference, and every rating is appended to history
+        created_at = datetime.now(timezone.utc).replace(microsecond=0)
+        params = {
+            "user_id": user_id,
+            "recipe_id": recipe_id,
+            "rating": rating,
+            "created_at": created_at,
+        }
+        previous = db.session.execute(
+            text(
+                """
+                SELECT rating, created_at FROM rating
+                WHERE user_id = :user_id AND recipe_id = :recipe_id
+                FOR UPDATE
+            """
+            ),
+            params,
+        ).first()
         query = """
             INSERT INTO rating (user_id, recipe_id, rating, created_at)
             VALUES (:user_id, :recipe_id, :rating, :created_at)
@@ -55,16 +87,21 @@ def rate_recipe(current_user):
                 rating = :rating,
                 created_at = :created_at
         """
+        db.session.execute(text(query), params)
         db.session.execute(
-            text(query),
-            {
-                "user_id": user_id,
-                "recipe_id": recipe_id,
-                "rating": rating,
-                "created_at": created_at,
-            },
+            text(
+                """
+                INSERT INTO rating_history (user_id, recipe_id, rating, created_at)
+                VALUES (:user_id, :recipe_id, :rating, :created_at)
+            """
+            ),
+            params,
         )
+        record_rating(recipe_id, rating, created_at, previous)
         db.session.commit()
+        if previous:
+            rating_leaderboard.record(recipe_id, previous.created_at.date(), -previous.rating, -1)
+        rating_leaderboard.record(recipe_id, created_at.date(), rating, 1)
 
         return (
             jsonify(
@@ -130,10 +167,8 @@ def get_average_rating(recipe_id):
         result = db.session.execute(
             text(
                 """
-                SELECT 
-                    AVG(rating) as avg_rating,
-                    COUNT(*) as total_ratings
-                FROM rating 
+                SELECT avg_rating, rating_count as total_ratings
+                FROM recipe_rating_stats
                 WHERE recipe_id = :recipe_id
             """
             ),
@@ -144,8 +179,8 @@ def get_average_rating(recipe_id):
             {
                 "status": "success",
                 "data": {
-                    "average": float(result.avg_rating) if result.avg_rating else 0,
-                    "total": result.total_ratings,
+                    "average": float(result.avg_rating) if result and result.avg_rating else 0,
+                    "total": result.total_ratings if result else 0,
                 },
             }
         )
@@ -153,3 +188,57 @@ def get_average_rating(recipe_id):
     except Exception as e:
         logger.error(f"Error getting average rating: {str(e)}", exc_info=True)
         return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@rating_controller.route("/batch", methods=["POST"])
+@token_required
+def get_ratings_batch(current_user):
+    """Average, count and the caller's own rating for several recipes in one query"""
+    try:
+        data = request.get_json(silent=True) or {}
+        recipe_ids = data.get("recipe_ids")
+        if not isinstance(recipe_ids, list) or not all(
+            isinstance(recipe_id, int) for recipe_id in recipe_ids
+        ):
+            return jsonify({"status": "error", "message": "recipe_ids must be a list of ids"}), 400
+        recipe_ids = list(dict.fromkeys(recipe_ids))
+        if len(recipe_ids) > MAX_BATCH_IDS:
+            return (
+                jsonify(
+                    {"status": "error", "message": f"At most {MAX_BATCH_IDS} recipe_ids per call"}
+                ),
+                400,
+            )
+        if not recipe_ids:
+            return jsonify({"status": "success", "data": {}})
+
+        result = db.session.execute(
+            text(
+                """
+                SELECT
+                    r.recipe_id,
+                    rs.avg_rating,
+                    COALESCE(rs.rating_count, 0) as total_ratings,
+                    ur.rating as user_rating
+                FROM recipe r
+                LEFT JOIN recipe_rating_stats rs ON rs.recipe_id = r.recipe_id
+                LEFT JOIN rating ur ON ur.user_id = :user_id AND ur.recipe_id = r.recipe_id
+                WHERE r.recipe_id IN :recipe_ids
+            """
+            ).bindparams(bindparam("recipe_ids", expanding=True)),
+            {"user_id": current_user.user_id, "recipe_ids": recipe_ids},
+        )
+        ratings = {
+            str(row.recipe_id): {
+                "average": float(row.avg_rating) if row.avg_rating else 0,
+                "total": row.total_ratings,
+                "rating": row.user_rating,
+            }
+            for row in result
+        }
+
+        return jsonify({"status": "success", "data": ratings})
+
+    except Exception as e:
+        logger.error(f"Error getting ratings batch: {str(e)}", exc_info=True)
+        return jsonify({"status": "error", "message": str(e)}), 500
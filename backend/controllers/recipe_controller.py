@@ -1,15 +1,65 @@
+import hashlib
+import json
 import logging
+from bisect import bisect_right
+from decimal import Decimal
 
+import numpy as np
 from config.database import db
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from models.recipe import Recipe
 from models.relationships.eats import Eats
+from sqlalchemy import bindparam
 from sqlalchemy.sql import text
+from utils.cache import recipe_detail_cache
+from utils.diet_index import diet_bitmap_index, intersect_masks, mask_contains
+from utils.eaten import eaten_recipe_sets
+from utils.facets import recipe_facet_index
+from utils.leaderboard import LEADERBOARD_PERIODS
+from utils.leaderboard import MAX_RANKED as LEADERBOARD_MAX_RANKED
+from utils.leaderboard import rating_leaderboard
+from utils.nutrients import nutrient_matrix, parse_constraints
+from utils.pagination import decode_cursor, encode_cursor
+from utils.popularity import MAX_RANKED, recipe_popularity
+from utils.recipe_ingredients import insert_ingredient_words
+from utils.recommender import item_neighbor_model
+from utils.sampling import make_rng, recipe_id_pool
+from utils.search_index import recipe_search_index
+from utils.text import MAX_TOKEN_LENGTH, ingredient_tokens, ingredient_words, split_words, stem
 
 logger = logging.getLogger(__name__)
 
 recipe_controller = Blueprint("recipe_controller", __name__)
 
+# Number of search results returned per request, unless `limit` is given
+SEARCH_LIMIT = 4
+MAX_SEARCH_LIMIT = 50
+SEARCH_SORTS = ("relevance", "total_time", "rating", "random")
+# Number of ranked name matches checked against the remaining filters per query
+SEARCH_CANDIDATE_BATCH = 500
+# Shuffled id batches (500, 1000, 2000) checked against the SQL filters when sampling random
+# results, before falling back to one run of matches from a random starting id
+MAX_SAMPLE_PROBES = 3
+# Rows read by that fallback
+MAX_SAMPLE_RUN = 8000
+# Diet/nutrient matches up to this size are inlined as an id list, larger ones are post-filtered
+MASK_INLINE_IDS = 5000
+# Rows scanned by the first query when post-filtering a sorted page against an id mask;
+# each further query scans twice as many, up to MAX_KEYSET_SCANS queries per page
+KEYSET_SCAN_BATCH = 200
+MAX_KEYSET_SCANS = 5
+# Number of recommendations returned per request
+RECOMMENDATION_LIMIT = 5
+# Most recently eaten recipes used as the seed set for collaborative filtering
+RECOMMENDATION_HISTORY = 50
+# Default number of recipes returned by /trending
+TRENDING_LIMIT = 10
+# Defaults for /best: the ten best rated recipes of the last month
+BEST_PERIOD = "month"
+BEST_LIMIT = 10
+# Maximum number of recipes fetched by one batch request
+MAX_BATCH_IDS = 100
+
 
 # Create new recipe
 @recipe_controller.route("/", methods=["POST"])
@@ -30,68 +80,156 @@ def create_recipe():
             "ingredients": data["ingredients"],
         },
     )
+    recipe_id = result.first()[0]
+    _sync_ingredient_tokens(recipe_id, data["ingredients"])
+    # Unrated recipes still need a stats row to appear in the rating sort
+    db.session.execute(
+        text("INSERT INTO recipe_rating_stats (recipe_id) VALUES (:recipe_id)"),
+        {"recipe_id": recipe_id},
+    )
     db.session.commit()
-    recipe = Recipe.query.get(result.first()[0])
+    recipe = Recipe.query.get(recipe_id)
+    recipe_search_index.add(recipe.recipe_id, recipe.recipe_name)
+    recipe_id_pool.add(recipe.recipe_id)
+    recipe_facet_index.set_recipe(recipe.recipe_id, recipe.total_time)
     return jsonify(recipe.to_dict()), 201
 
 
-# Get recipe according id
-@recipe_controller.route("/<int:id>", methods=["GET"])
-def get_recipe(id):
+# Get several recipes at once, e.g. /api/recipes?ids=1,2,3&user_id=7
+@recipe_controller.route("/", methods=["GET"])
+def get_recipes_batch():
     try:
         user_id = request.args.get("user_id")
-        logger.info(f"Getting recipe {id} for user {user_id}")
+        try:
+            recipe_ids = [int(i) for i in request.args.get("ids", "").split(",") if i.strip()]
+        except ValueError:
+            return jsonify({"status": "error", "message": "ids must be integers"}), 400
+
+        if not recipe_ids:
+            return jsonify({"status": "error", "message": "ids is required"}), 400
+        if len(recipe_ids) > MAX_BATCH_IDS:
+            return (
+                jsonify({"status": "error", "message": f"At most {MAX_BATCH_IDS} ids per request"}),
+                400,
+            )
 
-        query = """
-            SELECT 
-                r.*,
-                CASE WHEN e.user_id IS NOT NULL THEN TRUE ELSE FALSE END as is_eaten,
-                JSON_ARRAYAGG(
-                    JSON_OBJECT(
-                        'name', n.name,
-                        'amount', c.amount,
-                        'unit', n.unit
-                    )
-                ) as nutrition_info
-            FROM recipe r
-            LEFT JOIN eats e ON r.recipe_id = e.recipe_id AND e.user_id = :user_id
-            LEFT JOIN contains c ON r.recipe_id = c.recipe_id
-            LEFT JOIN nutrition n ON c.nutrition_name = n.name
-            WHERE r.recipe_id = :id
-            GROUP BY r.recipe_id, e.user_id
-        """
+        return jsonify({"status": "success", "data": _load_recipes(recipe_ids, user_id)})
 
-        result = db.session.execute(text(query), {"id": id, "user_id": user_id}).first()
+    except Exception as e:
+        logger.error(f"Error getting recipes: {str(e)}", exc_info=True)
+        return jsonify({"status": "error", "message": str(e)}), 500
 
-        if not result:
-            logger.error(f"Recipe {id} not found")
-            return jsonify({"status": "error", "message": "Recipe not found"}), 404
 
-        # Parse nutrition_info from string to list if it exists and isn't null
-        nutrition_info = []
-        if result.nutrition_info:
-            try:
-                import json
-
-                nutrition_info = json.loads(result.nutrition_info)
-                # Filter out null entries
-                nutrition_info = [n for n in nutrition_info if n.get("name") is not None]
-            except Exception as e:
-                logger.error(f"Error parsing nutrition info: {e}")
-
-        recipe_data = {
-            "recipe_id": result.recipe_id,
-            "recipe_name": result.recipe_name,
-            "ingredients": result.ingredients,
-            "directions": result.directions,
-            "total_time": result.total_time,
-            "image": result.image,
-            "is_eaten": bool(result.is_eaten),
-            "nutrition_info": nutrition_info,
+def _load_recipes(recipe_ids, user_id=None):
+    """Load full recipe records (nutrition and eaten flag included).
+
+    Recipe bodies come from ``recipe_detail_cache``; misses cost two queries
+    and the eaten flags one more. Records are returned in the order of
+    ``recipe_ids``; unknown ids are skipped.
+    """
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    bodies = _load_recipe_bodies(recipe_ids)
+    eaten = _eaten_recipe_ids(user_id, list(bodies))
+    return [
+        {**bodies[recipe_id][0], "is_eaten": recipe_id in eaten}
+        for recipe_id in recipe_ids
+        if recipe_id in bodies
+    ]
+
+
+def _load_recipe_bodies(recipe_ids):
+    """Return ``{recipe_id: (body, digest)}`` for the user-independent part of recipes."""
+    bodies = {}
+    missing = []
+    for recipe_id in recipe_ids:
+        cached = recipe_detail_cache.get(recipe_id)
+        if cached is None:
+            missing.append(recipe_id)
+        else:
+            bodies[recipe_id] = cached
+    if not missing:
+        return bodies
+
+    recipes_query = text("SELECT * FROM recipe WHERE recipe_id IN :recipe_ids").bindparams(
+        bindparam("recipe_ids", expanding=True)
+    )
+    loaded = {
+        row.recipe_id: {
+            "recipe_id": row.recipe_id,
+            "recipe_name": row.recipe_name,
+            "ingredients": row.ingredients,
+            "directions": row.directions,
+            "total_time": row.total_time,
+            "image": row.image,
+            "nutrition_info": [],
         }
+        for row in db.session.execute(recipes_query, {"recipe_ids": missing})
+    }
+    if loaded:
+        nutrition_query = text(
+            """
+            SELECT c.recipe_id, n.name, c.amount, n.unit
+            FROM contains c
+            JOIN nutrition n ON c.nutrition_name = n.name
+            WHERE c.recipe_id IN :recipe_ids
+            ORDER BY c.recipe_id, n.name
+        """
+        ).bindparams(bindparam("recipe_ids", expanding=True))
+        for row in db.session.execute(nutrition_query, {"recipe_ids": list(loaded)}):
+            loaded[row.recipe_id]["nutrition_info"].append(
+                {"name": row.name, "amount": float(row.amount), "unit": row.unit}
+            )
+
+    for recipe_id, body in loaded.items():
+        digest = hashlib.sha1(
+            json.dumps(body, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        bodies[recipe_id] = (body, digest)
+        recipe_detail_cache.set(recipe_id, bodies[recipe_id])
+    return bodies
+
+
+def _eaten_recipe_ids(user_id, recipe_ids):
+    """Subset of ``recipe_ids`` the user has eaten, from the user's cached eaten set."""
+    if not user_id or not str(user_id).isdigit() or not recipe_ids:
+        return set()
+    return eaten_recipe_sets.subset(user_id, recipe_ids)
+
+
+def _recipe_detail_response(recipe_id):
+    """Recipe detail response with a strong ETag, or 304 if the client copy is current."""
+    user_id = request.args.get("user_id")
+    logger.info(f"Getting recipe {recipe_id} for user {user_id}")
+
+    cached = _load_recipe_bodies([recipe_id]).get(recipe_id)
+    if not cached:
+        logger.error(f"Recipe {recipe_id} not found")
+        return jsonify({"status": "error", "message": "Recipe not found"}), 404
+
+    body, digest = cached
+    is_eaten = recipe_id in _eaten_recipe_ids(user_id, [recipe_id])
+    etag = f"{digest}-{int(is_eaten)}"
+
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify({"status": "success", "data": {**body, "is_eaten": is_eaten}})
+    response.set_etag(etag)
+    # The payload depends on user_id, so only the browser may keep it and must revalidate
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _expand_requested():
+    return request.args.get("expand", "").lower() in ("1", "true", "yes")
 
-        logger.info(f"Recipe data: {recipe_data}")
-        return jsonify({"status": "success", "data": recipe_data})
+
+# Get recipe according id
+@recipe_controller.route("/<int:id>", methods=["GET"])
+def get_recipe(id):
+    try:
+        return _recipe_detail_response(id)
 
     except Exception as e:
         logger.error(f"Error getting recipe: {str(e)}", exc_info=True)
@@ -124,13 +262,38 @@ def update_recipe(id):
         },
     ).first()
     if result:
+        if data.get("ingredients") is not None:
+            _sync_ingredient_tokens(id, data["ingredients"])
         db.session.commit()
+        recipe_detail_cache.invalidate(id)
         recipe = Recipe.query.get(result[0])
+        recipe_search_index.add(recipe.recipe_id, recipe.recipe_name)
+        recipe_facet_index.set_recipe(recipe.recipe_id, recipe.total_time)
         return jsonify(recipe.to_dict()), 200
     logger.error(f"Recipe not found for update: {id}")
     return jsonify({"message": "Recipe not found"}), 404
 
 
+def _sync_ingredient_tokens(recipe_id, ingredients):
+    """Rewrite the recipe_ingredient rows of a recipe in the current transaction.
+
+    Its words are added to ingredient_word; the vocabulary is never pruned,
+    since a word no recipe uses any more just matches nothing.
+    """
+    db.session.execute(
+        text("DELETE FROM recipe_ingredient WHERE recipe_id = :recipe_id"), {"recipe_id": recipe_id}
+    )
+    tokens = ingredient_tokens(ingredients)
+    if tokens:
+        db.session.execute(
+            text("INSERT INTO recipe_ingredient (recipe_id, token) VALUES (:recipe_id, :token)"),
+            [{"recipe_id": recipe_id, "token": token} for token in tokens],
+        )
+    words = ingredient_words(ingredients)
+    if words:
+        insert_ingredient_words(words)
+
+
 # Delete recipe according id
 @recipe_controller.route("/<int:id>", methods=["DELETE"])
 def delete_recipe(id):
@@ -138,6 +301,12 @@ def delete_recipe(id):
     result = db.session.execute(text(query), {"id": id}).first()
     if result:
         db.session.commit()
+        recipe_detail_cache.invalidate(id)
+        recipe_search_index.remove(id)
+        recipe_id_pool.remove(id)
+        diet_bitmap_index.remove_recipe(id)
+        nutrient_matrix.remove_recipe(id)
+        recipe_facet_index.remove_recipe(id)
         return jsonify({"message": "Recipe deleted"}), 200
     logger.error(f"Recipe not found for deletion: {id}")
     return jsonify({"message": "Recipe not found"}), 404
@@ -146,26 +315,42 @@ def delete_recipe(id):
 @recipe_controller.route("/recommendations", methods=["GET"])
 def get_recommendations():
     try:
-        user_id = request.args.get("user_id")
+        user_id = request.args.get("user_id", type=int)
         if not user_id:
             logger.error("User ID is required")
             return jsonify({"status": "error", "message": "User ID is required"}), 400
 
-        query = """
-            SELECT r.recipe_id
-            FROM recipe r
-            WHERE NOT EXISTS (
-                SELECT 1 FROM eats e2
-                WHERE e2.recipe_id = r.recipe_id
-                AND e2.user_id = :user_id
+        # The user's most recently eaten recipes seed the model; everything the
+        # user has eaten is excluded, from the cached eaten set
+        result = db.session.execute(
+            text(
+                """
+                SELECT recipe_id
+                FROM eats
+                WHERE user_id = :user_id
+                GROUP BY recipe_id
+                ORDER BY MAX(created_at) DESC
+                LIMIT :history
+            """
+            ),
+            {"user_id": user_id, "history": RECOMMENDATION_HISTORY},
+        )
+        history = [row.recipe_id for row in result]
+        eaten_set = set(eaten_recipe_sets.get(user_id).tolist())
+
+        # Personalised picks from the item-item model, topped up with random
+        # uneaten recipes for new users or when the model is not built yet.
+        recipe_ids = item_neighbor_model.recommend(
+            history, exclude=eaten_set, limit=RECOMMENDATION_LIMIT
+        )
+        if len(recipe_ids) < RECOMMENDATION_LIMIT:
+            rng = make_rng(request.args.get("seed"))
+            recipe_ids += recipe_id_pool.random_ids(
+                RECOMMENDATION_LIMIT - len(recipe_ids), rng, exclude=eaten_set | set(recipe_ids)
             )
-            ORDER BY RAND()
-            LIMIT 5;
-        """
-
-        result = db.session.execute(text(query), {"user_id": user_id})
-        recipe_ids = [row.recipe_id for row in result]
 
+        if _expand_requested():
+            return jsonify({"status": "success", "data": _load_recipes(recipe_ids, user_id)}), 200
         return jsonify({"status": "success", "data": recipe_ids}), 200
 
     except Exception as e:
@@ -173,6 +358,83 @@ def get_recommendations():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@recipe_controller.route("/trending", methods=["GET"])
+def get_trending_recipes():
+    try:
+        limit = min(request.args.get("limit", TRENDING_LIMIT, type=int), MAX_RANKED)
+        if limit <= 0:
+            return jsonify({"status": "error", "message": "limit must be positive"}), 400
+
+        # Eats of the last week with exponential time decay, from in-memory counters
+        trending = recipe_popularity.trending(limit)
+        recipe_ids = [recipe_id for recipe_id, _ in trending]
+
+        if _expand_requested():
+            return jsonify({"status": "success", "data": _load_recipes(recipe_ids)}), 200
+        return (
+            jsonify(
+                {
+                    "status": "success",
+                    "data": [
+                        {"recipe_id": recipe_id, "score": score} for recipe_id, score in trending
+                    ],
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        logger.error(f"Error getting trending recipes: {str(e)}", exc_info=True)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@recipe_controller.route("/best", methods=["GET"])
+def get_best_recipes():
+    try:
+        period = request.args.get("period", BEST_PERIOD)
+        limit = min(request.args.get("limit", BEST_LIMIT, type=int), LEADERBOARD_MAX_RANKED)
+        if period not in LEADERBOARD_PERIODS:
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "message": f"period must be one of {', '.join(LEADERBOARD_PERIODS)}",
+                    }
+                ),
+                400,
+            )
+        if limit <= 0:
+            return jsonify({"status": "error", "message": "limit must be positive"}), 400
+
+        # Bayesian average ratings of the period, from the in-memory leaderboard
+        best = rating_leaderboard.top(period, limit)
+        recipe_ids = [recipe_id for recipe_id, *_ in best]
+
+        if _expand_requested():
+            return jsonify({"status": "success", "data": _load_recipes(recipe_ids)}), 200
+        return (
+            jsonify(
+                {
+                    "status": "success",
+                    "data": [
+                        {
+                            "recipe_id": recipe_id,
+                            "score": score,
+                            "average": average,
+                            "total": count,
+                        }
+                        for recipe_id, score, average, count in best
+                    ],
+                }
+            ),
+            200,
+        )
+
+    except Exception as e:
+        logger.error(f"Error getting best recipes: {str(e)}", exc_info=True)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
 @recipe_controller.route("/recent", methods=["GET"])
 def get_recent_recipes():
     try:
@@ -196,6 +458,8 @@ def get_recent_recipes():
         result = db.session.execute(text(query), {"user_id": user_id})
         recipe_ids = [row.recipe_id for row in result]
 
+        if _expand_requested():
+            return jsonify({"status": "success", "data": _load_recipes(recipe_ids, user_id)}), 200
         return jsonify({"status": "success", "data": recipe_ids}), 200
 
     except Exception as e:
@@ -209,131 +473,436 @@ def search_recipes():
         max_time = request.args.get("maxTime")
         query_str = request.args.get("query")
         diet = request.args.get("diet")
+        user_diets = request.args.get("userDiets", "").lower() == "true"
         ingredient = request.args.get("ingredient")
+        ingredient_mode = request.args.get("ingredientMode", "all")
         user_id = request.args.get("user_id")
+        sort = request.args.get("sort") or ("relevance" if query_str else "random")
+        cursor = request.args.get("cursor")
+        want_facets = request.args.get("facets", "").lower() == "true"
+        nutrients = request.args.get("nutrients")
+
+        if sort not in SEARCH_SORTS:
+            return jsonify({"status": "error", "message": f"Unknown sort: {sort}"}), 400
+        if sort == "relevance" and not query_str:
+            return (
+                jsonify({"status": "error", "message": "Sorting by relevance requires a query"}),
+                400,
+            )
+        if user_diets and not user_id:
+            return (
+                jsonify({"status": "error", "message": "userDiets requires a user_id"}),
+                400,
+            )
+        try:
+            limit = min(int(request.args.get("limit", SEARCH_LIMIT)), MAX_SEARCH_LIMIT)
+            after = decode_cursor(cursor, sort) if cursor else None
+            constraints = parse_constraints(nutrients) if nutrients else []
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        if limit < 1:
+            return jsonify({"status": "error", "message": "limit must be positive"}), 400
+
+        conditions = ["1=1"]
+        params = {"user_id": user_id}
+        max_time = int(max_time) if max_time and max_time.isdigit() else None
+        ingredient_condition = None
+
+        # Diet and nutrient filters are ANDed bool masks over recipe ids, not joins
+        id_mask = None
+        if diet or user_diets:
+            diet_ids = []
+            if diet:
+                diet_id = diet_bitmap_index.diet_id(diet)
+                if diet_id is None:
+                    return _empty_search_response(want_facets)
+                diet_ids.append(diet_id)
+            if user_diets:
+                result = db.session.execute(
+                    text("SELECT diet_id FROM user_diet WHERE user_id = :user_id"),
+                    {"user_id": user_id},
+                )
+                diet_ids.extend(row.diet_id for row in result)
+            # A user without diets is not filtered at all
+            if diet_ids:
+                id_mask = diet_bitmap_index.mask(diet_ids)
+
+        if constraints:
+            try:
+                nutrient_mask = nutrient_matrix.matching(constraints)
+            except ValueError as e:
+                return jsonify({"status": "error", "message": str(e)}), 400
+            id_mask = nutrient_mask if id_mask is None else intersect_masks(id_mask, nutrient_mask)
 
-        base_query = """
-            SELECT DISTINCT 
-                r.*,
-                CASE WHEN e.user_id IS NOT NULL THEN TRUE ELSE FALSE END as is_eaten
-            FROM recipe r
-            LEFT JOIN eats e ON r.recipe_id = e.recipe_id AND e.user_id = :user_id
-        """
+        if id_mask is not None and not id_mask.any():
+            return _empty_search_response(want_facets)
 
-        conditions = []
-        params = {"user_id": user_id}
+        if max_time is not None:
+            conditions.append("r.total_time <= :max_time")
+            params["max_time"] = max_time
 
-        if diet:
-            base_query += """
-                JOIN fits f ON r.recipe_id = f.recipe_id
-                JOIN diet d ON f.diet_id = d.diet_id
-            """
-            conditions.append("d.name = :diet")
-            params["diet"] = diet
+        if ingredient:
+            ingredient_condition = _ingredient_condition(ingredient, ingredient_mode, params)
+            if ingredient_condition is None:
+                return _empty_search_response(want_facets)
+            conditions.append(ingredient_condition)
+
+        # Name matching and ranking come from the inverted index; SQL only
+        # applies the remaining filters.
+        ranked = recipe_search_index.search(query_str) if query_str else None
+        if ranked is not None and id_mask is not None:
+            fits = mask_contains(id_mask, [recipe_id for recipe_id, _ in ranked])
+            ranked = [item for item, keep in zip(ranked, fits) if keep]
+
+        facets = None
+        if want_facets:
+            facets = _search_facets(ranked, id_mask, max_time, ingredient_condition, params)
+
+        # Name matches are already in memory; pages are picked from them and
+        # SQL only checks the remaining filters for the chosen candidates
+        next_key = None
+        if ranked is not None:
+            if sort == "relevance":
+                recipe_ids, next_key = _relevance_page(ranked, after, conditions, params, limit)
+            elif sort == "random":
+                rng = make_rng(request.args.get("seed"))
+                ranked_ids = np.array([recipe_id for recipe_id, _ in ranked], dtype=np.int64)
+                recipe_ids = _sample_matching_ids(ranked_ids, conditions, params, rng, limit)
+            else:
+                recipe_ids, next_key = _ranked_sorted_page(
+                    sort, ranked, after, conditions, params, limit
+                )
+        elif sort == "random":
+            rng = make_rng(request.args.get("seed"))
+            if id_mask is not None:
+                recipe_ids = _sample_masked_ids(id_mask, conditions, params, rng, limit)
+            else:
+                recipe_ids = _sample_filtered_ids(conditions, params, rng, limit)
+        else:
+            if id_mask is not None and id_mask.sum() <= MASK_INLINE_IDS:
+                conditions.append(_id_list_condition(np.flatnonzero(id_mask)))
+                id_mask = None
+            recipe_ids, next_key = _keyset_page(sort, after, conditions, params, limit, id_mask)
+
+        recipes_data = _fetch_search_rows(recipe_ids, user_id)
+        response = {
+            "status": "success",
+            "data": recipes_data,
+            "next_cursor": encode_cursor(sort, next_key) if next_key else None,
+        }
+        if want_facets:
+            response["facets"] = facets
+        return jsonify(response), 200
 
-        conditions.append("1=1")
+    except Exception as e:
+        logger.error(f"Search error: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
 
-        if max_time and max_time.isdigit():
-            conditions.append("r.total_time <= :max_time")
-            params["max_time"] = int(max_time)
 
-        if query_str:
-            search_words = query_str.lower().split()
-            for i, word in enumerate(search_words):
-                param_name = f"word_{i}"
-                conditions.append(f"LOWER(r.recipe_name) LIKE :{param_name}")
-                params[param_name] = f"%{word}%"
+def _empty_search_response(want_facets):
+    response = {"status": "success", "data": [], "next_cursor": None}
+    if want_facets:
+        response["facets"] = recipe_facet_index.counts(np.zeros(0, dtype=bool))
+    return jsonify(response), 200
 
-        if ingredient:
-            conditions.append("LOWER(r.ingredients) LIKE :ingredient")
-            params["ingredient"] = f"%{ingredient.lower()}%"
 
-        if conditions:
-            base_query += " WHERE " + " AND ".join(conditions)
+def _search_facets(ranked, id_mask, max_time, ingredient_condition, params):
+    """Facet counts over every recipe matching the search, not just the returned page."""
+    id_sets = []
+    if ranked is not None:
+        id_sets.append(recipe_id for recipe_id, _ in ranked)
+    if ingredient_condition is not None:
+        result = db.session.execute(
+            text(f"SELECT r.recipe_id FROM recipe r WHERE {ingredient_condition}"), params
+        )
+        id_sets.append(row.recipe_id for row in result)
+    masks = [id_mask] if id_mask is not None else []
+    return recipe_facet_index.counts(recipe_facet_index.candidates(id_sets, masks, max_time))
 
-        base_query += " ORDER BY RAND() LIMIT 4"
 
-        logger.info(f"Executing query: {base_query} with params: {params}")
+def _id_list_condition(recipe_ids):
+    """Inline a known set of integer recipe ids as an IN condition."""
+    return f"r.recipe_id IN ({', '.join(str(int(recipe_id)) for recipe_id in recipe_ids)})"
 
-        result = db.session.execute(text(base_query), params)
-        recipes_data = [
-            {
-                "recipe_id": row.recipe_id,
-                "recipe_name": row.recipe_name,
-                "ingredients": row.ingredients,
-                "directions": row.directions,
-                "total_time": row.total_time,
-                "image": row.image,
-                "is_eaten": bool(row.is_eaten),
-            }
-            for row in result
-        ]
 
-        return jsonify({"status": "success", "data": recipes_data}), 200
+def _ingredient_condition(ingredient, mode, params):
+    """Build the recipe_ingredient lookup for a comma-separated ingredient filter.
 
-    except Exception as e:
-        logger.error(f"Search error: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    Every word of an ingredient must appear in the recipe; the last word is
+    matched as a prefix of the unstemmed words in ingredient_word, so "chick"
+    finds "chicken" and "tomat" finds "tomatoes". With ``mode="all"`` every
+    listed ingredient is required, with ``mode="any"`` one is enough.
+    Returns None when the filter has no searchable words.
+    """
+    phrases = [split_words(phrase) for phrase in ingredient.split(",")]
+    phrases = [words for words in phrases if words]
+    if not phrases:
+        return None
+
+    clauses = []
+    for i, words in enumerate(phrases):
+        lookups = []
+        for j, word in enumerate(words):
+            name = f"ingredient_{i}_{j}"
+            params[name] = stem(word)[:MAX_TOKEN_LENGTH]
+            if j == len(words) - 1:
+                # Words are [a-z0-9] only, so they never contain LIKE wildcards
+                params[f"{name}_prefix"] = word[:MAX_TOKEN_LENGTH] + "%"
+                match = (
+                    f"(ri.token = :{name} OR ri.token IN "
+                    f"(SELECT iw.token FROM ingredient_word iw WHERE iw.word LIKE :{name}_prefix))"
+                )
+            else:
+                match = f"ri.token = :{name}"
+            lookups.append(
+                f"r.recipe_id IN (SELECT ri.recipe_id FROM recipe_ingredient ri WHERE {match})"
+            )
+        clauses.append("(" + " AND ".join(lookups) + ")")
+    return "(" + (" OR " if mode == "any" else " AND ").join(clauses) + ")"
 
 
-@recipe_controller.route("/<int:recipe_id>", methods=["GET"])
-def get_recipe_with_status(recipe_id):
-    try:
-        user_id = request.args.get("user_id")
-        logger.info(f"Getting recipe {recipe_id} for user {user_id}")
+def _sample_filtered_ids(conditions, params, rng, limit):
+    """Pick random recipe ids matching the SQL filters, uniformly from the id pool."""
+    if conditions == ["1=1"]:
+        return recipe_id_pool.random_ids(limit, rng)
+    return _sample_matching_ids(recipe_id_pool.ids(), conditions, params, rng, limit)
 
-        query = """
-            SELECT 
-                r.*,
-                CASE WHEN e.user_id IS NOT NULL THEN TRUE ELSE FALSE END as is_eaten,
-                JSON_ARRAYAGG(
-                    JSON_OBJECT(
-                        'name', n.name,
-                        'amount', c.amount,
-                        'unit', n.unit
-                    )
-                ) as nutrition_info
-            FROM recipe r
-            LEFT JOIN eats e ON r.recipe_id = e.recipe_id AND e.user_id = :user_id
-            LEFT JOIN contains c ON r.recipe_id = c.recipe_id
-            LEFT JOIN nutrition n ON c.nutrition_name = n.name
-            WHERE r.recipe_id = :recipe_id
-            GROUP BY r.recipe_id, e.user_id
-        """
 
-        result = db.session.execute(
-            text(query), {"recipe_id": recipe_id, "user_id": user_id}
-        ).first()
+def _sample_masked_ids(mask, conditions, params, rng, limit):
+    """Pick random recipe ids from an id mask that also satisfy the SQL filters."""
+    return _sample_matching_ids(np.flatnonzero(mask), conditions, params, rng, limit)
 
-        if not result:
-            logger.error(f"Recipe {recipe_id} not found")
-            return jsonify({"status": "error", "message": "Recipe not found"}), 404
 
-        # Parse nutrition_info from string to list if it exists and isn't null
-        nutrition_info = []
-        if result.nutrition_info:
-            try:
-                import json
-
-                nutrition_info = json.loads(result.nutrition_info)
-                # Filter out null entries
-                nutrition_info = [n for n in nutrition_info if n.get("name") is not None]
-            except Exception as e:
-                logger.error(f"Error parsing nutrition info: {e}")
-
-        recipe_data = {
-            "recipe_id": result.recipe_id,
-            "recipe_name": result.recipe_name,
-            "ingredients": result.ingredients,
-            "directions": result.directions,
-            "total_time": result.total_time,
-            "image": result.image,
-            "is_eaten": bool(result.is_eaten),
-            "nutrition_info": nutrition_info,
+def _sample_matching_ids(candidates, conditions, params, rng, limit):
+    """Random sample of up to ``limit`` ``candidates`` satisfying the SQL filters.
+
+    Candidates are shuffled and checked in up to ``MAX_SAMPLE_PROBES``
+    doubling batches, which gives a uniform sample unless the filters are
+    very selective. If that is still short, the rest comes from one indexed
+    run of matching recipes starting at a random unchecked candidate, so a
+    request costs a bounded number of queries however few recipes match.
+    """
+    order = np.random.default_rng(rng.getrandbits(64)).permutation(len(candidates))
+    if conditions == ["1=1"]:
+        return [int(candidates[i]) for i in order[:limit]]
+
+    query = text(
+        f"""
+        SELECT r.recipe_id
+        FROM recipe r
+        WHERE {" AND ".join(conditions)} AND r.recipe_id IN :candidate_ids
+    """
+    ).bindparams(bindparam("candidate_ids", expanding=True))
+
+    matched = []
+    start, batch_size = 0, SEARCH_CANDIDATE_BATCH
+    for _ in range(MAX_SAMPLE_PROBES):
+        if start >= len(order) or len(matched) >= limit:
+            return matched[:limit]
+        batch = [int(candidates[i]) for i in order[start : start + batch_size]]
+        found = {
+            row.recipe_id for row in db.session.execute(query, {**params, "candidate_ids": batch})
         }
+        matched.extend(recipe_id for recipe_id in batch if recipe_id in found)
+        start += batch_size
+        batch_size *= 2
+    if start >= len(order) or len(matched) >= limit:
+        return matched[:limit]
+
+    # Matches in id order from a random unchecked candidate, wrapping around once
+    start_id = int(candidates[order[start]])
+    read = 0
+    for seek in ("r.recipe_id >= :start_id", "r.recipe_id < :start_id"):
+        rows = db.session.execute(
+            text(
+                f"""
+                SELECT r.recipe_id
+                FROM recipe r
+                WHERE {" AND ".join(conditions)} AND {seek}
+                ORDER BY r.recipe_id
+                LIMIT {MAX_SAMPLE_RUN - read}
+            """
+            ),
+            {**params, "start_id": start_id},
+        )
+        run = np.array([row.recipe_id for row in rows], dtype=np.int64)
+        read += len(run)
+        run = run[np.isin(run, candidates) & ~np.isin(run, matched)]
+        matched.extend(run[: limit - len(matched)].tolist())
+        if len(matched) >= limit or read >= MAX_SAMPLE_RUN:
+            break
+    return matched
+
+
+def _relevance_page(ranked, after, conditions, params, limit):
+    """Next page of ``ranked`` matches after the ``[score, recipe_id]`` cursor key."""
+    start = 0
+    if after:
+        keys = [(-score, recipe_id) for recipe_id, score in ranked]
+        start = bisect_right(keys, (-float(after[0]), int(after[1])))
+
+    ranked_ids = [recipe_id for recipe_id, _ in ranked[start:]]
+    matched = _filter_ranked_ids(ranked_ids, conditions, params, limit + 1)
+    if len(matched) <= limit:
+        return matched, None
+    scores = dict(ranked[start:])
+    last_id = matched[limit - 1]
+    return matched[:limit], [scores[last_id], last_id]
+
+
+def _ranked_sorted_page(sort, ranked, after, conditions, params, limit):
+    """Next page of name matches ordered by total_time or rating, after the cursor key.
+
+    Sort keys come from the in-memory facet index and rating leaderboard, so
+    the matches are ordered without sending their ids to MySQL.
+    """
+    recipe_ids = np.array([recipe_id for recipe_id, _ in ranked], dtype=np.int64)
+    if sort == "total_time":
+        keys = recipe_facet_index.total_times(recipe_ids).astype(np.float64)
+    else:
+        # Best rated first: ascending on the negated average
+        keys = -rating_leaderboard.averages(recipe_ids)
+    order = np.lexsort((recipe_ids, keys))
+    recipe_ids, keys = recipe_ids[order], keys[order]
+    if after:
+        after_key = float(after[0]) if sort == "total_time" else -float(after[0])
+        later = (keys > after_key) | ((keys == after_key) & (recipe_ids > int(after[1])))
+        recipe_ids, keys = recipe_ids[later], keys[later]
+
+    matched = _filter_ranked_ids(recipe_ids.tolist(), conditions, params, limit + 1)
+    if len(matched) <= limit:
+        return matched, None
+    last_id = matched[limit - 1]
+    last_key = keys[np.flatnonzero(recipe_ids == last_id)[0]]
+    if sort == "total_time":
+        return matched[:limit], [int(last_key), last_id]
+    return matched[:limit], [f"{-last_key:.4f}", last_id]
+
+
+def _keyset_page(sort, after, conditions, params, limit, mask=None):
+    """Next page ordered by total_time or rating, seeking past the cursor key.
+
+    Rows are read in index order starting right after the last row of the
+    previous page, so deep pages cost the same as the first one: total_time
+    walks ``idx_recipe_total_time`` and rating walks
+    ``idx_recipe_rating_stats_avg`` (every recipe has a stats row, unrated
+    ones at 0). With an id ``mask`` too large to inline, rows are scanned in
+    growing batches and filtered against it. After ``MAX_KEYSET_SCANS``
+    batches the page is returned short, with a cursor at the last scanned
+    row so the next request carries on from there.
+    """
+    if sort == "total_time":
+        key_expr = "r.total_time"
+        order_by = "r.total_time, r.recipe_id"
+        seek = f"({key_expr} > :after_key OR ({key_expr} = :after_key AND r.recipe_id > :after_id))"
+        from_clause = "recipe r"
+    else:
+        key_expr = "rs.avg_rating"
+        order_by = "rs.avg_rating DESC, rs.recipe_id"
+        seek = (
+            f"({key_expr} < :after_key OR ({key_expr} = :after_key AND rs.recipe_id > :after_id))"
+        )
+        from_clause = "recipe_rating_stats rs JOIN recipe r ON r.recipe_id = rs.recipe_id"
+    batch_size = limit + 1 if mask is None else max(4 * (limit + 1), KEYSET_SCAN_BATCH)
+
+    picked = []
+    for scan in range(1, MAX_KEYSET_SCANS + 1):
+        page_conditions = list(conditions)
+        page_params = dict(params)
+        if after:
+            page_conditions.append(seek)
+            page_params["after_key"] = int(after[0]) if sort == "total_time" else Decimal(after[0])
+            page_params["after_id"] = int(after[1])
+
+        query = f"""
+            SELECT r.recipe_id, {key_expr} AS sort_key
+            FROM {from_clause}
+            WHERE {" AND ".join(page_conditions)}
+            ORDER BY {order_by}
+            LIMIT {batch_size}
+        """
+        rows = db.session.execute(text(query), page_params).fetchall()
+        if mask is None:
+            picked.extend(rows)
+        else:
+            fits = mask_contains(mask, [row.recipe_id for row in rows])
+            picked.extend(row for row, keep in zip(rows, fits) if keep)
+        if len(picked) > limit or len(rows) < batch_size:
+            break
+        after = [_cursor_sort_key(sort, rows[-1].sort_key), rows[-1].recipe_id]
+        if scan == MAX_KEYSET_SCANS:
+            return [row.recipe_id for row in picked], after
+        batch_size *= 2
+
+    if len(picked) <= limit:
+        return [row.recipe_id for row in picked], None
+    last = picked[limit - 1]
+    return [row.recipe_id for row in picked[:limit]], [
+        _cursor_sort_key(sort, last.sort_key),
+        last.recipe_id,
+    ]
+
+
+def _cursor_sort_key(sort, value):
+    # Average ratings are DECIMAL; keep them exact as strings in the cursor
+    return value if sort == "total_time" else str(value)
+
+
+def _filter_ranked_ids(ranked_ids, conditions, params, limit):
+    """Keep the best-ranked recipe ids that also satisfy the SQL filters."""
+    if conditions == ["1=1"]:
+        return ranked_ids[:limit]
+
+    query = text(
+        f"""
+        SELECT r.recipe_id
+        FROM recipe r
+        WHERE {" AND ".join(conditions)} AND r.recipe_id IN :candidate_ids
+    """
+    ).bindparams(bindparam("candidate_ids", expanding=True))
+
+    matched = []
+    for start in range(0, len(ranked_ids), SEARCH_CANDIDATE_BATCH):
+        batch = ranked_ids[start : start + SEARCH_CANDIDATE_BATCH]
+        found = {
+            row.recipe_id for row in db.session.execute(query, {**params, "candidate_ids": batch})
+        }
+        matched.extend(recipe_id for recipe_id in batch if recipe_id in found)
+        if len(matched) >= limit:
+            break
+    return matched[:limit]
+
+
+def _fetch_search_rows(recipe_ids, user_id):
+    """Load search result rows for the given ids, preserving their order."""
+    if not recipe_ids:
+        return []
+
+    query = text("SELECT r.* FROM recipe r WHERE r.recipe_id IN :recipe_ids").bindparams(
+        bindparam("recipe_ids", expanding=True)
+    )
+    result = db.session.execute(query, {"recipe_ids": recipe_ids})
+    eaten = _eaten_recipe_ids(user_id, recipe_ids)
+    rows = {row.recipe_id: _search_row_to_dict(row, row.recipe_id in eaten) for row in result}
+    return [rows[recipe_id] for recipe_id in recipe_ids if recipe_id in rows]
 
-        logger.info(f"Recipe data: {recipe_data}")
-        return jsonify({"status": "success", "data": recipe_data})
+
+def _search_row_to_dict(row, is_eaten):
+    return {
+        "recipe_id": row.recipe_id,
+        "recipe_name": row.recipe_name,
+        "ingredients": row.ingredients,
+        "directions": row.directions,
+        "total_time": row.total_time,
+        "image": row.image,
+        "is_eaten": is_eaten,
+    }
+
+
+@recipe_controller.route("/<int:recipe_id>", methods=["GET"])
+def get_recipe_with_status(recipe_id):
+    try:
+        return _recipe_detail_response(recipe_id)
 
     except Exception as e:
         logger.error(f"Error getting recipe: {str(e)}", exc_info=True)
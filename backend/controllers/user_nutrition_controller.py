@@ -1,57 +1,59 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 from config.database import db
 from flask import Blueprint, jsonify, request
-from models.nutrition import Nutrition
-from models.user import User
-from sqlalchemy.sql import text
+from sqlalchemy.sql import bindparam, text
 from utils.auth import token_required
+from utils.diet_index import diet_bitmap_index
+from utils.meal_plan import MealPlannerBusy, MealPlanTimeout, meal_planner
+from utils.nutrients import nutrient_matrix
 
 logger = logging.getLogger(__name__)
 
 user_nutrition_controller = Blueprint("user_nutrition_controller", __name__)
 
+HISTORY_GRANULARITIES = ("day", "week", "month")
+# Longest range accepted by /nutrition/history
+MAX_HISTORY_DAYS = 3 * 366
+SUGGESTION_LIMIT = 10
+MAX_SUGGESTION_LIMIT = 50
+DEFAULT_MEALS_PER_DAY = 3
+MAX_MEALS_PER_DAY = 6
+
+# Today's totals are maintained by log_user_eats in user_daily_nutrition,
+# so this reads one primary-key range instead of re-summing eats
+DAILY_INTAKE_QUERY = """
+    SELECT
+        n.name as nutrition_name,
+        n.unit,
+        COALESCE(udn.amount, 0) as consumed_amount,
+        npa.recommended_daily_value,
+        ROUND(
+            (COALESCE(udn.amount, 0) / npa.recommended_daily_value) * 100,
+            1
+        ) as percentage_fulfilled
+    FROM user u
+    JOIN user_age_group uag ON uag.user_id = u.user_id
+    JOIN nutrition_per_age npa ON
+        npa.age_group = uag.age_group
+        AND npa.sex = u.sex
+    JOIN nutrition n ON n.name = npa.nutrition_name
+    LEFT JOIN user_daily_nutrition udn ON
+        udn.user_id = u.user_id
+        AND udn.day = CURDATE()
+        AND udn.nutrition_name = n.name
+    WHERE u.user_id = :user_id
+    ORDER BY n.name
+"""
+
 
 @user_nutrition_controller.route("/nutrition/daily", methods=["GET"])
 @token_required
 def get_daily_nutrition(current_user):
     """Get user's daily nutrition intake and recommendations"""
     try:
-        # Get user's age group and today's nutrition intake
-        query = """
-            WITH DailyNutrition AS (
-                SELECT 
-                    n.name as nutrition_name,
-                    n.unit,
-                    COALESCE(SUM(c.amount), 0) as consumed_amount
-                FROM nutrition n
-                LEFT JOIN contains c ON n.name = c.nutrition_name
-                LEFT JOIN eats e ON c.recipe_id = e.recipe_id
-                    AND e.user_id = :user_id
-                    AND DATE(e.created_at) = CURDATE()
-                GROUP BY n.name, n.unit
-            )
-            SELECT 
-                dn.nutrition_name,
-                dn.unit,
-                dn.consumed_amount,
-                npa.recommended_daily_value,
-                ROUND(
-                    (dn.consumed_amount / npa.recommended_daily_value) * 100, 
-                    1
-                ) as percentage_fulfilled
-            FROM DailyNutrition dn
-            JOIN user_age_group uag ON uag.user_id = :user_id
-            JOIN user u ON u.user_id = :user_id
-            JOIN nutrition_per_age npa ON 
-                npa.age_group = uag.age_group 
-                AND npa.sex = u.sex
-                AND npa.nutrition_name = dn.nutrition_name
-            ORDER BY dn.nutrition_name
-        """
-
-        result = db.session.execute(text(query), {"user_id": current_user.user_id})
+        result = db.session.execute(text(DAILY_INTAKE_QUERY), {"user_id": current_user.user_id})
 
         nutrition_data = [
             {
@@ -76,38 +78,27 @@ def get_weekly_nutrition(current_user):
     """Get user's weekly nutrition intake and recommendations"""
     try:
         query = """
-            WITH WeeklyNutrition AS (
-                SELECT 
-                    n.name as nutrition_name,
-                    n.unit,
-                    DATE(e.created_at) as consumption_date,
-                    COALESCE(SUM(c.amount), 0) as daily_amount
-                FROM nutrition n
-                LEFT JOIN contains c ON n.name = c.nutrition_name
-                LEFT JOIN eats e ON c.recipe_id = e.recipe_id
-                    AND e.user_id = :user_id
-                    AND e.created_at >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
-                GROUP BY n.name, n.unit, DATE(e.created_at)
-            )
-            SELECT 
-                wn.nutrition_name,
-                wn.unit,
-                wn.consumption_date,
-                wn.daily_amount as consumed_amount,
+            SELECT
+                udn.day as consumption_date,
+                n.name as nutrition_name,
+                n.unit,
+                udn.amount as consumed_amount,
                 npa.recommended_daily_value,
                 ROUND(
-                    (wn.daily_amount / npa.recommended_daily_value) * 100, 
+                    (udn.amount / npa.recommended_daily_value) * 100,
                     1
                 ) as percentage_fulfilled
-            FROM WeeklyNutrition wn
-            JOIN user_age_group uag ON uag.user_id = :user_id
-            JOIN user u ON u.user_id = :user_id
-            JOIN nutrition_per_age npa ON 
-                npa.age_group = uag.age_group 
+            FROM user_daily_nutrition udn
+            JOIN user u ON u.user_id = udn.user_id
+            JOIN user_age_group uag ON uag.user_id = u.user_id
+            JOIN nutrition n ON n.name = udn.nutrition_name
+            JOIN nutrition_per_age npa ON
+                npa.age_group = uag.age_group
                 AND npa.sex = u.sex
-                AND npa.nutrition_name = wn.nutrition_name
-            WHERE wn.consumption_date IS NOT NULL
-            ORDER BY wn.consumption_date DESC, wn.nutrition_name
+                AND npa.nutrition_name = udn.nutrition_name
+            WHERE udn.user_id = :user_id
+                AND udn.day >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
+            ORDER BY udn.day DESC, n.name
         """
 
         result = db.session.execute(text(query), {"user_id": current_user.user_id})
@@ -133,3 +124,331 @@ def get_weekly_nutrition(current_user):
     except Exception as e:
         logger.error(f"Error getting weekly nutrition: {str(e)}", exc_info=True)
         return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@user_nutrition_controller.route("/nutrition/history", methods=["GET"])
+@token_required
+def get_nutrition_history(current_user):
+    """Get user's nutrition intake over a date range, bucketed by day, week or month"""
+    try:
+        try:
+            end = _parse_date(request.args.get("to")) or date.today()
+            start = _parse_date(request.args.get("from")) or end - timedelta(days=6)
+        except ValueError:
+            return jsonify({"status": "error", "message": "Dates must be YYYY-MM-DD"}), 400
+        granularity = request.args.get("granularity", "day")
+
+        if granularity not in HISTORY_GRANULARITIES:
+            return (
+                jsonify({"status": "error", "message": f"Unknown granularity: {granularity}"}),
+                400,
+            )
+        if start > end:
+            return jsonify({"status": "error", "message": "from must not be after to"}), 400
+        if (end - start).days >= MAX_HISTORY_DAYS:
+            return (
+                jsonify(
+                    {"status": "error", "message": f"Range is limited to {MAX_HISTORY_DAYS} days"}
+                ),
+                400,
+            )
+
+        recommendations = _recommendations(current_user.user_id)
+        totals = _bucket_totals(current_user.user_id, start, end, granularity)
+
+        buckets = []
+        range_totals = {}
+        for bucket_start, bucket_end in _bucket_ranges(start, end, granularity):
+            amounts = totals.get(bucket_start, {})
+            for name, amount in amounts.items():
+                range_totals[name] = range_totals.get(name, 0.0) + amount
+            days = (bucket_end - bucket_start).days + 1
+            buckets.append(
+                {
+                    "start": bucket_start.isoformat(),
+                    "end": bucket_end.isoformat(),
+                    "days": days,
+                    "nutrients": _nutrient_summary(recommendations, amounts, days),
+                }
+            )
+
+        return jsonify(
+            {
+                "status": "success",
+                "data": {
+                    "from": start.isoformat(),
+                    "to": end.isoformat(),
+                    "granularity": granularity,
+                    "summary": _nutrient_summary(
+                        recommendations, range_totals, (end - start).days + 1
+                    ),
+                    "buckets": buckets,
+                },
+            }
+        )
+    except Exception as e:
+        logger.error(f"Error getting nutrition history: {str(e)}", exc_info=True)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+def _parse_date(value):
+    return date.fromisoformat(value) if value else None
+
+
+def _month_end(day):
+    next_month = (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+
+def _bucket_ranges(start, end, granularity):
+    """(first day, last day) of each bucket, clamped to [start, end]."""
+    bucket_start = start
+    while bucket_start <= end:
+        if granularity == "day":
+            bucket_end = bucket_start
+        elif granularity == "week":
+            bucket_end = bucket_start + timedelta(days=6 - bucket_start.weekday())
+        else:
+            bucket_end = _month_end(bucket_start)
+        bucket_end = min(bucket_end, end)
+        yield bucket_start, bucket_end
+        bucket_start = bucket_end + timedelta(days=1)
+
+
+def _bucket_totals(user_id, start, end, granularity):
+    """Nutrient sums per bucket start, read from the daily and monthly summaries.
+
+    Whole months come from user_monthly_nutrition, so a year at month
+    granularity reads at most 12 rows per nutrient plus the partial edges.
+    """
+    totals = {}
+    daily_ranges = [(start, end)]
+    if granularity == "month":
+        first_full = start if start.day == 1 else _month_end(start) + timedelta(days=1)
+        last_full = end if end == _month_end(end) else end.replace(day=1) - timedelta(days=1)
+        if first_full <= last_full:
+            result = db.session.execute(
+                text(
+                    """
+                    SELECT month, nutrition_name, amount
+                    FROM user_monthly_nutrition
+                    WHERE user_id = :user_id AND month BETWEEN :first AND :last
+                """
+                ),
+                {"user_id": user_id, "first": first_full, "last": last_full},
+            )
+            for row in result:
+                bucket = totals.setdefault(row.month, {})
+                bucket[row.nutrition_name] = float(row.amount)
+            daily_ranges = [
+                (start, first_full - timedelta(days=1)),
+                (last_full + timedelta(days=1), end),
+            ]
+
+    for range_start, range_end in daily_ranges:
+        if range_start > range_end:
+            continue
+        result = db.session.execute(
+            text(
+                """
+                SELECT day, nutrition_name, amount
+                FROM user_daily_nutrition
+                WHERE user_id = :user_id AND day BETWEEN :first AND :last
+            """
+            ),
+            {"user_id": user_id, "first": range_start, "last": range_end},
+        )
+        for row in result:
+            if granularity == "day":
+                bucket_start = row.day
+            elif granularity == "week":
+                bucket_start = max(start, row.day - timedelta(days=row.day.weekday()))
+            else:
+                bucket_start = max(start, row.day.replace(day=1))
+            bucket = totals.setdefault(bucket_start, {})
+            bucket[row.nutrition_name] = bucket.get(row.nutrition_name, 0.0) + float(row.amount)
+    return totals
+
+
+def _recommendations(user_id):
+    """Unit and recommended daily value per nutrient for the user's age group and sex."""
+    result = db.session.execute(
+        text(
+            """
+            SELECT n.name, n.unit, npa.recommended_daily_value
+            FROM user u
+            JOIN user_age_group uag ON uag.user_id = u.user_id
+            JOIN nutrition_per_age npa ON
+                npa.age_group = uag.age_group
+                AND npa.sex = u.sex
+            JOIN nutrition n ON n.name = npa.nutrition_name
+            WHERE u.user_id = :user_id
+            ORDER BY n.name
+        """
+        ),
+        {"user_id": user_id},
+    )
+    return [(row.name, row.unit, float(row.recommended_daily_value)) for row in result]
+
+
+def _nutrient_summary(recommendations, amounts, days):
+    summary = []
+    for name, unit, recommended in recommendations:
+        consumed = amounts.get(name, 0.0)
+        daily_average = consumed / days
+        summary.append(
+            {
+                "name": name,
+                "unit": unit,
+                "consumed": round(consumed, 2),
+                "dailyAverage": round(daily_average, 2),
+                "recommended": recommended,
+                "percentageFulfilled": (
+                    round(daily_average / recommended * 100, 1) if recommended else None
+                ),
+            }
+        )
+    return summary
+
+
+@user_nutrition_controller.route("/nutrition/suggestions", methods=["GET"])
+@token_required
+def get_nutrition_suggestions(current_user):
+    """Suggest recipes that close the gap between today's intake and the recommendation"""
+    try:
+        limit = min(request.args.get("limit", SUGGESTION_LIMIT, type=int), MAX_SUGGESTION_LIMIT)
+        if limit <= 0:
+            return jsonify({"status": "error", "message": "limit must be positive"}), 400
+
+        intake = db.session.execute(
+            text(DAILY_INTAKE_QUERY), {"user_id": current_user.user_id}
+        ).fetchall()
+
+        # Amounts are scored as fractions of the daily value, weighted by the
+        # fraction still missing; nutrients already over target weigh negatively
+        gaps = []
+        weights = {}
+        for row in intake:
+            recommended = float(row.recommended_daily_value)
+            if recommended <= 0:
+                continue
+            remaining = recommended - float(row.consumed_amount)
+            weights[row.nutrition_name] = remaining / (recommended * recommended)
+            if remaining > 0:
+                gaps.append({"name": row.nutrition_name, "unit": row.unit, "remaining": remaining})
+
+        if not gaps:
+            return jsonify({"status": "success", "data": {"gaps": [], "recipes": []}})
+
+        scored = nutrient_matrix.top_scores(weights, limit, _user_diet_mask(current_user.user_id))
+        names = _recipe_names([recipe_id for recipe_id, _ in scored])
+
+        recipes = [
+            {"recipe_id": recipe_id, "recipe_name": names[recipe_id], "score": round(score, 4)}
+            for recipe_id, score in scored
+            if recipe_id in names
+        ]
+        return jsonify({"status": "success", "data": {"gaps": gaps, "recipes": recipes}})
+    except Exception as e:
+        logger.error(f"Error getting nutrition suggestions: {str(e)}", exc_info=True)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@user_nutrition_controller.route("/meal-plan", methods=["POST"])
+@token_required
+def create_meal_plan(current_user):
+    """Generate a 7-day meal plan within the user's diets and daily targets"""
+    try:
+        data = request.get_json(silent=True) or {}
+        meals_per_day = data.get("mealsPerDay", DEFAULT_MEALS_PER_DAY)
+        if not isinstance(meals_per_day, int) or not 1 <= meals_per_day <= MAX_MEALS_PER_DAY:
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "message": f"mealsPerDay must be between 1 and {MAX_MEALS_PER_DAY}",
+                    }
+                ),
+                400,
+            )
+
+        targets = [
+            (name, unit, recommended)
+            for name, unit, recommended in _recommendations(current_user.user_id)
+            if recommended > 0
+        ]
+        if not targets:
+            return (
+                jsonify({"status": "error", "message": "No nutrition targets for this user"}),
+                400,
+            )
+
+        try:
+            recipe_ids, amounts = meal_planner.plan(
+                [name for name, _, _ in targets],
+                [recommended for _, _, recommended in targets],
+                mask=_user_diet_mask(current_user.user_id),
+                meals_per_day=meals_per_day,
+            )
+        except MealPlannerBusy:
+            return (
+                jsonify({"status": "error", "message": "Too many meal plans in progress"}),
+                503,
+                {"Retry-After": "1"},
+            )
+        except MealPlanTimeout:
+            return (
+                jsonify({"status": "error", "message": "Meal plan took too long to generate"}),
+                503,
+            )
+
+        names = _recipe_names([recipe_id for day in recipe_ids for recipe_id in day])
+        days = []
+        for day, (day_recipes, day_amounts) in enumerate(zip(recipe_ids, amounts), start=1):
+            planned = sum(day_amounts) if day_amounts else [0.0] * len(targets)
+            days.append(
+                {
+                    "day": day,
+                    "meals": [
+                        {"recipe_id": recipe_id, "recipe_name": names.get(recipe_id)}
+                        for recipe_id in day_recipes
+                    ],
+                    "nutrients": [
+                        {
+                            "name": name,
+                            "unit": unit,
+                            "planned": round(float(amount), 2),
+                            "recommended": recommended,
+                            "percentageFulfilled": round(float(amount) / recommended * 100, 1),
+                        }
+                        for (name, unit, recommended), amount in zip(targets, planned)
+                    ],
+                }
+            )
+        return jsonify({"status": "success", "data": {"days": days}})
+    except Exception as e:
+        logger.error(f"Error creating meal plan: {str(e)}", exc_info=True)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+def _user_diet_mask(user_id):
+    """Recipes fitting every diet the user follows, or None when they follow none."""
+    diet_ids = [
+        row.diet_id
+        for row in db.session.execute(
+            text("SELECT diet_id FROM user_diet WHERE user_id = :user_id"), {"user_id": user_id}
+        )
+    ]
+    return diet_bitmap_index.mask(diet_ids) if diet_ids else None
+
+
+def _recipe_names(recipe_ids):
+    if not recipe_ids:
+        return {}
+    result = db.session.execute(
+        text("SELECT recipe_id, recipe_name FROM recipe WHERE recipe_id IN :recipe_ids").bindparams(
+            bindparam("recipe_ids", expanding=True)
+        ),
+        {"recipe_ids": list(set(recipe_ids))},
+    )
+    return {row.recipe_id: row.recipe_name for row in result}
@@ -0,0 +1,15 @@
+from config.database import db
+
+
+class EatsDailyCount(db.Model):
+    __tablename__ = "eats_daily_counts"
+
+    day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    cumulative = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<EatsDailyCount {self.day} {self.count}>"
+
+    def to_dict(self):
+        return {"day": self.day.isoformat(), "count": self.count, "cumulative": self.cumulative}
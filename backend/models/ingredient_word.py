@@ -0,0 +1,14 @@
+from config.database import db
+
+
+class IngredientWord(db.Model):
+    __tablename__ = "ingredient_word"
+
+    word = db.Column(db.String(45), primary_key=True)
+    token = db.Column(db.String(45), nullable=False)
+
+    def __repr__(self):
+        return f"<IngredientWord {self.word} -> {self.token}>"
+
+    def to_dict(self):
+        return {"word": self.word, "token": self.token}
@@ -0,0 +1,25 @@
+from config.database import db
+
+
+class RecipeRatingStats(db.Model):
+    __tablename__ = "recipe_rating_stats"
+
+    recipe_id = db.Column(db.Integer, db.ForeignKey("recipe.recipe_id"), primary_key=True)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    avg_rating = db.Column(
+        db.Numeric(6, 4),
+        db.Computed("IF(rating_count > 0, rating_sum / rating_count, 0)", persisted=True),
+        nullable=False,
+    )
+
+    def __repr__(self):
+        return f"<RecipeRatingStats {self.recipe_id} {self.rating_count}>"
+
+    def to_dict(self):
+        return {
+            "recipe_id": self.recipe_id,
+            "rating_sum": self.rating_sum,
+            "rating_count": self.rating_count,
+            "avg_rating": float(self.avg_rating),
+        }
@@ -0,0 +1,21 @@
+from config.database import db
+
+
+class DietViolation(db.Model):
+    __tablename__ = "diet_violation"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.user_id"), primary_key=True)
+    created_at = db.Column(db.DateTime, primary_key=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey("recipe.recipe_id"), primary_key=True)
+    diet_id = db.Column(db.Integer, db.ForeignKey("diet.diet_id"), primary_key=True)
+
+    def __repr__(self):
+        return f"<DietViolation {self.user_id} {self.recipe_id} {self.diet_id}>"
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "recipe_id": self.recipe_id,
+            "diet_id": self.diet_id,
+            "created_at": self.created_at.isoformat(),
+        }
@@ -0,0 +1,22 @@
+from config.database import db
+
+
+class RatingHistory(db.Model):
+    __tablename__ = "rating_history"
+
+    rating_history_id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.user_id"), nullable=False)
+    recipe_id = db.Column(db.Integer, db.ForeignKey("recipe.recipe_id"), nullable=False)
+    rating = db.Column(db.SmallInteger, nullable=False)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f"<RatingHistory {self.user_id} - {self.recipe_id} @ {self.created_at}>"
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "recipe_id": self.recipe_id,
+            "rating": self.rating,
+            "created_at": self.created_at.isoformat(),
+        }
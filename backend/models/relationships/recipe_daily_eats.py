@@ -0,0 +1,15 @@
+from config.database import db
+
+
+class RecipeDailyEats(db.Model):
+    __tablename__ = "recipe_daily_eats"
+
+    day = db.Column(db.Date, primary_key=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey("recipe.recipe_id"), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<RecipeDailyEats {self.day} {self.recipe_id}>"
+
+    def to_dict(self):
+        return {"day": self.day.isoformat(), "recipe_id": self.recipe_id, "count": self.count}
@@ -0,0 +1,17 @@
+from config.database import db
+
+
+class RecipeIngredient(db.Model):
+    __tablename__ = "recipe_ingredient"
+
+    recipe_id = db.Column(db.Integer, db.ForeignKey("recipe.recipe_id"), primary_key=True)
+    token = db.Column(db.String(45), primary_key=True)
+
+    # Relationships
+    recipe = db.relationship("Recipe", backref=db.backref("ingredient_tokens", lazy=True))
+
+    def __repr__(self):
+        return f"<RecipeIngredient {self.recipe_id} - {self.token}>"
+
+    def to_dict(self):
+        return {"recipe_id": self.recipe_id, "token": self.token}
@@ -0,0 +1,21 @@
+from config.database import db
+
+
+class RecipeRatingDaily(db.Model):
+    __tablename__ = "recipe_rating_daily"
+
+    day = db.Column(db.Date, primary_key=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey("recipe.recipe_id"), primary_key=True)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<RecipeRatingDaily {self.day} {self.recipe_id}>"
+
+    def to_dict(self):
+        return {
+            "day": self.day.isoformat(),
+            "recipe_id": self.recipe_id,
+            "rating_sum": self.rating_sum,
+            "rating_count": self.rating_count,
+        }
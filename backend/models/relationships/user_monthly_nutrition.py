@@ -0,0 +1,21 @@
+from config.database import db
+
+
+class UserMonthlyNutrition(db.Model):
+    __tablename__ = "user_monthly_nutrition"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.user_id"), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)
+    nutrition_name = db.Column(db.String(45), db.ForeignKey("nutrition.name"), primary_key=True)
+    amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserMonthlyNutrition {self.user_id} {self.month} {self.nutrition_name}>"
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "month": self.month.isoformat(),
+            "nutrition_name": self.nutrition_name,
+            "amount": float(self.amount),
+        }
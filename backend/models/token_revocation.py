@@ -0,0 +1,19 @@
+from config.database import db
+
+
+class TokenRevocation(db.Model):
+    __tablename__ = "token_revocation"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.user_id"), primary_key=True)
+    min_version = db.Column(db.Integer, nullable=False, default=0)
+    revoked_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
+    def __repr__(self):
+        return f"<TokenRevocation {self.user_id} v{self.min_version}>"
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "min_version": self.min_version,
+            "revoked_at": self.revoked_at,
+        }
@@ -0,0 +1,131 @@
+import logging
+import time
+
+from config.database import db
+from sqlalchemy.sql import text
+
+logger = logging.getLogger(__name__)
+
+
+def record_eat(recipe_id, created_at):
+    """Count one eat in eats_daily_counts and recipe_daily_eats in the current transaction.
+
+    ``cumulative`` is a running total over all days, so the eats in any window
+    are the difference of two rows. Eats are logged at the current time, so
+    only the latest day's row ever changes.
+    """
+    params = {"recipe_id": recipe_id, "created_at": created_at}
+    db.session.execute(
+        text(
+            """
+            INSERT INTO eats_daily_counts (day, count, cumulative)
+            SELECT DATE(:created_at), 1, COALESCE(
+                (
+                    SELECT cumulative FROM eats_daily_counts
+                    WHERE day < DATE(:created_at)
+                    ORDER BY day DESC
+                    LIMIT 1
+                ),
+                0
+            ) + 1
+            ON DUPLICATE KEY UPDATE
+                count = eats_daily_counts.count + 1,
+                cumulative = eats_daily_counts.cumulative + 1
+        """
+        ),
+        params,
+    )
+    db.session.execute(
+        text(
+            """
+            INSERT INTO recipe_daily_eats (day, recipe_id, count)
+            VALUES (DATE(:created_at), :recipe_id, 1)
+            ON DUPLICATE KEY UPDATE count = recipe_daily_eats.count + 1
+        """
+        ),
+        params,
+    )
+
+
+def eats_between(first, last):
+    """Total eats from day ``first`` through day ``last``, from two primary-key lookups."""
+    result = db.session.execute(
+        text(
+            """
+            SELECT
+                COALESCE(
+                    (
+                        SELECT cumulative FROM eats_daily_counts
+                        WHERE day <= :last ORDER BY day DESC LIMIT 1
+                    ),
+                    0
+                ) - COALESCE(
+                    (
+                        SELECT cumulative FROM eats_daily_counts
+                        WHERE day < :first ORDER BY day DESC LIMIT 1
+                    ),
+                    0
+                ) AS eats
+        """
+        ),
+        {"first": first, "last": last},
+    ).scalar()
+    return int(result or 0)
+
+
+def reconcile_eats_rollups(since=None):
+    """Recount eats_daily_counts and recipe_daily_eats from eats.
+
+    Only days from ``since`` are recounted (all history by default). This
+    fixes drift from eats removed by cascading deletes or committed just after
+    midnight. Running totals are recomputed for every day, which is cheap at
+    one row per day. Returns the number of days recounted.
+    """
+    started = time.monotonic()
+    params = {"since": since}
+    for table in ("eats_daily_counts", "recipe_daily_eats"):
+        db.session.execute(
+            text(f"DELETE FROM {table} {'WHERE day >= :since' if since else ''}"), params
+        )
+    result = db.session.execute(
+        text(
+            f"""
+            INSERT INTO eats_daily_counts (day, count, cumulative)
+            SELECT DATE(created_at), COUNT(*), 0
+            FROM eats
+            {"WHERE created_at >= :since" if since else ""}
+            GROUP BY DATE(created_at)
+        """
+        ),
+        params,
+    )
+    db.session.execute(
+        text(
+            f"""
+            INSERT INTO recipe_daily_eats (day, recipe_id, count)
+            SELECT DATE(created_at), recipe_id, COUNT(*)
+            FROM eats
+            {"WHERE created_at >= :since" if since else ""}
+            GROUP BY DATE(created_at), recipe_id
+        """
+        ),
+        params,
+    )
+    db.session.execute(
+        text(
+            """
+            UPDATE eats_daily_counts d
+            JOIN (
+                SELECT day, SUM(count) OVER (ORDER BY day) AS cumulative
+                FROM eats_daily_counts
+            ) running ON running.day = d.day
+            SET d.cumulative = running.cumulative
+        """
+        )
+    )
+    db.session.commit()
+
+    logger.info(
+        f"Reconciled {result.rowcount} days of eats rollups in {time.monotonic() - started:.1f}s"
+    )
+    return result.rowcount
@@ -1,108 +1,237 @@
 import logging
+import threading
+import time
 from functools import wraps
 
 import jwt
 from config.database import db
 from config.settings import SECRET_KEY
 from flask import jsonify, request
-from models.admin import Admin
-from models.user import User
 from sqlalchemy.sql import text
+from utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Seconds a resolved identity is trusted before the user row is checked again
+IDENTITY_TTL_SECONDS = 60
+# Seconds between polls of token_revocation for revocations made by other workers
+DENYLIST_REFRESH_SECONDS = 10
+# Seconds between reloads of the admin set
+ADMIN_REFRESH_SECONDS = 30
+
+
+class CurrentUser:
+    """Authenticated user resolved from signed JWT claims.
+
+    Handlers only need the id (and admins the admin flag), so this is built
+    from the token instead of loading the full ``User`` row.
+    """
+
+    __slots__ = ("user_id", "email", "is_admin", "token_version")
+
+    def __init__(self, user_id, email, is_admin, token_version):
+        self.user_id = user_id
+        self.email = email
+        self.is_admin = is_admin
+        self.token_version = token_version
+
+    def __repr__(self):
+        return f"<CurrentUser {self.user_id}>"
+
+
+class TokenDenylist:
+    """In-memory copy of ``token_revocation``: the minimum valid token version per user.
+
+    Revoking bumps the user's version, which invalidates every token issued
+    before it. Other workers pick the change up on their next poll; the poll
+    overlaps the previous one by a minute to catch late-committing rows.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._min_versions = {}
+        self._synced_until = None
+        self._checked_at = None
+
+    def current_version(self, user_id):
+        self._refresh()
+        return self._min_versions.get(user_id, 0)
+
+    def is_revoked(self, user_id, version):
+        self._refresh()
+        return version < self._min_versions.get(user_id, 0)
+
+    def revoke(self, user_id):
+        """Invalidate every token issued to ``user_id`` so far. Returns the new version."""
+        db.session.execute(
+            text(
+                """
+                INSERT INTO token_revocation (user_id, min_version)
+                VALUES (:user_id, 1)
+                ON DUPLICATE KEY UPDATE min_version = min_version + 1
+            """
+            ),
+            {"user_id": user_id},
+        )
+        version = db.session.execute(
+            text("SELECT min_version FROM token_revocation WHERE user_id = :user_id"),
+            {"user_id": user_id},
+        ).scalar()
+        db.session.commit()
+        with self._lock:
+            self._min_versions[user_id] = max(self._min_versions.get(user_id, 0), version)
+        return version
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < DENYLIST_REFRESH_SECONDS:
+            return
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < DENYLIST_REFRESH_SECONDS:
+                return
+            if self._synced_until is None:
+                rows = db.session.execute(
+                    text("SELECT user_id, min_version, revoked_at FROM token_revocation")
+                ).fetchall()
+            else:
+                rows = db.session.execute(
+                    text(
+                        """
+                        SELECT user_id, min_version, revoked_at
+                        FROM token_revocation
+                        WHERE revoked_at >= DATE_SUB(:since, INTERVAL 1 MINUTE)
+                    """
+                    ),
+                    {"since": self._synced_until},
+                ).fetchall()
+            for row in rows:
+                self._min_versions[row.user_id] = max(
+                    self._min_versions.get(row.user_id, 0), row.min_version
+                )
+                if self._synced_until is None or row.revoked_at > self._synced_until:
+                    self._synced_until = row.revoked_at
+            self._checked_at = now
+
+
+class AdminSet:
+    """In-memory set of admin user ids, reloaded from ``admin`` every few seconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._user_ids = frozenset()
+        self._checked_at = None
+
+    def contains(self, user_id):
+        self._refresh()
+        return user_id in self._user_ids
+
+    def add(self, user_id):
+        with self._lock:
+            self._user_ids = self._user_ids | {user_id}
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < ADMIN_REFRESH_SECONDS:
+            return
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < ADMIN_REFRESH_SECONDS:
+                return
+            result = db.session.execute(text("SELECT user_id FROM admin"))
+            self._user_ids = frozenset(row.user_id for row in result)
+            self._checked_at = now
+
+
+token_denylist = TokenDenylist()
+admin_set = AdminSet()
+# (user_id, token version) -> CurrentUser
+identity_cache = TTLCache(maxsize=10000, ttl=IDENTITY_TTL_SECONDS)
+
+
+class AuthError(Exception):
+    def __init__(self, message, status=401):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _bearer_token():
+    auth_header = request.headers.get("Authorization")
+    if not auth_header:
+        logger.error("No token provided")
+        raise AuthError("Token is missing")
+    try:
+        return auth_header.split(" ")[1]  # Bearer <token>
+    except IndexError:
+        logger.error("Malformed authorization header")
+        raise AuthError("Invalid token format")
+
+
+def authenticate():
+    """Resolve the request's bearer token to a ``CurrentUser``; raise AuthError otherwise.
+
+    Signed claims are trusted once the token version is checked against the
+    denylist. The user row is only read on an identity cache miss.
+    """
+    try:
+        data = jwt.decode(_bearer_token(), SECRET_KEY, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        logger.error("Token has expired")
+        raise AuthError("Token has expired")
+    except jwt.InvalidTokenError as e:
+        logger.error(f"Invalid token: {str(e)}")
+        raise AuthError("Invalid token")
+
+    user_id = data["user_id"]
+    version = data.get("ver", 0)
+    if token_denylist.is_revoked(user_id, version):
+        logger.error(f"Revoked token used for user {user_id}")
+        raise AuthError("Token has been revoked")
+
+    current_user = identity_cache.get((user_id, version))
+    if current_user is None:
+        exists = db.session.execute(
+            text("SELECT user_id FROM user WHERE user_id = :user_id"), {"user_id": user_id}
+        ).first()
+        if not exists:
+            logger.error(f"User not found for token payload: {data}")
+            raise AuthError("User not found")
+        current_user = CurrentUser(user_id, data.get("email"), bool(data.get("is_admin")), version)
+        identity_cache.set((user_id, version), current_user)
+    return current_user
+
 
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        auth_header = request.headers.get("Authorization")
-
-        if auth_header:
-            try:
-                token = auth_header.split(" ")[1]  # Bearer <token>
-            except IndexError:
-                logger.error("Malformed authorization header")
-                return jsonify({"status": "error", "message": "Invalid token format"}), 401
-
-        if not token:
-            logger.error("No token provided")
-            return jsonify({"status": "error", "message": "Token is missing"}), 401
-
         try:
-            data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            result = db.session.execute(
-                text("SELECT * FROM user WHERE user_id = :user_id"), {"user_id": data["user_id"]}
-            ).first()
-            current_user = User.query.get(result[0]) if result else None
-            if not current_user:
-                logger.error(f"User not found for token payload: {data}")
-                return jsonify({"status": "error", "message": "User not found"}), 401
-
-            return f(current_user, *args, **kwargs)
-
-        except jwt.ExpiredSignatureError:
-            logger.error("Token has expired")
-            return jsonify({"status": "error", "message": "Token has expired"}), 401
-        except jwt.InvalidTokenError as e:
-            logger.error(f"Invalid token: {str(e)}")
-            return jsonify({"status": "error", "message": "Invalid token"}), 401
+            current_user = authenticate()
+        except AuthError as e:
+            return jsonify({"status": "error", "message": e.message}), e.status
         except Exception as e:
             logger.error(f"Error processing token: {str(e)}", exc_info=True)
             return jsonify({"status": "error", "message": "Error processing token"}), 401
 
+        return f(current_user, *args, **kwargs)
+
     return decorated
 
 
 def admin_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        auth_header = request.headers.get("Authorization")
-
-        logger.info(f"Checking admin authorization. Auth header: {auth_header}")
-
-        if auth_header:
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                logger.error("Invalid token format in Authorization header")
-                return jsonify({"error": "Invalid token format"}), 401
-
-        if not token:
-            logger.error("No token provided")
-            return jsonify({"error": "Token is missing"}), 401
-
         try:
-            logger.info("Decoding token...")
-            data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-
-            logger.info(f"Getting user with ID: {data['user_id']}")
-            result = db.session.execute(
-                text("SELECT * FROM user WHERE user_id = :user_id"), {"user_id": data["user_id"]}
-            ).first()
-            current_user = User.query.get(result[0]) if result else None
-
-            if not current_user:
-                logger.error(f"User not found for ID: {data['user_id']}")
-                return jsonify({"error": "User not found"}), 404
-
-            # Check if user is admin
-            logger.info(f"Checking admin status for user: {current_user.user_id}")
-            admin_result = db.session.execute(
-                text("SELECT * FROM admin WHERE user_id = :user_id"),
-                {"user_id": current_user.user_id},
-            ).first()
-
-            if not admin_result:
-                logger.error(f"User {current_user.user_id} is not an admin")
-                return jsonify({"error": "Admin privileges required"}), 403
-
-            logger.info(f"Admin authorization successful for user: {current_user.user_id}")
+            current_user = authenticate()
+        except AuthError as e:
+            return jsonify({"error": e.message}), e.status
         except Exception as e:
             logger.error(f"Error in admin authorization: {str(e)}", exc_info=True)
             return jsonify({"error": "Invalid token"}), 401
 
+        # The signed is_admin claim is the fast path; the admin set catches demotions
+        if not current_user.is_admin or not admin_set.contains(current_user.user_id):
+            logger.error(f"User {current_user.user_id} is not an admin")
+            return jsonify({"error": "Admin privileges required"}), 403
+
         return f(current_user, *args, **kwargs)
 
     return decorated
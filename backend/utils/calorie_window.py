@@ -0,0 +1,172 @@
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+
+from config.database import db
+from sqlalchemy.sql import text
+from utils.nutrients import nutrient_matrix
+
+logger = logging.getLogger(__name__)
+
+CALORIES = "Calories"
+# Windows (in days, today included) answered by ``over_threshold``
+CALORIE_WINDOWS = (1, 7, 14, 30)
+MAX_WINDOW_DAYS = max(CALORIE_WINDOWS)
+# Users are ranked once their average reaches this share of the recommendation
+TRACK_RATIO = 1.0
+# Seconds between reloads of the days that can still change (today, yesterday)
+REFRESH_SECONDS = 30
+
+
+def _today():
+    # user_daily_nutrition days are DATE(eats.created_at), stored in UTC
+    return datetime.now(timezone.utc).date()
+
+
+class CalorieWindow:
+    """Per-user daily calorie totals over the last ``MAX_WINDOW_DAYS`` days.
+
+    For every window in ``CALORIE_WINDOWS`` the users whose average daily
+    calories are at least ``TRACK_RATIO`` times their recommendation are
+    kept in a list sorted by that ratio, so the worst offenders are read
+    from the front. Averages are taken over the days with eats, and a user's
+    entries are re-ranked whenever one of their days changes.
+
+    Loaded lazily from ``user_daily_nutrition``. Eats logged by this worker
+    are applied through ``record``; the days that can still change are
+    reloaded every ``REFRESH_SECONDS`` to pick up other workers' eats.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_on = None
+        self._refreshed_at = 0.0
+        self._days = {}  # user_id -> {day: calories}
+        self._recommended = {}  # user_id -> recommended daily calories
+        self._ratios = {}  # (window, user_id) -> ratio
+        self._ranked = {window: [] for window in CALORIE_WINDOWS}  # [(-ratio, user_id), ...]
+
+    def ensure_loaded(self):
+        today = _today()
+        now = time.monotonic()
+        if self._loaded_on == today and now - self._refreshed_at < REFRESH_SECONDS:
+            return
+        with self._lock:
+            if self._loaded_on == today and now - self._refreshed_at < REFRESH_SECONDS:
+                return
+            if self._loaded_on == today:
+                self._rerank(self._load(today - timedelta(days=1)))
+            else:
+                # A new day shifts every window, so rank everyone again
+                self._days = {}
+                self._recommended = {}
+                self._load(today - timedelta(days=MAX_WINDOW_DAYS - 1))
+                self._loaded_on = today
+                self._rank_all()
+                logger.info(f"Calorie window loaded: {len(self._days)} users")
+            self._refreshed_at = now
+
+    def record(self, user_id, recipe_id, day):
+        """Add a committed eat's calories, so this worker sees it before the next refresh."""
+        with self._lock:
+            if day != self._loaded_on or user_id not in self._recommended:
+                return
+        calories = float(nutrient_matrix.values(CALORIES, [recipe_id])[0])
+        if math.isnan(calories):
+            return
+        with self._lock:
+            if day != self._loaded_on:
+                return
+            days = self._days.setdefault(user_id, {})
+            days[day] = days.get(day, 0.0) + calories
+            self._rerank([user_id])
+
+    def over_threshold(self, threshold, days, limit):
+        """Users averaging more than ``threshold`` x their recommendation over ``days`` days.
+
+        Returns ``[(user_id, average, recommended, ratio), ...]``, highest ratio
+        first. Raises ValueError for an unsupported window or a threshold below
+        ``TRACK_RATIO``.
+        """
+        if days not in CALORIE_WINDOWS:
+            raise ValueError(f"days must be one of {', '.join(map(str, CALORIE_WINDOWS))}")
+        if threshold < TRACK_RATIO:
+            raise ValueError(f"threshold must be at least {round(TRACK_RATIO * 100)}%")
+        self.ensure_loaded()
+        offenders = []
+        with self._lock:
+            for negative_ratio, user_id in self._ranked[days]:
+                if -negative_ratio <= threshold or len(offenders) == limit:
+                    break
+                recommended = self._recommended[user_id]
+                offenders.append(
+                    (user_id, -negative_ratio * recommended, recommended, -negative_ratio)
+                )
+        return offenders
+
+    def _load(self, since):
+        result = db.session.execute(
+            text(
+                """
+                SELECT udn.user_id, udn.day, udn.amount, npa.recommended_daily_value
+                FROM user_daily_nutrition udn
+                JOIN user u ON u.user_id = udn.user_id
+                JOIN user_age_group uag ON uag.user_id = udn.user_id
+                JOIN nutrition_per_age npa ON
+                    npa.age_group = uag.age_group
+                    AND npa.sex = u.sex
+                    AND npa.nutrition_name = udn.nutrition_name
+                WHERE udn.nutrition_name = :calories AND udn.day >= :since
+            """
+            ),
+            {"calories": CALORIES, "since": since},
+        )
+        touched = set()
+        for row in result:
+            if not row.recommended_daily_value:
+                continue
+            self._days.setdefault(row.user_id, {})[row.day] = float(row.amount)
+            self._recommended[row.user_id] = float(row.recommended_daily_value)
+            touched.add(row.user_id)
+        return touched
+
+    def _ratio(self, user_id, window):
+        recommended = self._recommended.get(user_id)
+        first = self._loaded_on - timedelta(days=window - 1)
+        amounts = [
+            calories for day, calories in self._days.get(user_id, {}).items() if day >= first
+        ]
+        if not amounts or not recommended:
+            return None
+        return sum(amounts) / len(amounts) / recommended
+
+    def _rank_all(self):
+        self._ratios = {}
+        self._ranked = {}
+        for window in CALORIE_WINDOWS:
+            ranked = []
+            for user_id in self._days:
+                ratio = self._ratio(user_id, window)
+                if ratio is not None and ratio >= TRACK_RATIO:
+                    self._ratios[(window, user_id)] = ratio
+                    ranked.append((-ratio, user_id))
+            ranked.sort()
+            self._ranked[window] = ranked
+
+    def _rerank(self, user_ids):
+        for user_id in user_ids:
+            for window in CALORIE_WINDOWS:
+                ranked = self._ranked[window]
+                old = self._ratios.pop((window, user_id), None)
+                if old is not None:
+                    del ranked[bisect_left(ranked, (-old, user_id))]
+                ratio = self._ratio(user_id, window)
+                if ratio is not None and ratio >= TRACK_RATIO:
+                    self._ratios[(window, user_id)] = ratio
+                    insort(ranked, (-ratio, user_id))
+
+
+calorie_window = CalorieWindow()
@@ -0,0 +1,105 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command("build-recommendations")
+@click.option("--top-k", default=50, show_default=True, help="Neighbours kept per recipe.")
+@click.option("--workers", default=None, type=int, help="Worker processes (default: CPU count).")
+@click.option(
+    "--incremental", is_flag=True, help="Only recompute recipes with new eats or ratings."
+)
+@with_appcontext
+def build_recommendations_command(top_k, workers, incremental):
+    """Rebuild the item-item recommendation model (run nightly)."""
+    from utils.recommender import build_item_neighbors
+
+    version_dir = build_item_neighbors(top_k=top_k, workers=workers, incremental=incremental)
+    click.echo(f"Recommendation model written to {version_dir}")
+
+
+@click.command("build-nutrient-matrix")
+@with_appcontext
+def build_nutrient_matrix_command():
+    """Rebuild the recipe x nutrient matrix from the contains table."""
+    from utils.nutrients import build_nutrient_matrix
+
+    matrix_dir = build_nutrient_matrix()
+    click.echo(f"Nutrient matrix written to {matrix_dir}")
+
+
+@click.command("backfill-daily-nutrition")
+@click.option(
+    "--since",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Only rebuild from the month of this date (YYYY-MM-DD); default is all history.",
+)
+@with_appcontext
+def backfill_daily_nutrition_command(since):
+    """Rebuild per-user daily and monthly nutrient totals from eats."""
+    from utils.nutrition_totals import backfill_daily_nutrition
+
+    written = backfill_daily_nutrition(since=since.date() if since else None)
+    click.echo(f"Wrote {written} daily nutrition rows")
+
+
+@click.command("reconcile-eats-counts")
+@click.option(
+    "--since",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Only recount days from this date (YYYY-MM-DD); default is all history.",
+)
+@with_appcontext
+def reconcile_eats_counts_command(since):
+    """Recount the per-day eats rollups (totals and per recipe) from eats."""
+    from utils.activity_rollups import reconcile_eats_rollups
+
+    days = reconcile_eats_rollups(since=since.date() if since else None)
+    click.echo(f"Recounted {days} days of eats")
+
+
+@click.command("backfill-diet-violations")
+@click.option(
+    "--since",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Only rebuild eats from this date (YYYY-MM-DD); default is all history.",
+)
+@with_appcontext
+def backfill_diet_violations_command(since):
+    """Rebuild diet violations from eats against the current diets and fits."""
+    from utils.diet_violations import backfill_diet_violations
+
+    written = backfill_diet_violations(since=since)
+    click.echo(f"Wrote {written} diet violations")
+
+
+@click.command("backfill-rating-stats")
+@with_appcontext
+def backfill_rating_stats_command():
+    """Rebuild per-recipe rating totals (overall and per day) from rating."""
+    from utils.rating_stats import backfill_rating_stats
+
+    written = backfill_rating_stats()
+    click.echo(f"Wrote rating stats for {written} recipes")
+
+
+@click.command("backfill-recipe-ingredients")
+@with_appcontext
+def backfill_recipe_ingredients_command():
+    """Rebuild the ingredient search tokens (recipe_ingredient) from recipe.ingredients."""
+    from utils.recipe_ingredients import backfill_recipe_ingredients
+
+    written = backfill_recipe_ingredients()
+    click.echo(f"Wrote {written} recipe ingredient tokens")
+
+
+def register_commands(app):
+    app.cli.add_command(build_recommendations_command)
+    app.cli.add_command(build_nutrient_matrix_command)
+    app.cli.add_command(backfill_daily_nutrition_command)
+    app.cli.add_command(reconcile_eats_counts_command)
+    app.cli.add_command(backfill_diet_violations_command)
+    app.cli.add_command(backfill_rating_stats_command)
+    app.cli.add_command(backfill_recipe_ingredients_command)
@@ -0,0 +1,142 @@
+import logging
+import threading
+
+import numpy as np
+from config.database import db
+from sqlalchemy.sql import text
+
+logger = logging.getLogger(__name__)
+
+
+class DietBitmapIndex:
+    """Per-diet bitsets over recipe ids, loaded from ``fits``.
+
+    Each diet is a NumPy bool array indexed directly by recipe_id, so "fits
+    diet A and diet B" is a bitwise AND instead of a join. Loaded lazily and
+    kept in sync by the fits, diet and recipe controllers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._size = 0
+        self._bits = {}  # diet_id -> bool array of length self._size
+        self._diet_ids = {}  # lowercased diet name -> diet_id
+        self._names = {}  # diet_id -> diet name
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            diets = db.session.execute(text("SELECT diet_id, name FROM diet")).fetchall()
+            fits = db.session.execute(text("SELECT recipe_id, diet_id FROM fits")).fetchall()
+            max_id = db.session.execute(text("SELECT MAX(recipe_id) FROM recipe")).scalar()
+
+            self._size = (max_id or 0) + 1
+            self._diet_ids = {row.name.lower(): row.diet_id for row in diets}
+            self._names = {row.diet_id: row.name for row in diets}
+            self._bits = {row.diet_id: np.zeros(self._size, dtype=bool) for row in diets}
+            if fits:
+                recipe_ids = np.array([row.recipe_id for row in fits], dtype=np.int64)
+                diet_ids = np.array([row.diet_id for row in fits], dtype=np.int64)
+                for diet_id, bits in self._bits.items():
+                    bits[recipe_ids[diet_ids == diet_id]] = True
+            self._loaded = True
+            logger.info(f"Diet bitmap index loaded: {len(diets)} diets, {len(fits)} fits")
+
+    def diet_id(self, name):
+        self.ensure_loaded()
+        return self._diet_ids.get(name.lower())
+
+    def mask(self, diet_ids):
+        """Recipes fitting every diet in ``diet_ids``, as a bool array indexed by recipe_id.
+
+        ``diet_ids`` should not be empty: no diets sets every id, including
+        ids no recipe has, so callers skip the mask instead.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            result = np.ones(self._size, dtype=bool)
+            for diet_id in diet_ids:
+                bits = self._bits.get(diet_id)
+                if bits is None:
+                    return np.zeros(self._size, dtype=bool)
+                result &= bits
+            return result
+
+    def counts(self, recipe_ids):
+        """Number of ``recipe_ids`` fitting each diet, keyed by diet name."""
+        self.ensure_loaded()
+        recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        with self._lock:
+            recipe_ids = recipe_ids[recipe_ids < self._size]
+            return {
+                self._names[diet_id]: int(np.count_nonzero(bits[recipe_ids]))
+                for diet_id, bits in self._bits.items()
+            }
+
+    def add(self, recipe_id, diet_id):
+        with self._lock:
+            if not self._loaded or diet_id not in self._bits:
+                return
+            self._grow(recipe_id + 1)
+            self._bits[diet_id][recipe_id] = True
+
+    def remove_recipe(self, recipe_id):
+        with self._lock:
+            if not self._loaded or recipe_id >= self._size:
+                return
+            for bits in self._bits.values():
+                bits[recipe_id] = False
+
+    def set_diet(self, diet_id, name):
+        """Register a new diet or a renamed one."""
+        with self._lock:
+            if not self._loaded:
+                return
+            self._diet_ids = {
+                key: value for key, value in self._diet_ids.items() if value != diet_id
+            }
+            self._diet_ids[name.lower()] = diet_id
+            self._names[diet_id] = name
+            self._bits.setdefault(diet_id, np.zeros(self._size, dtype=bool))
+
+    def remove_diet(self, diet_id):
+        with self._lock:
+            if not self._loaded:
+                return
+            self._diet_ids = {
+                key: value for key, value in self._diet_ids.items() if value != diet_id
+            }
+            self._bits.pop(diet_id, None)
+            self._names.pop(diet_id, None)
+
+    def _grow(self, size):
+        if size <= self._size:
+            return
+        size = max(size, self._size * 2)
+        for diet_id, bits in self._bits.items():
+            grown = np.zeros(size, dtype=bool)
+            grown[: self._size] = bits
+            self._bits[diet_id] = grown
+        self._size = size
+
+
+def mask_contains(mask, recipe_ids):
+    """Bool array telling which of ``recipe_ids`` are set in ``mask``."""
+    recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+    inside = recipe_ids < len(mask)
+    result = np.zeros(len(recipe_ids), dtype=bool)
+    result[inside] = mask[recipe_ids[inside]]
+    return result
+
+
+def intersect_masks(first, second):
+    """AND two recipe-id masks of possibly different lengths."""
+    size = min(len(first), len(second))
+    return first[:size] & second[:size]
+
+
+diet_bitmap_index = DietBitmapIndex()
@@ -0,0 +1,65 @@
+import logging
+import time
+
+from config.database import db
+from sqlalchemy.sql import text
+
+logger = logging.getLogger(__name__)
+
+
+def record_diet_violations(user_id, recipe_id, created_at):
+    """Record the user's diets the eaten recipe does not fit, in the current transaction.
+
+    Both lookups are primary-key reads (user_diet by user, fits by recipe and
+    diet). Returns the number of violations recorded.
+    """
+    result = db.session.execute(
+        text(
+            """
+            INSERT INTO diet_violation (user_id, recipe_id, diet_id, created_at)
+            SELECT ud.user_id, :recipe_id, ud.diet_id, :created_at
+            FROM user_diet ud
+            WHERE ud.user_id = :user_id
+                AND NOT EXISTS (
+                    SELECT 1 FROM fits f
+                    WHERE f.recipe_id = :recipe_id AND f.diet_id = ud.diet_id
+                )
+        """
+        ),
+        {"user_id": user_id, "recipe_id": recipe_id, "created_at": created_at},
+    )
+    return result.rowcount
+
+
+def backfill_diet_violations(since=None):
+    """Rebuild diet_violation from eats against the current user_diet and fits.
+
+    Only eats from ``since`` are rebuilt (all history by default). Returns the
+    number of violations written.
+    """
+    started = time.monotonic()
+    params = {"since": since}
+    condition = "WHERE created_at >= :since" if since else ""
+    db.session.execute(text(f"DELETE FROM diet_violation {condition}"), params)
+    result = db.session.execute(
+        text(
+            f"""
+            INSERT INTO diet_violation (user_id, recipe_id, diet_id, created_at)
+            SELECT e.user_id, e.recipe_id, ud.diet_id, e.created_at
+            FROM eats e
+            JOIN user_diet ud ON ud.user_id = e.user_id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM fits f
+                WHERE f.recipe_id = e.recipe_id AND f.diet_id = ud.diet_id
+            )
+            {"AND e.created_at >= :since" if since else ""}
+        """
+        ),
+        params,
+    )
+    db.session.commit()
+
+    logger.info(
+        f"Backfilled {result.rowcount} diet violations in {time.monotonic() - started:.1f}s"
+    )
+    return result.rowcount
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from config.database import db
+from config.settings import EATEN_CACHE_MAX_BYTES
+from sqlalchemy.sql import text
+
+logger = logging.getLogger(__name__)
+
+# Rough per-user cost on top of the array data (array header, dict entry, tuple)
+ENTRY_OVERHEAD_BYTES = 200
+# Seconds a user's set is trusted before it is checked against eats again
+REVALIDATE_SECONDS = 5
+
+
+class EatenRecipeSets:
+    """Per-user sets of eaten recipe ids, kept as sorted uint32 arrays.
+
+    A user's set is loaded from ``eats`` on first use and answers membership
+    with a binary search, without touching MySQL for ``REVALIDATE_SECONDS``.
+    After that one index dive on ``idx_user_id_created_at`` reads the user's
+    latest eat, and the set is reloaded only if it is newer than the one the
+    set was loaded with, so eats logged through other workers show up within
+    a few seconds. Eats logged by this worker are added through ``add``.
+    Least recently used users are evicted once the sets take more than
+    ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes=EATEN_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # user_id -> (sorted recipe ids, latest eat loaded, monotonic time of the last check)
+        self._sets = OrderedDict()
+        self._bytes = 0
+
+    def get(self, user_id):
+        """Sorted uint32 array of the recipe ids ``user_id`` has eaten."""
+        user_id = int(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sets.get(user_id)
+            if entry is not None and now - entry[2] < REVALIDATE_SECONDS:
+                self._sets.move_to_end(user_id)
+                return entry[0]
+
+        params = {"user_id": user_id}
+        latest = db.session.execute(
+            text("SELECT MAX(created_at) FROM eats WHERE user_id = :user_id"), params
+        ).scalar()
+        with self._lock:
+            entry = self._sets.get(user_id)
+            if entry is not None and entry[1] == latest:
+                self._store(user_id, entry[0], latest, now)
+                return entry[0]
+
+        # Read after the latest eat, so the set is never older than the marker stored with it
+        result = db.session.execute(
+            text("SELECT DISTINCT recipe_id FROM eats WHERE user_id = :user_id ORDER BY recipe_id"),
+            params,
+        )
+        recipe_ids = np.fromiter((row.recipe_id for row in result), dtype=np.uint32)
+        with self._lock:
+            self._store(user_id, recipe_ids, latest, now)
+        return recipe_ids
+
+    def contains(self, user_id, recipe_id):
+        recipe_id = int(recipe_id)
+        recipe_ids = self.get(user_id)
+        position = np.searchsorted(recipe_ids, recipe_id)
+        return bool(position < len(recipe_ids) and recipe_ids[position] == recipe_id)
+
+    def subset(self, user_id, recipe_ids):
+        """Subset of ``recipe_ids`` the user has eaten."""
+        eaten = self.get(user_id)
+        if not len(eaten) or not recipe_ids:
+            return set()
+        candidates = np.asarray(recipe_ids, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(eaten, candidates), len(eaten) - 1)
+        return {int(recipe_id) for recipe_id in candidates[eaten[positions] == candidates]}
+
+    def add(self, user_id, recipe_id):
+        """Add a committed eat to the user's set, if it is cached.
+
+        The set keeps its old marker, so the next check reloads it once and
+        picks up anything other workers logged meanwhile.
+        """
+        user_id, recipe_id = int(user_id), int(recipe_id)
+        with self._lock:
+            entry = self._sets.get(user_id)
+            if entry is None:
+                return
+            recipe_ids, latest, checked_at = entry
+            position = np.searchsorted(recipe_ids, recipe_id)
+            if position < len(recipe_ids) and recipe_ids[position] == recipe_id:
+                return
+            self._store(user_id, np.insert(recipe_ids, position, recipe_id), latest, checked_at)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            entry = self._sets.pop(int(user_id), None)
+            if entry is not None:
+                self._bytes -= entry[0].nbytes + ENTRY_OVERHEAD_BYTES
+
+    def _store(self, user_id, recipe_ids, latest, checked_at):
+        old = self._sets.pop(user_id, None)
+        if old is not None:
+            self._bytes -= old[0].nbytes + ENTRY_OVERHEAD_BYTES
+        self._sets[user_id] = (recipe_ids, latest, checked_at)
+        self._bytes += recipe_ids.nbytes + ENTRY_OVERHEAD_BYTES
+        # The newest set always stays, even if it alone is over budget
+        while self._bytes > self.max_bytes and len(self._sets) > 1:
+            _, (evicted, _, _) = self._sets.popitem(last=False)
+            self._bytes -= evicted.nbytes + ENTRY_OVERHEAD_BYTES
+
+
+eaten_recipe_sets = EatenRecipeSets()
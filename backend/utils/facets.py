@@ -0,0 +1,145 @@
+import logging
+import threading
+
+import numpy as np
+from config.database import db
+from sqlalchemy.sql import text
+from utils.diet_index import diet_bitmap_index
+from utils.nutrients import nutrient_matrix
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (inclusive, minutes) of the total_time facet buckets
+TOTAL_TIME_EDGES = (15, 30, 60, 120)
+# Upper bounds (exclusive, kcal) of the calorie facet buckets
+CALORIE_EDGES = (200, 400, 600, 800)
+CALORIES = "Calories"
+
+
+class RecipeFacetIndex:
+    """Columnar per-recipe values used to count search facets.
+
+    Columns are NumPy arrays indexed by recipe_id, so the counts for any
+    candidate set are a few vectorized passes over a bool mask. Diet
+    membership comes from ``diet_bitmap_index`` and calories from
+    ``nutrient_matrix``. Loaded lazily and kept in sync by the recipe
+    controller.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._exists = np.zeros(0, dtype=bool)
+        self._total_time = np.zeros(0, dtype=np.int32)
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            recipes = db.session.execute(
+                text("SELECT recipe_id, total_time FROM recipe")
+            ).fetchall()
+
+            size = max((row.recipe_id for row in recipes), default=0) + 1
+            self._exists = np.zeros(size, dtype=bool)
+            self._total_time = np.zeros(size, dtype=np.int32)
+            recipe_ids = np.array([row.recipe_id for row in recipes], dtype=np.int64)
+            self._exists[recipe_ids] = True
+            self._total_time[recipe_ids] = [row.total_time for row in recipes]
+            self._loaded = True
+            logger.info(f"Recipe facet index loaded: {len(recipes)} recipes")
+
+    def set_recipe(self, recipe_id, total_time):
+        with self._lock:
+            if not self._loaded:
+                return
+            self._grow(recipe_id + 1)
+            self._exists[recipe_id] = True
+            self._total_time[recipe_id] = total_time
+
+    def remove_recipe(self, recipe_id):
+        with self._lock:
+            if not self._loaded or recipe_id >= len(self._exists):
+                return
+            self._exists[recipe_id] = False
+
+    def total_times(self, recipe_ids):
+        """total_time of each of ``recipe_ids`` (int64 array); unknown ids read as 0."""
+        self.ensure_loaded()
+        recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        with self._lock:
+            known = recipe_ids < len(self._total_time)
+            total_time = np.zeros(len(recipe_ids), dtype=np.int32)
+            total_time[known] = self._total_time[recipe_ids[known]]
+        return total_time
+
+    def candidates(self, id_sets=(), masks=(), max_time=None):
+        """Bool mask of existing recipes in every id set and mask, within ``max_time``."""
+        self.ensure_loaded()
+        with self._lock:
+            mask = self._exists.copy()
+            if max_time is not None:
+                mask &= self._total_time <= max_time
+        for recipe_ids in id_sets:
+            recipe_ids = np.fromiter(recipe_ids, dtype=np.int64)
+            selected = np.zeros(len(mask), dtype=bool)
+            selected[recipe_ids[recipe_ids < len(mask)]] = True
+            mask &= selected
+        for other in masks:
+            size = min(len(mask), len(other))
+            mask[:size] &= other[:size]
+            mask[size:] = False
+        return mask
+
+    def counts(self, mask):
+        """Facet counts for the recipes set in ``mask``."""
+        self.ensure_loaded()
+        with self._lock:
+            positions = np.flatnonzero(mask[: len(self._exists)])
+            total_time = self._total_time[positions]
+
+        calories = nutrient_matrix.values(CALORIES, positions)
+        calories = calories[~np.isnan(calories)]
+        return {
+            "total": int(len(positions)),
+            "diet": diet_bitmap_index.counts(positions),
+            "total_time": _bucket_counts(
+                np.searchsorted(TOTAL_TIME_EDGES, total_time, side="left"),
+                _bucket_labels(TOTAL_TIME_EDGES, inclusive=True),
+            ),
+            "calories": _bucket_counts(
+                np.searchsorted(CALORIE_EDGES, calories, side="right"),
+                _bucket_labels(CALORIE_EDGES, inclusive=False),
+            ),
+        }
+
+    def _grow(self, size):
+        if size <= len(self._exists):
+            return
+        size = max(size, 2 * len(self._exists))
+        old = len(self._exists)
+        exists = np.zeros(size, dtype=bool)
+        total_time = np.zeros(size, dtype=np.int32)
+        exists[:old] = self._exists
+        total_time[:old] = self._total_time
+        self._exists, self._total_time = exists, total_time
+
+
+def _bucket_labels(edges, inclusive):
+    if inclusive:
+        labels = [f"<={edges[0]}"]
+        labels += [f"{low + 1}-{high}" for low, high in zip(edges, edges[1:])]
+        return labels + [f">{edges[-1]}"]
+    labels = [f"<{edges[0]}"]
+    labels += [f"{low}-{high}" for low, high in zip(edges, edges[1:])]
+    return labels + [f">={edges[-1]}"]
+
+
+def _bucket_counts(buckets, labels):
+    counts = np.bincount(buckets, minlength=len(labels))
+    return [{"label": label, "count": int(count)} for label, count in zip(labels, counts)]
+
+
+recipe_facet_index = RecipeFacetIndex()
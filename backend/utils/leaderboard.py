@@ -0,0 +1,210 @@
+import heapq
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from config.database import db
+from sqlalchemy.sql import text
+
+logger = logging.getLogger(__name__)
+
+# Days (today included) covered by each period; None is all time
+LEADERBOARD_PERIODS = {"day": 1, "week": 7, "month": 30, "all": None}
+MAX_WINDOW_DAYS = 30
+# Pseudo-ratings at the period's mean added to every recipe, so a single
+# 5-star vote does not outrank a well-reviewed recipe
+PRIOR_COUNT = 5
+# Seconds between reloads of the days that can still change (today, yesterday)
+REFRESH_SECONDS = 30
+# Ranked entries kept per period; larger limits are capped to this
+MAX_RANKED = 100
+
+
+def _today():
+    # rating.created_at is stored in UTC, so bucket days are UTC dates
+    return datetime.now(timezone.utc).date()
+
+
+class RatingLeaderboard:
+    """Recipes ranked by Bayesian average rating over the periods in ``LEADERBOARD_PERIODS``.
+
+    All-time totals are loaded from ``recipe_rating_stats`` and per-day
+    buckets of the last ``MAX_WINDOW_DAYS`` days from ``recipe_rating_daily``.
+    Every period keeps its own running ``(sum, count)`` per recipe, which is
+    adjusted by the difference whenever a bucket changes, and a ranked list
+    that is rebuilt only after its totals moved. Ratings saved by this worker
+    are applied through ``record``; the days that can still change are
+    reloaded every ``REFRESH_SECONDS`` and everything is reloaded on a new day.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded_on = None
+        self._refreshed_at = 0.0
+        self._days = {}  # day -> {recipe_id: (rating_sum, rating_count)}
+        self._totals = {period: {} for period in LEADERBOARD_PERIODS}  # recipe_id -> [sum, count]
+        self._ranked = {}  # period -> best first [(recipe_id, score, average, count), ...]
+
+    def ensure_loaded(self):
+        today = _today()
+        now = time.monotonic()
+        if self._loaded_on == today and now - self._refreshed_at < REFRESH_SECONDS:
+            return
+        with self._lock:
+            if self._loaded_on == today and now - self._refreshed_at < REFRESH_SECONDS:
+                return
+            if self._loaded_on == today:
+                self._refresh(today - timedelta(days=1))
+            else:
+                self._load(today)
+            self._refreshed_at = now
+
+    def record(self, recipe_id, day, rating_delta, count_delta):
+        """Apply a committed change to ``day``'s bucket, so this worker sees it right away.
+
+        A re-rate moves the user's rating out of the day it was first given,
+        which can be older than the reloaded days; other workers pick that up
+        on the next full load.
+        """
+        with self._lock:
+            if self._loaded_on is None:
+                return
+            if day > self._loaded_on - timedelta(days=MAX_WINDOW_DAYS):
+                bucket = self._days.setdefault(day, {})
+                rating_sum, rating_count = bucket.get(recipe_id, (0, 0))
+                bucket[recipe_id] = (rating_sum + rating_delta, rating_count + count_delta)
+            self._apply(recipe_id, day, rating_delta, count_delta)
+
+    def top(self, period, limit):
+        """``[(recipe_id, score, average, count), ...]`` for the best rated recipes of ``period``.
+
+        Raises ValueError for an unknown period.
+        """
+        if period not in LEADERBOARD_PERIODS:
+            raise ValueError(f"period must be one of {', '.join(LEADERBOARD_PERIODS)}")
+        self.ensure_loaded()
+        with self._lock:
+            ranked = self._ranked.get(period)
+            if ranked is None:
+                ranked = self._rank(self._totals[period])
+                self._ranked[period] = ranked
+            return ranked[:limit]
+
+    def averages(self, recipe_ids):
+        """All-time average rating of each of ``recipe_ids``, 0 for unrated recipes.
+
+        Rounded to 4 decimals like ``recipe_rating_stats.avg_rating``, so the
+        order matches the one the rating index gives.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            totals = self._totals["all"]
+            entries = [totals.get(recipe_id) for recipe_id in recipe_ids]
+        return np.array(
+            [
+                math.floor(entry[0] / entry[1] * 10000 + 0.5) / 10000 if entry else 0.0
+                for entry in entries
+            ]
+        )
+
+    def _load(self, today):
+        totals = {
+            row.recipe_id: [int(row.rating_sum), row.rating_count]
+            for row in db.session.execute(
+                text(
+                    """
+                    SELECT recipe_id, rating_sum, rating_count
+                    FROM recipe_rating_stats
+                    WHERE rating_count > 0
+                """
+                )
+            )
+        }
+        self._days = {}
+        for row in self._read_days(today - timedelta(days=MAX_WINDOW_DAYS - 1)):
+            self._days.setdefault(row.day, {})[row.recipe_id] = (
+                int(row.rating_sum),
+                row.rating_count,
+            )
+        self._loaded_on = today
+        self._totals = {"all": totals}
+        for period, days in LEADERBOARD_PERIODS.items():
+            if days is None:
+                continue
+            window = {}
+            for age in range(days):
+                for recipe_id, (rating_sum, rating_count) in self._days.get(
+                    today - timedelta(days=age), {}
+                ).items():
+                    entry = window.setdefault(recipe_id, [0, 0])
+                    entry[0] += rating_sum
+                    entry[1] += rating_count
+            self._totals[period] = window
+        self._ranked = {}
+        logger.info(f"Rating leaderboard loaded: {len(totals)} rated recipes")
+
+    def _refresh(self, since):
+        fresh = {}
+        for row in self._read_days(since):
+            fresh.setdefault(row.day, {})[row.recipe_id] = (int(row.rating_sum), row.rating_count)
+        for day in set(fresh) | {day for day in self._days if day >= since}:
+            old = self._days.get(day, {})
+            new = fresh.get(day, {})
+            for recipe_id in set(old) | set(new):
+                old_sum, old_count = old.get(recipe_id, (0, 0))
+                new_sum, new_count = new.get(recipe_id, (0, 0))
+                if (old_sum, old_count) != (new_sum, new_count):
+                    self._apply(recipe_id, day, new_sum - old_sum, new_count - old_count)
+            self._days[day] = new
+
+    def _read_days(self, since):
+        return db.session.execute(
+            text(
+                """
+                SELECT day, recipe_id, rating_sum, rating_count
+                FROM recipe_rating_daily
+                WHERE day >= :since AND rating_count > 0
+            """
+            ),
+            {"since": since},
+        )
+
+    def _apply(self, recipe_id, day, rating_delta, count_delta):
+        age = (self._loaded_on - day).days
+        for period, days in LEADERBOARD_PERIODS.items():
+            if days is not None and not 0 <= age < days:
+                continue
+            totals = self._totals[period]
+            entry = totals.setdefault(recipe_id, [0, 0])
+            entry[0] += rating_delta
+            entry[1] += count_delta
+            if entry[1] <= 0:
+                del totals[recipe_id]
+            self._ranked.pop(period, None)
+
+    def _rank(self, totals):
+        rating_sum = sum(entry[0] for entry in totals.values())
+        rating_count = sum(entry[1] for entry in totals.values())
+        if not rating_count:
+            return []
+        mean = rating_sum / rating_count
+        scored = (
+            (
+                recipe_id,
+                (PRIOR_COUNT * mean + entry[0]) / (PRIOR_COUNT + entry[1]),
+                entry[0] / entry[1],
+                entry[1],
+            )
+            for recipe_id, entry in totals.items()
+        )
+        ranked = heapq.nlargest(MAX_RANKED, scored, key=lambda item: (item[1], item[3], -item[0]))
+        return [
+            (recipe_id, round(score, 4), round(average, 2), count)
+            for recipe_id, score, average, count in ranked
+        ]
+
+
+rating_leaderboard = RatingLeaderboard()
@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+from config.database import db
+from config.settings import (
+    MEAL_PLAN_MAX_PENDING,
+    MEAL_PLAN_TIME_BUDGET_SECONDS,
+    MEAL_PLAN_WORKERS,
+)
+from sqlalchemy.sql import text
+from utils.nutrients import nutrient_matrix
+
+logger = logging.getLogger(__name__)
+
+PLAN_DAYS = 7
+# Recipes kept after the pre-selection pass; the greedy passes run over these only
+MAX_CANDIDATES = 5000
+# Score bonus per star above the neutral rating of 3
+RATING_WEIGHT = 0.25
+# Pseudo-ratings at the catalog mean added to every recipe, so one 5-star vote
+# does not outrank a well-reviewed recipe
+RATING_PRIOR_COUNT = 5
+# Seconds between reloads of the per-recipe ratings
+RATING_REFRESH_SECONDS = 600
+
+
+class MealPlannerBusy(Exception):
+    """Raised when too many meal plans are already being solved."""
+
+
+class MealPlanTimeout(Exception):
+    """Raised when a plan could not be solved within the time budget."""
+
+
+class RecipeRatingScores:
+    """Smoothed average rating per recipe, as a float array indexed by recipe_id.
+
+    Refreshed from ``recipe_rating_stats`` every ``RATING_REFRESH_SECONDS``;
+    recipes without ratings get the catalog mean.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scores = None
+        self._default = 3.0
+        self._loaded_at = 0.0
+
+    def ensure_loaded(self):
+        now = time.monotonic()
+        if self._scores is not None and now - self._loaded_at < RATING_REFRESH_SECONDS:
+            return
+        with self._lock:
+            if self._scores is not None and now - self._loaded_at < RATING_REFRESH_SECONDS:
+                return
+            rows = db.session.execute(
+                text(
+                    """
+                    SELECT recipe_id, rating_sum AS total, rating_count AS votes
+                    FROM recipe_rating_stats
+                    WHERE rating_count > 0
+                """
+                )
+            ).fetchall()
+            recipe_ids = np.array([row.recipe_id for row in rows], dtype=np.int64)
+            totals = np.array([float(row.total) for row in rows], dtype=np.float32)
+            votes = np.array([row.votes for row in rows], dtype=np.float32)
+            mean = float(totals.sum() / votes.sum()) if len(rows) else 3.0
+
+            scores = np.full(recipe_ids.max() + 1 if len(rows) else 0, mean, dtype=np.float32)
+            scores[recipe_ids] = (totals + RATING_PRIOR_COUNT * mean) / (votes + RATING_PRIOR_COUNT)
+            self._scores = scores
+            self._default = mean
+            self._loaded_at = now
+            logger.info(f"Recipe rating scores loaded: {len(rows)} rated recipes")
+
+    def lookup(self, recipe_ids):
+        """Scores of ``recipe_ids``; call ``ensure_loaded`` first, from a request thread."""
+        scores = self._scores
+        result = np.full(len(recipe_ids), self._default, dtype=np.float32)
+        inside = recipe_ids < len(scores)
+        result[inside] = scores[recipe_ids[inside]]
+        return result
+
+
+def solve_meal_plan(amounts, targets, ratings, days, meals_per_day, deadline):
+    """Greedy plan over candidate recipes; returns ``days`` lists of row positions.
+
+    ``amounts`` is a candidates x nutrients block, ``targets`` the daily
+    recommendation per nutrient and ``ratings`` the rating of each candidate.
+    Each slot takes the recipe that best covers an even share of what the day
+    still lacks, scored for all candidates at once with one matrix-vector
+    product. Recipes are not repeated within the plan while others remain.
+    Raises MealPlanTimeout once ``deadline`` (a ``time.monotonic()`` value)
+    has passed.
+    """
+    if not len(amounts):
+        return [[] for _ in range(days)]
+
+    # Work in fractions of the daily value so every nutrient weighs the same
+    scaled = amounts / targets
+    bonus = RATING_WEIGHT * (ratings - 3.0)
+
+    if len(scaled) > MAX_CANDIDATES:
+        fit = -np.square(scaled - 1.0 / meals_per_day).sum(axis=1) + bonus
+        keep = np.argpartition(-fit, MAX_CANDIDATES - 1)[:MAX_CANDIDATES]
+        positions = keep
+        scaled, bonus = scaled[keep], bonus[keep]
+    else:
+        positions = np.arange(len(scaled))
+
+    # ||a - goal||² = ||a||² - 2 a·goal + ||goal||², and the last term is the
+    # same for every candidate
+    squared_norms = np.square(scaled).sum(axis=1)
+    used = np.zeros(len(scaled), dtype=bool)
+    plan = []
+    for _ in range(days):
+        eaten = np.zeros(scaled.shape[1], dtype=np.float32)
+        meals = []
+        for slot in range(meals_per_day):
+            if time.monotonic() > deadline:
+                raise MealPlanTimeout()
+            if used.all():
+                used[:] = False
+            goal = (1.0 - eaten) / (meals_per_day - slot)
+            scores = 2 * (scaled @ goal) - squared_norms + bonus
+            scores[used] = -np.inf
+            pick = int(np.argmax(scores))
+            used[pick] = True
+            eaten += scaled[pick]
+            meals.append(int(positions[pick]))
+        plan.append(meals)
+    return plan
+
+
+class MealPlanner:
+    """Bounded thread pool that solves meal plans under a time budget.
+
+    The NumPy work releases the GIL, so plans are solved in parallel on the
+    pool's threads. Requests beyond ``max_pending`` in-flight plans are
+    rejected immediately instead of queueing; a plan counts as in flight
+    until its job finishes, even after the request timed out.
+    """
+
+    def __init__(
+        self,
+        workers=MEAL_PLAN_WORKERS,
+        max_pending=MEAL_PLAN_MAX_PENDING,
+        time_budget=MEAL_PLAN_TIME_BUDGET_SECONDS,
+    ):
+        self.max_pending = max_pending
+        self.time_budget = time_budget
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="meal-plan")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def plan(self, nutrient_names, targets, mask=None, meals_per_day=3, days=PLAN_DAYS):
+        """Plan ``days`` x ``meals_per_day`` recipes from the recipes in ``mask``.
+
+        Returns ``(recipe_ids, amounts)``: per day the chosen recipe ids and the
+        per-nutrient amounts of each of them. Raises MealPlannerBusy or
+        MealPlanTimeout.
+        """
+        # Database reads stay on the request thread, which owns the session
+        nutrient_matrix.ensure_loaded()
+        recipe_rating_scores.ensure_loaded()
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                logger.warning(f"Meal plan rejected: {self._pending} plans pending")
+                raise MealPlannerBusy()
+            self._pending += 1
+        deadline = time.monotonic() + self.time_budget
+        try:
+            future = self._executor.submit(
+                self._solve, nutrient_names, targets, mask, meals_per_day, days, deadline
+            )
+        except BaseException:
+            self._finish()
+            raise
+        # The slot stays taken until the job is done, even if this request gave up on it
+        future.add_done_callback(lambda _: self._finish())
+        try:
+            return future.result(timeout=self.time_budget)
+        except FutureTimeoutError:
+            # Drops a plan that never started; a running one stops at its deadline
+            future.cancel()
+            raise MealPlanTimeout()
+
+    def _finish(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _solve(self, nutrient_names, targets, mask, meals_per_day, days, deadline):
+        recipe_ids, amounts = nutrient_matrix.block(nutrient_names, mask)
+        # Rows without any amounts are unused ids or recipes without nutrition
+        present = amounts.any(axis=1)
+        recipe_ids, amounts = recipe_ids[present], amounts[present]
+        ratings = recipe_rating_scores.lookup(recipe_ids)
+
+        plan = solve_meal_plan(
+            amounts, np.asarray(targets, dtype=np.float32), ratings, days, meals_per_day, deadline
+        )
+        return (
+            [[int(recipe_ids[position]) for position in day] for day in plan],
+            [[amounts[position] for position in day] for day in plan],
+        )
+
+
+recipe_rating_scores = RecipeRatingScores()
+meal_planner = MealPlanner()
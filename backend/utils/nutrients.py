@@ -0,0 +1,239 @@
+import json
+import logging
+import operator
+import os
+import re
+import tempfile
+import threading
+import time
+
+import numpy as np
+from config.database import db
+from config.settings import NUTRIENT_MATRIX_DIR
+from sqlalchemy.sql import text
+
+logger = logging.getLogger(__name__)
+
+MATRIX_FILE = "matrix.npy"
+NAMES_FILE = "nutrients.json"
+# Spare rows allocated past the highest recipe id, so new recipes rarely force a rebuild
+ROW_HEADROOM = 1024
+# Seconds between checks for a matrix rebuilt by another process
+RELOAD_CHECK_SECONDS = 5
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "=": operator.eq,
+}
+_CONSTRAINT_RE = re.compile(r"^\s*([A-Za-z][A-Za-z0-9 ]*?)\s*(<=|>=|<|>|=)\s*(\d+(?:\.\d+)?)\s*$")
+
+
+def parse_constraints(spec):
+    """Parse ``"calories<500,protein>=30"`` into ``[(name, op, value), ...]``.
+
+    Raises ValueError for a malformed constraint.
+    """
+    constraints = []
+    for part in re.split(r"[,&]", spec):
+        if not part.strip():
+            continue
+        match = _CONSTRAINT_RE.match(part)
+        if not match:
+            raise ValueError(f"Invalid nutrient constraint: {part.strip()}")
+        name, op, value = match.groups()
+        constraints.append((name, op, float(value)))
+    return constraints
+
+
+def _write_replace(path, mode, write):
+    # A temp file of our own next to the target, so concurrent builds never
+    # write into the same file, then an atomic swap into place
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def build_nutrient_matrix(matrix_dir=NUTRIENT_MATRIX_DIR):
+    """Pivot ``contains`` into a recipe x nutrient float32 matrix on disk.
+
+    Row ``i`` holds recipe_id ``i`` and missing amounts are NaN. The matrix is
+    stored column-major so each nutrient is one contiguous array.
+    """
+    started = time.monotonic()
+    names = [
+        row.name for row in db.session.execute(text("SELECT name FROM nutrition ORDER BY name"))
+    ]
+    rows = db.session.execute(text("SELECT recipe_id, nutrition_name, amount FROM contains"))
+    max_id = db.session.execute(text("SELECT MAX(recipe_id) FROM recipe")).scalar() or 0
+
+    columns = {name.lower(): position for position, name in enumerate(names)}
+    matrix = np.full((max_id + 1 + ROW_HEADROOM, len(names)), np.nan, dtype=np.float32, order="F")
+    count = 0
+    for row in rows:
+        column = columns.get(row.nutrition_name.lower())
+        if column is not None and row.recipe_id < matrix.shape[0]:
+            matrix[row.recipe_id, column] = float(row.amount)
+            count += 1
+
+    os.makedirs(matrix_dir, exist_ok=True)
+    _write_replace(os.path.join(matrix_dir, NAMES_FILE), "w", lambda f: json.dump(names, f))
+    _write_replace(os.path.join(matrix_dir, MATRIX_FILE), "wb", lambda f: np.save(f, matrix))
+    logger.info(
+        f"Built nutrient matrix {matrix.shape[0]}x{matrix.shape[1]} from {count} amounts "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+    return matrix_dir
+
+
+class NutrientMatrix:
+    """Memory-mapped recipe x nutrient amounts for vectorized range filters.
+
+    The file is mapped read-write, so updates from ``set_amount`` are shared
+    with other worker processes through the page cache and survive restarts.
+    A recipe id or nutrient outside the matrix triggers a rebuild from
+    ``contains``.
+    """
+
+    def __init__(self, matrix_dir=NUTRIENT_MATRIX_DIR):
+        self.matrix_dir = matrix_dir
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._columns = {}  # lowercased nutrient name -> column
+        self._names = []
+        self._inode = None
+        self._checked_at = 0.0
+
+    @property
+    def names(self):
+        self.ensure_loaded()
+        return list(self._names)
+
+    def ensure_loaded(self):
+        now = time.monotonic()
+        if self._matrix is not None and now - self._checked_at < RELOAD_CHECK_SECONDS:
+            return
+        with self._lock:
+            self._checked_at = now
+            path = os.path.join(self.matrix_dir, MATRIX_FILE)
+            if not os.path.exists(path):
+                build_nutrient_matrix(self.matrix_dir)
+            if os.stat(path).st_ino != self._inode:
+                self._open()
+
+    def column_index(self, name):
+        self.ensure_loaded()
+        return self._columns.get(name.lower())
+
+    def matching(self, constraints):
+        """Bool mask over recipe ids satisfying every ``(name, op, value)`` constraint.
+
+        Raises ValueError for an unknown nutrient.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            mask = np.ones(self._matrix.shape[0], dtype=bool)
+            for name, op, value in constraints:
+                column = self._columns.get(name.lower())
+                if column is None:
+                    raise ValueError(f"Unknown nutrient: {name}")
+                mask &= OPERATORS[op](self._matrix[:, column], value)
+            return mask
+
+    def values(self, name, recipe_ids):
+        """Amounts of one nutrient for ``recipe_ids`` (NaN where unknown)."""
+        self.ensure_loaded()
+        recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        result = np.full(len(recipe_ids), np.nan, dtype=np.float32)
+        with self._lock:
+            column = self._columns.get(name.lower())
+            if column is None:
+                return result
+            inside = recipe_ids < self._matrix.shape[0]
+            result[inside] = self._matrix[recipe_ids[inside], column]
+        return result
+
+    def block(self, names, mask=None):
+        """Dense amounts of ``names`` for the recipes in ``mask`` (all rows by default).
+
+        Returns ``(recipe_ids, block)`` where ``block[i, j]`` is nutrient
+        ``names[j]`` of ``recipe_ids[i]``; unknown amounts and unknown nutrients
+        are 0.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            columns = [self._columns.get(name.lower()) for name in names]
+            known = [position for position, column in enumerate(columns) if column is not None]
+            # Column-major storage makes the column gather a few contiguous copies
+            gathered = self._matrix[:, [columns[position] for position in known]]
+        if mask is not None:
+            recipe_ids = np.flatnonzero(mask[: gathered.shape[0]])
+            gathered = gathered[recipe_ids]
+        else:
+            recipe_ids = np.arange(gathered.shape[0])
+        block = np.zeros((len(recipe_ids), len(names)), dtype=np.float32)
+        block[:, known] = np.nan_to_num(gathered, copy=False)
+        return recipe_ids, block
+
+    def top_scores(self, weights, limit, mask=None):
+        """Recipes with the highest ``amounts @ weights`` over the named nutrients.
+
+        ``weights`` maps nutrient name -> weight per unit; unknown amounts count
+        as 0 and ``mask`` restricts the candidate recipe ids. Returns
+        ``[(recipe_id, score), ...]`` with positive scores only, best first.
+        """
+        weights = {name: weight for name, weight in weights.items() if weight}
+        if not weights:
+            return []
+        recipe_ids, block = self.block(list(weights), mask)
+        scores = block @ np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = top[scores[top] > 0]
+        return [(int(recipe_ids[i]), float(scores[i])) for i in top]
+
+    def set_amount(self, recipe_id, name, amount):
+        """Write one committed ``contains`` row through to the mapped matrix."""
+        with self._lock:
+            if self._matrix is None:
+                return
+            column = self._columns.get(name.lower())
+            if column is None or recipe_id >= self._matrix.shape[0]:
+                # The row is already committed, so a rebuild picks it up
+                build_nutrient_matrix(self.matrix_dir)
+                self._open()
+                return
+            self._matrix[recipe_id, column] = np.nan if amount is None else float(amount)
+
+    def remove_recipe(self, recipe_id):
+        with self._lock:
+            if self._matrix is not None and recipe_id < self._matrix.shape[0]:
+                self._matrix[recipe_id, :] = np.nan
+
+    def _open(self):
+        path = os.path.join(self.matrix_dir, MATRIX_FILE)
+        with open(os.path.join(self.matrix_dir, NAMES_FILE)) as f:
+            names = json.load(f)
+        matrix = np.load(path, mmap_mode="r+")
+        if matrix.shape[1] != len(names):
+            # Caught between the two renames of a concurrent rebuild
+            build_nutrient_matrix(self.matrix_dir)
+            return self._open()
+        self._matrix = matrix
+        self._names = names
+        self._columns = {name.lower(): position for position, name in enumerate(names)}
+        self._inode = os.stat(path).st_ino
+        logger.info(f"Loaded nutrient matrix {matrix.shape[0]}x{matrix.shape[1]}")
+
+
+nutrient_matrix = NutrientMatrix()
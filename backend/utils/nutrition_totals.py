@@ -0,0 +1,105 @@
+import logging
+import time
+
+from config.database import db
+from sqlalchemy.sql import text
+
+logger = logging.getLogger(__name__)
+
+# Users rebuilt per transaction by the backfill
+BACKFILL_BATCH_USERS = 500
+
+
+def record_eaten(user_id, recipe_id, created_at):
+    """Add a recipe's nutrients to the user's daily and monthly totals in the current transaction."""
+    params = {"user_id": user_id, "recipe_id": recipe_id, "created_at": created_at}
+    db.session.execute(
+        text(
+            """
+            INSERT INTO user_daily_nutrition (user_id, day, nutrition_name, amount)
+            SELECT :user_id, DATE(:created_at), c.nutrition_name, c.amount
+            FROM contains c
+            WHERE c.recipe_id = :recipe_id
+            ON DUPLICATE KEY UPDATE amount = user_daily_nutrition.amount + c.amount
+        """
+        ),
+        params,
+    )
+    db.session.execute(
+        text(
+            """
+            INSERT INTO user_monthly_nutrition (user_id, month, nutrition_name, amount)
+            SELECT :user_id,
+                DATE_SUB(DATE(:created_at), INTERVAL DAYOFMONTH(:created_at) - 1 DAY),
+                c.nutrition_name,
+                c.amount
+            FROM contains c
+            WHERE c.recipe_id = :recipe_id
+            ON DUPLICATE KEY UPDATE amount = user_monthly_nutrition.amount + c.amount
+        """
+        ),
+        params,
+    )
+
+
+def backfill_daily_nutrition(since=None, batch_users=BACKFILL_BATCH_USERS):
+    """Rebuild user_daily_nutrition and user_monthly_nutrition from eats.
+
+    With ``since``, only months from the one containing ``since`` are rebuilt.
+    Users are processed in id ranges, one transaction per range, so the
+    rebuild never locks the whole table. Returns the number of daily rows written.
+    """
+    started = time.monotonic()
+    if since is not None:
+        since = since.replace(day=1)
+    max_user_id = db.session.execute(text("SELECT MAX(user_id) FROM user")).scalar() or 0
+
+    written = 0
+    for first in range(0, max_user_id + 1, batch_users):
+        params = {"first": first, "last": first + batch_users - 1, "since": since}
+        for table, column in (("user_daily_nutrition", "day"), ("user_monthly_nutrition", "month")):
+            db.session.execute(
+                text(
+                    f"""
+                    DELETE FROM {table}
+                    WHERE user_id BETWEEN :first AND :last
+                    {f"AND {column} >= :since" if since else ""}
+                """
+                ),
+                params,
+            )
+        result = db.session.execute(
+            text(
+                f"""
+                INSERT INTO user_daily_nutrition (user_id, day, nutrition_name, amount)
+                SELECT e.user_id, DATE(e.created_at), c.nutrition_name, SUM(c.amount)
+                FROM eats e
+                JOIN contains c ON c.recipe_id = e.recipe_id
+                WHERE e.user_id BETWEEN :first AND :last
+                {"AND e.created_at >= :since" if since else ""}
+                GROUP BY e.user_id, DATE(e.created_at), c.nutrition_name
+            """
+            ),
+            params,
+        )
+        db.session.execute(
+            text(
+                f"""
+                INSERT INTO user_monthly_nutrition (user_id, month, nutrition_name, amount)
+                SELECT user_id,
+                    DATE_SUB(day, INTERVAL DAYOFMONTH(day) - 1 DAY) AS month,
+                    nutrition_name,
+                    SUM(amount)
+                FROM user_daily_nutrition
+                WHERE user_id BETWEEN :first AND :last
+                {"AND day >= :since" if since else ""}
+                GROUP BY user_id, month, nutrition_name
+            """
+            ),
+            params,
+        )
+        db.session.commit()
+        written += result.rowcount
+
+    logger.info(f"Backfilled {written} daily nutrition rows in {time.monotonic() - started:.1f}s")
+    return written
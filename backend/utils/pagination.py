@@ -0,0 +1,51 @@
+import base64
+import json
+import math
+from decimal import Decimal, InvalidOperation
+
+
+def encode_cursor(sort, key):
+    """Opaque cursor token holding the sort order and the last row's sort key."""
+    payload = json.dumps({"sort": sort, "key": key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, sort):
+    """Return the ``[value, recipe_id]`` key stored in ``token``.
+
+    Raises ValueError if the token is malformed or its key does not fit ``sort``.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        key = payload["key"]
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("Invalid cursor") from e
+    if payload.get("sort") != sort or not isinstance(key, list):
+        raise ValueError("Cursor does not match the requested sort order")
+    check = _SORT_VALUE_CHECKS.get(sort)
+    if len(key) != 2 or not _is_int(key[1]) or (check is not None and not check(key[0])):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _is_decimal(value):
+    # Exact decimal values such as average ratings travel as strings
+    if not isinstance(value, str):
+        return False
+    try:
+        return Decimal(value).is_finite()
+    except InvalidOperation:
+        return False
+
+
+# Check of the sort value in a cursor key ``[value, recipe_id]``, per sort order
+_SORT_VALUE_CHECKS = {"relevance": _is_number, "total_time": _is_int, "rating": _is_decimal}
@@ -0,0 +1,87 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as CheckTimeout
+
+import bcrypt
+from config.settings import PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Seconds a request waits for its password check before giving up
+CHECK_TIMEOUT_SECONDS = 10
+
+
+class PasswordPoolFull(Exception):
+    """Raised when too many password checks are queued, or a check waited too long."""
+
+
+class PasswordCheckPool:
+    """Bounded thread pool for bcrypt password checks.
+
+    bcrypt releases the GIL while hashing, so the checks run in parallel on
+    the pool's threads instead of blocking request workers. Requests beyond
+    ``max_pending`` in-flight checks are rejected immediately rather than
+    queueing behind a login storm.
+    """
+
+    def __init__(self, workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._peak_pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    def check(self, password, password_hash):
+        """Return whether ``password`` matches ``password_hash``.
+
+        Raises PasswordPoolFull when the pool is full or the check times out.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                logger.warning(f"Password check rejected: {self._pending} checks pending")
+                raise PasswordPoolFull()
+            self._pending += 1
+            self._peak_pending = max(self._peak_pending, self._pending)
+        try:
+            future = self._executor.submit(
+                bcrypt.checkpw, password.encode("utf-8"), password_hash.encode("utf-8")
+            )
+        except BaseException:
+            self._finish()
+            raise
+        # The slot stays taken until bcrypt is done, even if this request gave up on it
+        future.add_done_callback(lambda _: self._finish())
+        try:
+            return future.result(timeout=CHECK_TIMEOUT_SECONDS)
+        except CheckTimeout:
+            with self._lock:
+                self._timed_out += 1
+            logger.warning(f"Password check timed out after {CHECK_TIMEOUT_SECONDS}s")
+            raise PasswordPoolFull()
+
+    def _finish(self):
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "maxPending": self.max_pending,
+                "pending": self._pending,
+                "queueDepth": max(0, self._pending - self.workers),
+                "peakPending": self._peak_pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timedOut": self._timed_out,
+            }
+
+
+password_check_pool = PasswordCheckPool()
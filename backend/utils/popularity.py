@@ -0,0 +1,122 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from config.database import db
+from sqlalchemy.sql import text
+
+logger = logging.getLogger(__name__)
+
+# Longest window answered by ``top``; older days are dropped from memory
+MAX_WINDOW_DAYS = 30
+POPULARITY_WINDOWS = (1, 7, 30)
+# Seconds between reloads of the days that can still change (today, yesterday)
+REFRESH_SECONDS = 30
+# Trending scores halve for every day an eat ages
+TRENDING_HALF_LIFE_DAYS = 1.0
+TRENDING_WINDOW_DAYS = 7
+# Ranked entries kept per window; larger limits are capped to this
+MAX_RANKED = 100
+
+
+def _today():
+    # eats.created_at is stored in UTC, so rollup days are UTC dates
+    return datetime.now(timezone.utc).date()
+
+
+class RecipePopularity:
+    """Per-day eat counts per recipe over the last ``MAX_WINDOW_DAYS`` days.
+
+    Loaded lazily from ``recipe_daily_eats``. The days that can still change
+    are reloaded every ``REFRESH_SECONDS`` so counts logged by other workers
+    show up; older days are immutable. Window totals are merged from the day
+    counters and cached until the next refresh.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._days = {}  # day -> {recipe_id: eats}
+        self._loaded_on = None
+        self._refreshed_at = 0.0
+        self._windows = {}  # (kind, days) -> best first [(recipe_id, score), ...]
+
+    def ensure_loaded(self):
+        today = _today()
+        now = time.monotonic()
+        if self._loaded_on == today and now - self._refreshed_at < REFRESH_SECONDS:
+            return
+        with self._lock:
+            if self._loaded_on == today and now - self._refreshed_at < REFRESH_SECONDS:
+                return
+            if self._loaded_on is None:
+                since = today - timedelta(days=MAX_WINDOW_DAYS - 1)
+            else:
+                since = min(self._loaded_on, today) - timedelta(days=1)
+            result = db.session.execute(
+                text(
+                    """
+                    SELECT day, recipe_id, count AS eats
+                    FROM recipe_daily_eats
+                    WHERE day >= :since
+                """
+                ),
+                {"since": since},
+            )
+            days = {day: counts for day, counts in self._days.items() if day < since}
+            for row in result:
+                days.setdefault(row.day, {})[row.recipe_id] = row.eats
+
+            oldest = today - timedelta(days=MAX_WINDOW_DAYS - 1)
+            self._days = {day: counts for day, counts in days.items() if day >= oldest}
+            self._windows = {}
+            if self._loaded_on is None:
+                logger.info(f"Recipe popularity loaded: {len(self._days)} days")
+            self._loaded_on = today
+            self._refreshed_at = now
+
+    def record(self, recipe_id, day):
+        """Count one committed eat, so this worker sees it before the next refresh."""
+        with self._lock:
+            if self._loaded_on is None or day < self._loaded_on - timedelta(days=1):
+                return
+            counts = self._days.setdefault(day, {})
+            counts[recipe_id] = counts.get(recipe_id, 0) + 1
+            self._windows = {}
+
+    def top(self, limit, days):
+        """``[(recipe_id, eats), ...]`` for the most eaten recipes of the last ``days`` days."""
+        if not 1 <= days <= MAX_WINDOW_DAYS:
+            raise ValueError(f"days must be between 1 and {MAX_WINDOW_DAYS}")
+        ranked = self._ranked("count", days)
+        return [(recipe_id, int(score)) for recipe_id, score in ranked[:limit]]
+
+    def trending(self, limit):
+        """``[(recipe_id, score), ...]`` ranked by exponentially time-decayed eats."""
+        ranked = self._ranked("trending", TRENDING_WINDOW_DAYS)
+        return [(recipe_id, round(score, 4)) for recipe_id, score in ranked[:limit]]
+
+    def _ranked(self, kind, days):
+        self.ensure_loaded()
+        with self._lock:
+            ranked = self._windows.get((kind, days))
+            if ranked is not None:
+                return ranked
+            today = self._loaded_on
+            totals = {}
+            for age in range(days):
+                counts = self._days.get(today - timedelta(days=age))
+                if not counts:
+                    continue
+                weight = 1.0 if kind == "count" else 0.5 ** (age / TRENDING_HALF_LIFE_DAYS)
+                for recipe_id, eats in counts.items():
+                    totals[recipe_id] = totals.get(recipe_id, 0.0) + eats * weight
+            ranked = heapq.nlargest(
+                MAX_RANKED, totals.items(), key=lambda item: (item[1], -item[0])
+            )
+            self._windows[(kind, days)] = ranked
+            return ranked
+
+
+recipe_popularity = RecipePopularity()
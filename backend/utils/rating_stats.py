@@ -0,0 +1,98 @@
+import logging
+import time
+
+from config.database import db
+from sqlalchemy.sql import text
+
+logger = logging.getLogger(__name__)
+
+
+def record_rating(recipe_id, rating, created_at, previous=None):
+    """Apply a rating to recipe_rating_stats and recipe_rating_daily in the current transaction.
+
+    ``previous`` is the ``(rating, created_at)`` the user's current rating of
+    the recipe held before, when this rating replaced it. It is taken out of
+    the day it was given, so every user counts once per recipe.
+    """
+    params = {
+        "recipe_id": recipe_id,
+        "rating": rating,
+        "created_at": created_at,
+        "delta": rating - (previous[0] if previous else 0),
+        "added": 0 if previous else 1,
+    }
+    db.session.execute(
+        text(
+            """
+            INSERT INTO recipe_rating_stats (recipe_id, rating_sum, rating_count)
+            VALUES (:recipe_id, :delta, :added)
+            ON DUPLICATE KEY UPDATE
+                rating_sum = recipe_rating_stats.rating_sum + :delta,
+                rating_count = recipe_rating_stats.rating_count + :added
+        """
+        ),
+        params,
+    )
+    if previous:
+        db.session.execute(
+            text(
+                """
+                UPDATE recipe_rating_daily
+                SET rating_sum = rating_sum - :previous, rating_count = rating_count - 1
+                WHERE day = DATE(:previous_at) AND recipe_id = :recipe_id
+            """
+            ),
+            {"recipe_id": recipe_id, "previous": previous[0], "previous_at": previous[1]},
+        )
+    db.session.execute(
+        text(
+            """
+            INSERT INTO recipe_rating_daily (day, recipe_id, rating_sum, rating_count)
+            VALUES (DATE(:created_at), :recipe_id, :rating, 1)
+            ON DUPLICATE KEY UPDATE
+                rating_sum = recipe_rating_daily.rating_sum + :rating,
+                rating_count = recipe_rating_daily.rating_count + 1
+        """
+        ),
+        params,
+    )
+
+
+def backfill_rating_stats():
+    """Rebuild recipe_rating_stats and recipe_rating_daily from rating.
+
+    Every recipe gets a stats row, unrated ones with zero totals, so the
+    rating sort can walk the stats index alone. Only current ratings count;
+    rating_history is not read. Returns the number of recipes written.
+    """
+    started = time.monotonic()
+    db.session.execute(text("DELETE FROM recipe_rating_stats"))
+    db.session.execute(text("DELETE FROM recipe_rating_daily"))
+    db.session.execute(
+        text(
+            """
+            INSERT INTO recipe_rating_daily (day, recipe_id, rating_sum, rating_count)
+            SELECT DATE(created_at), recipe_id, SUM(rating), COUNT(*)
+            FROM rating
+            GROUP BY DATE(created_at), recipe_id
+        """
+        )
+    )
+    result = db.session.execute(
+        text(
+            """
+            INSERT INTO recipe_rating_stats (recipe_id, rating_sum, rating_count)
+            SELECT r.recipe_id, COALESCE(SUM(rt.rating), 0), COUNT(rt.rating)
+            FROM recipe r
+            LEFT JOIN rating rt ON rt.recipe_id = r.recipe_id
+            GROUP BY r.recipe_id
+        """
+        )
+    )
+    db.session.commit()
+
+    logger.info(
+        f"Backfilled rating stats for {result.rowcount} recipes "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+    return result.rowcount
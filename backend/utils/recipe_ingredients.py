@@ -0,0 +1,70 @@
+import logging
+import time
+
+from config.database import db
+from sqlalchemy.sql import text
+from utils.text import ingredient_tokens, ingredient_words
+
+logger = logging.getLogger(__name__)
+
+# Recipes tokenized per round trip
+BACKFILL_BATCH = 1000
+
+
+def backfill_recipe_ingredients(batch_size=BACKFILL_BATCH):
+    """Rebuild recipe_ingredient and ingredient_word from recipe.ingredients.
+
+    Recipes are read in primary-key batches and tokenized with the same
+    ``ingredient_tokens`` / ``ingredient_words`` the recipe endpoints use.
+    Returns the number of tokens written.
+    """
+    started = time.monotonic()
+    db.session.execute(text("DELETE FROM recipe_ingredient"))
+    db.session.execute(text("DELETE FROM ingredient_word"))
+    written = 0
+    after = 0
+    while True:
+        rows = db.session.execute(
+            text(
+                """
+                SELECT recipe_id, ingredients FROM recipe
+                WHERE recipe_id > :after
+                ORDER BY recipe_id
+                LIMIT :batch_size
+            """
+            ),
+            {"after": after, "batch_size": batch_size},
+        ).fetchall()
+        if not rows:
+            break
+        tokens = [
+            {"recipe_id": row.recipe_id, "token": token}
+            for row in rows
+            for token in ingredient_tokens(row.ingredients)
+        ]
+        if tokens:
+            db.session.execute(
+                text(
+                    "INSERT INTO recipe_ingredient (recipe_id, token) VALUES (:recipe_id, :token)"
+                ),
+                tokens,
+            )
+        words = {pair for row in rows for pair in ingredient_words(row.ingredients)}
+        if words:
+            insert_ingredient_words(words)
+        written += len(tokens)
+        after = rows[-1].recipe_id
+    db.session.commit()
+
+    logger.info(
+        f"Backfilled {written} recipe ingredient tokens in {time.monotonic() - started:.1f}s"
+    )
+    return written
+
+
+def insert_ingredient_words(words):
+    """Add ``(word, token)`` pairs to ingredient_word in the current transaction."""
+    db.session.execute(
+        text("INSERT IGNORE INTO ingredient_word (word, token) VALUES (:word, :token)"),
+        [{"word": word, "token": token} for word, token in sorted(words)],
+    )
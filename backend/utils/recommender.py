@@ -0,0 +1,278 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+import numpy as np
+from config.database import db
+from config.settings import RECOMMENDER_MODEL_DIR
+from scipy import sparse
+from sqlalchemy.sql import text
+
+logger = logging.getLogger(__name__)
+
+# Pointer file naming the model version currently served
+CURRENT_FILE = "CURRENT"
+# Items whose similarity rows are computed per worker task
+CHUNK_SIZE = 256
+# Seconds between checks for a newer model version
+RELOAD_CHECK_SECONDS = 60
+# Model versions kept on disk (the served one and its predecessor)
+KEEP_VERSIONS = 2
+
+_worker_matrix = None
+
+
+def _init_worker(matrix):
+    global _worker_matrix
+    _worker_matrix = matrix
+
+
+def _top_k_rows(chunk, top_k):
+    """Top-K cosine neighbours for the item columns in ``chunk``.
+
+    The similarity block stays sparse: only items sharing a user have a
+    nonzero score, so each row is ranked over its nonzeros alone.
+    """
+    block = sparse.csr_matrix(_worker_matrix[:, chunk].T @ _worker_matrix)
+    neighbors = np.full((len(chunk), top_k), -1, dtype=np.int64)
+    scores = np.zeros((len(chunk), top_k), dtype=np.float32)
+    for row, item in enumerate(chunk):
+        start, end = block.indptr[row], block.indptr[row + 1]
+        columns, values = block.indices[start:end], block.data[start:end]
+        keep = (columns != item) & (values > 0)  # an item is not its own neighbour
+        columns, values = columns[keep], values[keep]
+        k = min(top_k, len(values))
+        if not k:
+            continue
+        top = np.argpartition(-values, k - 1)[:k] if len(values) > k else np.arange(k)
+        top = top[np.argsort(-values[top], kind="stable")]
+        neighbors[row, :k] = columns[top]
+        scores[row, :k] = values[top]
+    return chunk, neighbors, scores
+
+
+def _load_interactions():
+    """Return (user_ids, recipe_ids, weights) for every user/recipe interaction.
+
+    Eating a recipe counts 1; a rating shifts that by (rating - 3) / 2, so a
+    5-star recipe weighs 2 and a 1-star recipe 0.
+    """
+    eats = db.session.execute(text("SELECT DISTINCT user_id, recipe_id FROM eats")).fetchall()
+    ratings = db.session.execute(text("SELECT user_id, recipe_id, rating FROM rating")).fetchall()
+
+    users = np.array(
+        [row.user_id for row in eats] + [row.user_id for row in ratings], dtype=np.int64
+    )
+    items = np.array(
+        [row.recipe_id for row in eats] + [row.recipe_id for row in ratings], dtype=np.int64
+    )
+    weights = np.concatenate(
+        [
+            np.ones(len(eats), dtype=np.float32),
+            (np.array([float(row.rating) for row in ratings], dtype=np.float32) - 3) / 2,
+        ]
+    )
+    return users, items, weights
+
+
+def _touched_items(since):
+    result = db.session.execute(
+        text(
+            """
+            SELECT DISTINCT recipe_id FROM eats WHERE created_at >= :since
+            UNION
+            SELECT DISTINCT recipe_id FROM rating WHERE created_at >= :since
+        """
+        ),
+        {"since": since},
+    )
+    return np.array(sorted(row.recipe_id for row in result), dtype=np.int64)
+
+
+def build_item_neighbors(
+    model_dir=RECOMMENDER_MODEL_DIR, top_k=50, workers=None, incremental=False
+):
+    """Compute item-item cosine neighbours from eats and ratings on a process pool.
+
+    The top-K neighbours of every recipe are written as ``.npy`` files into a
+    new version directory, which is then published through ``CURRENT``.
+
+    With ``incremental=True`` only recipes with interactions since the last
+    build are recomputed; the other rows are copied from the current model.
+    Returns the path of the new model version.
+    """
+    started = time.monotonic()
+    built_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    users, items, weights = _load_interactions()
+
+    user_ids, user_index = np.unique(users, return_inverse=True)
+    item_ids, item_index = np.unique(items, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (weights, (user_index, item_index)), shape=(len(user_ids), len(item_ids)), dtype=np.float32
+    )
+    matrix.data = np.maximum(matrix.data, 0)
+    matrix.eliminate_zeros()
+
+    # Normalise item columns so the dot products below are cosine similarities
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1.0
+    matrix = sparse.csc_matrix(matrix @ sparse.diags(1.0 / norms).astype(np.float32))
+
+    neighbors = np.full((len(item_ids), top_k), -1, dtype=np.int32)
+    scores = np.zeros((len(item_ids), top_k), dtype=np.float32)
+    positions = np.arange(len(item_ids))
+
+    previous = ItemNeighborModel(model_dir).load() if incremental else None
+    if previous is not None and previous.neighbors.shape[1] == top_k:
+        touched = np.searchsorted(item_ids, _touched_items(previous.built_at))
+        stale = np.zeros(len(item_ids), dtype=bool)
+        stale[touched[touched < len(item_ids)]] = True
+        prev_positions = np.searchsorted(previous.item_ids, item_ids)
+        prev_positions[prev_positions >= len(previous.item_ids)] = 0
+        known = previous.item_ids[prev_positions] == item_ids
+        stale |= ~known
+        copy = ~stale
+        neighbors[copy] = previous.neighbors[prev_positions[copy]]
+        scores[copy] = previous.scores[prev_positions[copy]]
+        positions = positions[stale]
+        logger.info(f"Incremental build: recomputing {len(positions)} of {len(item_ids)} items")
+
+    chunks = [positions[i : i + CHUNK_SIZE] for i in range(0, len(positions), CHUNK_SIZE)]
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(matrix,)
+    ) as executor:
+        for chunk, chunk_neighbors, chunk_scores in executor.map(
+            _top_k_rows, chunks, [top_k] * len(chunks)
+        ):
+            valid = chunk_neighbors >= 0
+            # Neighbours are stored as recipe ids so rows survive catalog changes
+            neighbors[chunk] = np.where(valid, item_ids[np.maximum(chunk_neighbors, 0)], -1)
+            scores[chunk] = chunk_scores
+
+    version = built_at.strftime("%Y%m%dT%H%M%S")
+    version_dir = os.path.join(model_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+    np.save(os.path.join(version_dir, "item_ids.npy"), item_ids.astype(np.int32))
+    np.save(os.path.join(version_dir, "neighbors.npy"), neighbors)
+    np.save(os.path.join(version_dir, "scores.npy"), scores)
+    with open(os.path.join(version_dir, "built_at.txt"), "w") as f:
+        f.write(built_at.isoformat())
+
+    # Publish atomically: readers only ever see a complete version
+    pointer = os.path.join(model_dir, CURRENT_FILE)
+    with open(pointer + ".tmp", "w") as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+    _prune_versions(model_dir)
+
+    logger.info(
+        f"Built item neighbours for {len(item_ids)} recipes from {len(weights)} interactions "
+        f"in {time.monotonic() - started:.1f}s"
+    )
+    return version_dir
+
+
+def _prune_versions(model_dir):
+    versions = sorted(
+        name
+        for name in os.listdir(model_dir)
+        if os.path.isdir(os.path.join(model_dir, name)) and name[:1].isdigit()
+    )
+    for name in versions[:-KEEP_VERSIONS]:
+        version_dir = os.path.join(model_dir, name)
+        for filename in os.listdir(version_dir):
+            os.remove(os.path.join(version_dir, filename))
+        os.rmdir(version_dir)
+
+
+class ModelSnapshot(NamedTuple):
+    """One published model version, replaced as a whole on reload."""
+
+    version: str
+    item_ids: np.ndarray
+    neighbors: np.ndarray
+    scores: np.ndarray
+    built_at: datetime
+
+
+class ItemNeighborModel:
+    """Memory-mapped top-K neighbour lists produced by ``build_item_neighbors``.
+
+    A reload publishes a new ``ModelSnapshot`` with a single assignment, so
+    readers holding the previous one never mix arrays of two versions.
+    """
+
+    def __init__(self, model_dir=RECOMMENDER_MODEL_DIR):
+        self.model_dir = model_dir
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+
+    def load(self):
+        """(Re)load the current version if it changed. Returns the served snapshot, or None."""
+        now = time.monotonic()
+        snapshot = self._snapshot
+        if snapshot is not None and now - self._checked_at < RELOAD_CHECK_SECONDS:
+            return snapshot
+        with self._lock:
+            self._checked_at = now
+            try:
+                with open(os.path.join(self.model_dir, CURRENT_FILE)) as f:
+                    version = f.read().strip()
+            except FileNotFoundError:
+                return self._snapshot
+            if self._snapshot is not None and version == self._snapshot.version:
+                return self._snapshot
+
+            version_dir = os.path.join(self.model_dir, version)
+            with open(os.path.join(version_dir, "built_at.txt")) as f:
+                built_at = datetime.fromisoformat(f.read().strip())
+            self._snapshot = ModelSnapshot(
+                version=version,
+                item_ids=np.load(os.path.join(version_dir, "item_ids.npy"), mmap_mode="r"),
+                neighbors=np.load(os.path.join(version_dir, "neighbors.npy"), mmap_mode="r"),
+                scores=np.load(os.path.join(version_dir, "scores.npy"), mmap_mode="r"),
+                built_at=built_at,
+            )
+            logger.info(
+                f"Loaded recommendation model {version} ({len(self._snapshot.item_ids)} recipes)"
+            )
+            return self._snapshot
+
+    def recommend(self, history, exclude, limit):
+        """Recipes most similar to the ``history`` recipe ids, skipping ``exclude``."""
+        model = self.load() if history else None
+        if model is None or not len(model.item_ids):
+            return []
+
+        history = np.asarray(history, dtype=np.int32)
+        positions = np.minimum(np.searchsorted(model.item_ids, history), len(model.item_ids) - 1)
+        positions = positions[model.item_ids[positions] == history]
+        if not len(positions):
+            return []
+
+        candidates = np.asarray(model.neighbors[positions]).ravel()
+        weights = np.asarray(model.scores[positions]).ravel()
+        valid = candidates >= 0
+        candidates, weights = candidates[valid], weights[valid]
+        if exclude:
+            keep = ~np.isin(candidates, np.fromiter(exclude, dtype=np.int64, count=len(exclude)))
+            candidates, weights = candidates[keep], weights[keep]
+        if not len(candidates):
+            return []
+
+        recipe_ids, inverse = np.unique(candidates, return_inverse=True)
+        totals = np.bincount(inverse, weights=weights)
+        if len(totals) > limit:
+            top = np.argpartition(-totals, limit - 1)[:limit]
+        else:
+            top = np.arange(len(totals))
+        top = top[np.argsort(-totals[top], kind="stable")]
+        return [int(recipe_id) for recipe_id in recipe_ids[top]]
+
+
+item_neighbor_model = ItemNeighborModel()
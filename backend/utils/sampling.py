@@ -0,0 +1,91 @@
+import logging
+import random
+import threading
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+from config.database import db
+from sqlalchemy.sql import text
+
+logger = logging.getLogger(__name__)
+
+# Random probes tried per requested id before giving up on filling a sample
+MAX_PROBES_PER_ID = 8
+
+
+def make_rng(seed=None):
+    """Return a random generator, reproducible when a seed is given."""
+    if seed is None or seed == "":
+        return random.Random()
+    try:
+        return random.Random(int(seed))
+    except (TypeError, ValueError):
+        return random.Random(str(seed))
+
+
+class RecipeIdPool:
+    """Sorted array of all recipe ids used to draw random recipes in O(limit).
+
+    Loaded lazily from the recipe primary key and kept in sync by the recipe
+    controller, so sampling never needs ``ORDER BY RAND()``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._ids = array("I")
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            result = db.session.execute(text("SELECT recipe_id FROM recipe ORDER BY recipe_id"))
+            self._ids = array("I", (row.recipe_id for row in result))
+            self._loaded = True
+            logger.info(f"Recipe id pool loaded: {len(self._ids)} recipes")
+
+    def add(self, recipe_id):
+        with self._lock:
+            if not self._loaded:
+                return
+            position = bisect_left(self._ids, recipe_id)
+            if position == len(self._ids) or self._ids[position] != recipe_id:
+                self._ids.insert(position, recipe_id)
+
+    def remove(self, recipe_id):
+        with self._lock:
+            if not self._loaded:
+                return
+            position = bisect_left(self._ids, recipe_id)
+            if position < len(self._ids) and self._ids[position] == recipe_id:
+                del self._ids[position]
+
+    def ids(self):
+        """Copy of all recipe ids as a sorted uint32 array."""
+        self.ensure_loaded()
+        with self._lock:
+            return np.frombuffer(self._ids, dtype=np.uint32).copy()
+
+    def random_ids(self, count, rng, exclude=()):
+        """Draw up to ``count`` distinct random recipe ids not in ``exclude``."""
+        self.ensure_loaded()
+        picked = []
+        seen = set(exclude)
+        with self._lock:
+            size = len(self._ids)
+            if not size:
+                return picked
+            for _ in range(count * MAX_PROBES_PER_ID):
+                recipe_id = self._ids[rng.randrange(size)]
+                if recipe_id not in seen:
+                    seen.add(recipe_id)
+                    picked.append(recipe_id)
+                    if len(picked) == count:
+                        break
+        return picked
+
+
+recipe_id_pool = RecipeIdPool()
@@ -0,0 +1,226 @@
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+
+from config.database import db
+from sqlalchemy.sql import text
+from utils.text import split_words, stem
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Maximum number of index terms a trailing prefix may expand to
+MAX_PREFIX_EXPANSIONS = 64
+# Seconds between full rebuilds, which pick up recipes written through other workers
+REBUILD_SECONDS = 300
+# Attributes swapped in as a whole when the index is rebuilt
+_STATE = ("_postings", "_doc_terms", "_doc_words", "_word_docs", "_vocab", "_total_length")
+
+
+class RecipeSearchIndex:
+    """In-process inverted index over recipe names with BM25 ranking.
+
+    The index is loaded lazily from the ``recipe`` table on first use and kept
+    in sync by the recipe controller through ``add`` / ``remove``. Those only
+    reach the worker that handled the write, so the index is also rebuilt
+    every ``REBUILD_SECONDS``; one request rebuilds while the others keep
+    searching the current index.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        self._loaded_at = None
+        self._changes = None  # [(recipe_id, recipe_name or None)] made during a rebuild
+        self._postings = {}  # term -> {recipe_id: term frequency}
+        self._doc_terms = {}  # recipe_id -> Counter of terms
+        self._doc_words = {}  # recipe_id -> set of unstemmed words
+        self._word_docs = {}  # unstemmed word -> number of recipes using it
+        self._vocab = []  # sorted unstemmed words, used for prefix expansion
+        self._total_length = 0
+
+    def ensure_loaded(self):
+        if self._loaded_at is None:
+            with self._lock:
+                if self._loaded_at is None:
+                    self._fill()
+                    self._loaded_at = time.monotonic()
+                    logger.info(
+                        f"Recipe search index loaded: {len(self._doc_terms)} recipes, "
+                        f"{len(self._postings)} terms"
+                    )
+            return
+        if time.monotonic() - self._loaded_at < REBUILD_SECONDS:
+            return
+        if not self._rebuild_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() - self._loaded_at >= REBUILD_SECONDS:
+                self._rebuild()
+        finally:
+            self._rebuild_lock.release()
+
+    def add(self, recipe_id, recipe_name):
+        """Index (or re-index) a recipe. No-op until the index has been loaded."""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            if self._changes is not None:
+                self._changes.append((recipe_id, recipe_name))
+            self._remove(recipe_id)
+            self._add(recipe_id, recipe_name)
+
+    def remove(self, recipe_id):
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            if self._changes is not None:
+                self._changes.append((recipe_id, None))
+            self._remove(recipe_id)
+
+    def search(self, query):
+        """Return ``[(recipe_id, score), ...]`` for recipes matching every query term.
+
+        The last word is treated as a prefix of the unstemmed recipe words, so
+        results update while the user is still typing ("baki" finds "Baking"). Results are ordered by score, best first.
+        """
+        self.ensure_loaded()
+        words = split_words(query)
+        if not words:
+            return []
+        terms = [stem(word) for word in words]
+
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            if not n_docs:
+                return []
+            avg_length = self._total_length / n_docs
+
+            # Each query term maps to one or more index terms (prefix expansion)
+            term_groups = [[term] for term in terms[:-1] if term in self._postings]
+            if len(term_groups) < len(terms) - 1:
+                return []
+            last_group = self._expand_prefix(words[-1])
+            if not last_group:
+                return []
+            term_groups.append(last_group)
+
+            # Intersect candidates starting from the most selective group
+            group_docs = [self._group_docs(group) for group in term_groups]
+            group_docs.sort(key=len)
+            candidates = set(group_docs[0])
+            for docs in group_docs[1:]:
+                candidates.intersection_update(docs)
+                if not candidates:
+                    return []
+
+            scores = dict.fromkeys(candidates, 0.0)
+            for group in term_groups:
+                for term in group:
+                    postings = self._postings[term]
+                    idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for recipe_id in candidates.intersection(postings):
+                        tf = postings[recipe_id]
+                        length = sum(self._doc_terms[recipe_id].values())
+                        norm = K1 * (1 - B + B * length / avg_length)
+                        scores[recipe_id] += idf * tf * (K1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def _expand_prefix(self, word):
+        # The stem of a finished word may not extend the stem of the partial
+        # word ("baki" vs "bak"), so the raw word is matched against raw words
+        matches = []
+        term = stem(word)
+        if term in self._postings:
+            matches.append(term)
+        start = bisect_left(self._vocab, word)
+        for vocab_word in self._vocab[start:]:
+            if not vocab_word.startswith(word) or len(matches) >= MAX_PREFIX_EXPANSIONS:
+                break
+            term = stem(vocab_word)
+            if term not in matches:
+                matches.append(term)
+        return matches
+
+    def _group_docs(self, group):
+        if len(group) == 1:
+            return self._postings[group[0]].keys()
+        docs = set()
+        for term in group:
+            docs.update(self._postings[term])
+        return docs
+
+    def _fill(self):
+        result = db.session.execute(text("SELECT recipe_id, recipe_name FROM recipe"))
+        for row in result:
+            self._add(row.recipe_id, row.recipe_name, update_vocab=False)
+        self._vocab = sorted(self._word_docs)
+
+    def _rebuild(self):
+        started = time.monotonic()
+        with self._lock:
+            self._changes = []
+        try:
+            fresh = RecipeSearchIndex()
+            fresh._fill()
+        except Exception:
+            with self._lock:
+                self._changes = None
+            raise
+        with self._lock:
+            for name in _STATE:
+                setattr(self, name, getattr(fresh, name))
+            # Writes this worker made while the rows were read may be missing from them
+            for recipe_id, recipe_name in self._changes:
+                self._remove(recipe_id)
+                if recipe_name is not None:
+                    self._add(recipe_id, recipe_name)
+            self._changes = None
+            self._loaded_at = time.monotonic()
+        logger.info(
+            f"Recipe search index rebuilt: {len(self._doc_terms)} recipes "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+
+    def _add(self, recipe_id, recipe_name, update_vocab=True):
+        words = split_words(recipe_name)
+        terms = Counter(stem(word) for word in words)
+        self._doc_terms[recipe_id] = terms
+        self._total_length += sum(terms.values())
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[recipe_id] = tf
+        doc_words = set(words)
+        self._doc_words[recipe_id] = doc_words
+        for word in doc_words:
+            count = self._word_docs.get(word, 0)
+            if not count and update_vocab:
+                insort(self._vocab, word)
+            self._word_docs[word] = count + 1
+
+    def _remove(self, recipe_id):
+        terms = self._doc_terms.pop(recipe_id, None)
+        if terms is None:
+            return
+        self._total_length -= sum(terms.values())
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(recipe_id, None)
+            if not postings:
+                del self._postings[term]
+        for word in self._doc_words.pop(recipe_id):
+            count = self._word_docs[word] - 1
+            if count:
+                self._word_docs[word] = count
+            else:
+                del self._word_docs[word]
+                del self._vocab[bisect_left(self._vocab, word)]
+
+
+recipe_search_index = RecipeSearchIndex()
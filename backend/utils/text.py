@@ -0,0 +1,71 @@
+import re
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_VOWELS = "aeiou"
+
+# Width of recipe_ingredient.token and ingredient_word.word
+MAX_TOKEN_LENGTH = 45
+
+STOPWORDS = frozenset(
+    {"a", "an", "and", "as", "at", "by", "for", "from", "in", "of", "on", "or", "the", "to", "with"}
+)
+
+
+def stem(word):
+    """Light Porter-style stemmer, e.g. "tomatoes" -> "tomato", "baked" -> "bak"."""
+    if len(word) <= 3 or word.isdigit():
+        return word
+
+    if word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "i"
+    elif word.endswith(("ches", "shes", "sses", "xes", "zes", "oes")):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    elif word.endswith("ing") and len(word) > 5 and _has_vowel(word[:-3]):
+        word = _undouble(word[:-3])
+    elif word.endswith("ed") and len(word) > 4 and _has_vowel(word[:-2]):
+        word = _undouble(word[:-2])
+
+    if len(word) > 3 and word.endswith("y") and word[-2] not in _VOWELS:
+        word = word[:-1] + "i"
+    elif len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def _has_vowel(word):
+    return any(char in _VOWELS for char in word)
+
+
+def _undouble(word):
+    if len(word) > 2 and word[-1] == word[-2] and word[-1] not in "flsz":
+        return word[:-1]
+    return word
+
+
+def split_words(text):
+    """Split free text into lowercase words with stopwords removed, without stemming."""
+    if not text:
+        return []
+    return [word for word in _TOKEN_RE.findall(text.lower()) if word not in STOPWORDS]
+
+
+def tokenize(text):
+    """Split free text into lowercase, stemmed tokens with stopwords removed."""
+    return [stem(word) for word in split_words(text)]
+
+
+def ingredient_tokens(ingredients):
+    """Distinct tokens of a recipe's ``^``-separated ingredients, as stored in recipe_ingredient."""
+    return sorted({token[:MAX_TOKEN_LENGTH] for token in tokenize(ingredients)})
+
+
+def ingredient_words(ingredients):
+    """Distinct ``(word, token)`` pairs of a recipe's ingredients, as stored in ingredient_word."""
+    return sorted(
+        {
+            (word[:MAX_TOKEN_LENGTH], stem(word)[:MAX_TOKEN_LENGTH])
+            for word in split_words(ingredients)
+        }
+    )
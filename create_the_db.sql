@@ -8,6 +8,25 @@ CREATE TABLE dbs.recipe (
     directions TEXT NOT NULL,
     ingredients TEXT NOT NULL
 );
+-- Keyset pagination for search sorted by cooking time
+CREATE INDEX idx_recipe_total_time ON dbs.recipe (total_time, recipe_id);
+
+-- Ingredient tokens per recipe (built from recipe.ingredients), used by the ingredient search filter
+-- (fill with `flask backfill-recipe-ingredients` after loading recipes)
+CREATE TABLE dbs.recipe_ingredient (
+    recipe_id INT NOT NULL,                 -- Reference to the recipe
+    token VARCHAR(45) NOT NULL,             -- Lowercased, stemmed ingredient word
+    PRIMARY KEY (token, recipe_id),
+    FOREIGN KEY (recipe_id) REFERENCES dbs.recipe(recipe_id) ON DELETE CASCADE
+);
+CREATE INDEX idx_recipe_ingredient_recipe_id ON dbs.recipe_ingredient (recipe_id);
+
+-- Unstemmed ingredient words and their recipe_ingredient token, so the ingredient
+-- filter can prefix-match a partly typed word (filled together with recipe_ingredient)
+CREATE TABLE dbs.ingredient_word (
+    word VARCHAR(45) PRIMARY KEY,           -- Lowercased, unstemmed ingredient word
+    token VARCHAR(45) NOT NULL              -- The word's token in recipe_ingredient
+);
 
 -- User table
 CREATE TABLE dbs.user (
@@ -31,6 +50,15 @@ CREATE TABLE dbs.admin (
     FOREIGN KEY (user_id) REFERENCES dbs.user(user_id) ON DELETE CASCADE
 );
 
+-- Token version per user: JWTs whose `ver` claim is below min_version are revoked
+CREATE TABLE dbs.token_revocation (
+    user_id INT PRIMARY KEY,
+    min_version INT NOT NULL DEFAULT 0,
+    revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES dbs.user(user_id) ON DELETE CASCADE
+);
+CREATE INDEX idx_token_revocation_revoked_at ON dbs.token_revocation (revoked_at);
+
 -- Diet Table
 CREATE TABLE dbs.diet (
     diet_id INT AUTO_INCREMENT PRIMARY KEY,
@@ -84,18 +112,96 @@ CREATE TABLE dbs.eats (
 );
 CREATE INDEX idx_user_id_created_at ON dbs.eats (user_id, created_at);
 
+-- Nutrients eaten per user and day, kept up to date by POST /api/eats/eats
+-- (rebuild with `flask backfill-daily-nutrition`)
+CREATE TABLE dbs.user_daily_nutrition (
+    user_id INT NOT NULL,                   -- Reference to the user
+    day DATE NOT NULL,                      -- DATE(eats.created_at)
+    nutrition_name VARCHAR(45) NOT NULL,    -- Reference to the nutrition
+    amount DECIMAL(12, 2) NOT NULL DEFAULT 0, -- Sum of contains.amount over the day's eats
+    PRIMARY KEY (user_id, day, nutrition_name),
+    FOREIGN KEY (user_id) REFERENCES dbs.user(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (nutrition_name) REFERENCES dbs.nutrition(name) ON DELETE CASCADE
+);
+-- Recent days of one nutrient across users (the calorie window refresh)
+CREATE INDEX idx_user_daily_nutrition_name_day ON dbs.user_daily_nutrition (nutrition_name, day);
+
+-- Monthly roll-up of user_daily_nutrition, maintained alongside it
+CREATE TABLE dbs.user_monthly_nutrition (
+    user_id INT NOT NULL,                   -- Reference to the user
+    month DATE NOT NULL,                    -- First day of the month
+    nutrition_name VARCHAR(45) NOT NULL,    -- Reference to the nutrition
+    amount DECIMAL(14, 2) NOT NULL DEFAULT 0, -- Sum of the month's daily amounts
+    PRIMARY KEY (user_id, month, nutrition_name),
+    FOREIGN KEY (user_id) REFERENCES dbs.user(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (nutrition_name) REFERENCES dbs.nutrition(name) ON DELETE CASCADE
+);
+
+-- Eats per day across all users, kept up to date by POST /api/eats/eats
+-- (reconcile with `flask reconcile-eats-counts`)
+CREATE TABLE dbs.eats_daily_counts (
+    day DATE PRIMARY KEY,                   -- DATE(eats.created_at)
+    count INT NOT NULL DEFAULT 0,           -- Eats logged that day
+    cumulative BIGINT NOT NULL DEFAULT 0    -- Eats logged up to and including that day
+);
 
--- Rating (User-Recipe) Relationship
+-- Eats per recipe and day, kept up to date by POST /api/eats/eats
+-- (reconcile with `flask reconcile-eats-counts`)
+CREATE TABLE dbs.recipe_daily_eats (
+    day DATE NOT NULL,                      -- DATE(eats.created_at)
+    recipe_id INT NOT NULL,                 -- Reference to the recipe
+    count INT NOT NULL DEFAULT 0,           -- Times the recipe was eaten that day
+    PRIMARY KEY (day, recipe_id),
+    FOREIGN KEY (recipe_id) REFERENCES dbs.recipe(recipe_id) ON DELETE CASCADE
+);
+
+
+-- Rating (User-Recipe) Relationship: the current rating of each user and recipe
+-- (existing databases: migrations/001_rating_history.sql)
 CREATE TABLE dbs.rating (
+    user_id INT NOT NULL,                   -- Reference to the user
+    recipe_id INT NOT NULL,                 -- Reference to the recipe
+    rating TINYINT UNSIGNED CHECK (rating BETWEEN 1 AND 5), -- Rating value (1-5)
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- When the current rating was given
+    PRIMARY KEY (user_id, recipe_id),
+    FOREIGN KEY (user_id) REFERENCES dbs.user(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (recipe_id) REFERENCES dbs.recipe(recipe_id) ON DELETE CASCADE
+);
+
+-- Every rating ever given, appended by POST /api/rating/rate (never updated)
+CREATE TABLE dbs.rating_history (
+    rating_history_id BIGINT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,                   -- Reference to the user
     recipe_id INT NOT NULL,                 -- Reference to the recipe
     rating TINYINT UNSIGNED CHECK (rating BETWEEN 1 AND 5), -- Rating value (1-5)
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    PRIMARY KEY (user_id, recipe_id, created_at),
+    INDEX idx_rating_history_user_recipe (user_id, recipe_id, created_at),
     FOREIGN KEY (user_id) REFERENCES dbs.user(user_id) ON DELETE CASCADE,
     FOREIGN KEY (recipe_id) REFERENCES dbs.recipe(recipe_id) ON DELETE CASCADE
 );
 
+-- Rating totals per recipe, one row for every recipe (created with the recipe),
+-- kept up to date by POST /api/rating/rate (rebuild with `flask backfill-rating-stats`)
+CREATE TABLE dbs.recipe_rating_stats (
+    recipe_id INT PRIMARY KEY,              -- Reference to the recipe
+    rating_sum INT UNSIGNED NOT NULL DEFAULT 0,   -- Sum of the recipe's ratings
+    rating_count INT UNSIGNED NOT NULL DEFAULT 0, -- Number of ratings
+    avg_rating DECIMAL(6, 4) AS (IF(rating_count > 0, rating_sum / rating_count, 0)) STORED NOT NULL, -- Average rating (0 until rated)
+    FOREIGN KEY (recipe_id) REFERENCES dbs.recipe(recipe_id) ON DELETE CASCADE
+);
+CREATE INDEX idx_recipe_rating_stats_avg ON dbs.recipe_rating_stats (avg_rating DESC, recipe_id);
+
+-- Rating totals per recipe and day, kept up to date by POST /api/rating/rate
+-- (rebuild with `flask backfill-rating-stats`)
+CREATE TABLE dbs.recipe_rating_daily (
+    day DATE NOT NULL,                      -- DATE(rating.created_at)
+    recipe_id INT NOT NULL,                 -- Reference to the recipe
+    rating_sum INT UNSIGNED NOT NULL DEFAULT 0,   -- Sum of the day's ratings
+    rating_count INT UNSIGNED NOT NULL DEFAULT 0, -- Number of the day's ratings
+    PRIMARY KEY (day, recipe_id),
+    FOREIGN KEY (recipe_id) REFERENCES dbs.recipe(recipe_id) ON DELETE CASCADE
+);
+
 
 -- Contains (Recipe-Nutrition) Relationship
 CREATE TABLE dbs.contains (
@@ -115,3 +221,19 @@ CREATE TABLE dbs.fits (
     FOREIGN KEY (recipe_id) REFERENCES dbs.recipe(recipe_id) ON DELETE CASCADE,
     FOREIGN KEY (diet_id) REFERENCES dbs.diet(diet_id) ON DELETE CASCADE
 );
+
+-- Eats of a recipe outside one of the user's diets, recorded by POST /api/eats/eats
+-- against the diets and fits at the time of the eat
+-- (backfill with `flask backfill-diet-violations`)
+CREATE TABLE dbs.diet_violation (
+    user_id INT NOT NULL,                   -- Reference to the user
+    recipe_id INT NOT NULL,                 -- Reference to the recipe eaten
+    diet_id INT NOT NULL,                   -- Reference to the diet the recipe does not fit
+    created_at TIMESTAMP NOT NULL,          -- eats.created_at of the violating eat
+    PRIMARY KEY (user_id, created_at, recipe_id, diet_id),
+    FOREIGN KEY (user_id) REFERENCES dbs.user(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (recipe_id) REFERENCES dbs.recipe(recipe_id) ON DELETE CASCADE,
+    FOREIGN KEY (diet_id) REFERENCES dbs.diet(diet_id) ON DELETE CASCADE
+);
+CREATE INDEX idx_diet_violation_created_at ON dbs.diet_violation (created_at);
+CREATE INDEX idx_diet_violation_diet_created_at ON dbs.diet_violation (diet_id, created_at);
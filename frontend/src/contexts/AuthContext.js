@@ -35,6 +35,11 @@ export const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
+    // Revoke the token server-side; the local session is cleared either way
+    const token = localStorage.getItem('token');
+    if (token) {
+      authService.logout(token).catch((error) => console.error('Logout error:', error));
+    }
     localStorage.removeItem('token');
     localStorage.removeItem('userId');
     setUser(null);
@@ -265,9 +265,15 @@ function AdminDashboard() {
                   <ToggleButton value="all">
                     All Time
                   </ToggleButton>
+                  <ToggleButton value="day">
+                    Today
+                  </ToggleButton>
                   <ToggleButton value="week">
                     Last Week
                   </ToggleButton>
+                  <ToggleButton value="month">
+                    Last Month
+                  </ToggleButton>
                 </ToggleButtonGroup>
               </Box>
               <TableContainer>
@@ -13,23 +13,12 @@ function MainPage() {
   const { user } = useAuth();
   const [isLoading, setIsLoading] = useState(true);
 
-  const fetchRecipeDetails = async (recipeId) => {
-    try {
-      const recipeData = await recipeService.getRecipeById(recipeId);
-      return recipeData;
-    } catch (error) {
-      console.error('Error fetching recipe details:', error);
-      return null;
-    }
-  };
-
   const fetchRecentRecipes = async () => {
     try {
+      // Recipes come back inline (expand=true), no per-recipe requests needed
       const response = await recipeService.getRecentRecipes(user.user_id);
       if (response.status === 'success') {
-        const recipePromises = response.data.map(fetchRecipeDetails);
-        const recipes = await Promise.all(recipePromises);
-        setRecentRecipes(recipes.filter(Boolean)); // Filter out null values
+        setRecentRecipes(response.data);
       }
     } catch (error) {
       console.error('Error fetching recent recipes:', error);
@@ -40,9 +29,7 @@ function MainPage() {
     try {
       const response = await recipeService.getRecommendations(user.user_id);
       if (response.status === 'success') {
-        const recipePromises = response.data.map(fetchRecipeDetails);
-        const recipes = await Promise.all(recipePromises);
-        setRecommendedRecipes(recipes.filter(Boolean));
+        setRecommendedRecipes(response.data);
       }
     } catch (error) {
       console.error('Error fetching recommendations:', error);
@@ -86,11 +73,15 @@ function MainPage() {
       // Get a new uneaten recipe to replace the eaten one
       const response = await recipeService.getRecommendations(user.user_id);
       if (response.status === 'success' && response.data.length > 0) {
-        const newRecipe = await recipeService.getRecipeById(response.data[0]);
-        
-        // Update recommendedRecipes by replacing the eaten recipe with the new one
+        // Update recommendedRecipes by replacing the eaten recipe with the new one.
+        // Recommendations are ranked, so the top picks are usually already on screen:
+        // take the first one that is not.
         setRecommendedRecipes(prevRecipes => {
           const updatedRecipes = prevRecipes.filter(recipe => recipe.recipe_id !== recipeId);
+          const shownIds = new Set(updatedRecipes.map(recipe => recipe.recipe_id));
+          const newRecipe = response.data.find(
+            recipe => recipe.recipe_id !== recipeId && !shownIds.has(recipe.recipe_id)
+          );
           if (newRecipe) {
             updatedRecipes.push(newRecipe);
           }
@@ -101,9 +92,7 @@ function MainPage() {
       // Refresh recent recipes to include the newly eaten recipe
       const recentResponse = await recipeService.getRecentRecipes(user.user_id);
       if (recentResponse.status === 'success') {
-        const recipePromises = recentResponse.data.map(fetchRecipeDetails);
-        const recipes = await Promise.all(recipePromises);
-        setRecentRecipes(recipes.filter(Boolean));
+        setRecentRecipes(recentResponse.data);
       }
     } catch (error) {
       console.error('Error logging eaten recipe:', error);
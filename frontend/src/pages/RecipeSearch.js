@@ -35,6 +35,7 @@ function RecipeSearch() {
   const { user } = useAuth();
   const [diets, setDiets] = useState([]);
   const [ratings, setRatings] = useState({});
+  const [facets, setFacets] = useState(null);
 
   // Fetch diets when component mounts
   useEffect(() => {
@@ -51,28 +52,34 @@ function RecipeSearch() {
     fetchDiets();
   }, []);
 
-  // Fetch rating for eaten recipes
-  const fetchRating = async (recipeId) => {
+  // Fetch the user's ratings for all eaten recipes in one request
+  const fetchRatings = async (recipeIds) => {
     try {
-      const response = await ratingService.getUserRating(recipeId);
+      const response = await ratingService.getRatingsBatch(recipeIds);
       if (response.status === 'success' && response.data) {
-        setRatings(prev => ({
-          ...prev,
-          [recipeId]: response.data.rating
-        }));
+        setRatings(prev => {
+          const next = { ...prev };
+          Object.entries(response.data).forEach(([recipeId, stats]) => {
+            if (stats.rating) {
+              next[recipeId] = stats.rating;
+            }
+          });
+          return next;
+        });
       }
     } catch (error) {
-      console.error('Error fetching rating:', error);
+      console.error('Error fetching ratings:', error);
     }
   };
 
   // Fetch ratings when recipes change
   useEffect(() => {
-    recipes.forEach(recipe => {
-      if (recipe.is_eaten) {
-        fetchRating(recipe.recipe_id);
-      }
-    });
+    const eatenIds = recipes
+      .filter(recipe => recipe.is_eaten)
+      .map(recipe => recipe.recipe_id);
+    if (user && eatenIds.length > 0) {
+      fetchRatings(eatenIds);
+    }
   }, [recipes]);
 
   const handleSearch = async () => {
@@ -82,16 +89,23 @@ function RecipeSearch() {
         Object.entries(searchParams).filter(([_, value]) => value !== '')
       );
       
-      const response = await recipeService.searchRecipes(filteredParams);
+      const response = await recipeService.searchRecipes({ ...filteredParams, facets: true });
       if (response.status === 'success' && Array.isArray(response.data)) {
         console.log('Search results:', response.data); // Debug log
         setRecipes(response.data);
+        setFacets(response.facets || null);
       }
     } catch (error) {
       console.error('Error searching recipes:', error);
     }
   };
 
+  // Append the number of matching recipes from the last search, e.g. "Vegan (12)"
+  const dietLabel = (label, diet) => {
+    const count = facets?.diet?.[diet];
+    return count === undefined ? label : `${label} (${count})`;
+  };
+
   const handleChange = (e) => {
     const { name, value } = e.target;
     setSearchParams(prev => ({
@@ -169,13 +183,13 @@ function RecipeSearch() {
                 label="Diet"
               >
                 <MenuItem value="">All</MenuItem>
-                <MenuItem value="dairy_free">Dairy Free</MenuItem>
-                <MenuItem value="egg_allergy">Egg Allergy</MenuItem>
-                <MenuItem value="gluten_free">Gluten Free</MenuItem>
-                <MenuItem value="nut_allergy">Nut Allergy</MenuItem>
-                <MenuItem value="shellfish_allergy">Shellfish Allergy</MenuItem>
-                <MenuItem value="vegan">Vegan</MenuItem>
-                <MenuItem value="vegetarian">Vegetarian</MenuItem>
+                <MenuItem value="dairy_free">{dietLabel('Dairy Free', 'dairy_free')}</MenuItem>
+                <MenuItem value="egg_allergy">{dietLabel('Egg Allergy', 'egg_allergy')}</MenuItem>
+                <MenuItem value="gluten_free">{dietLabel('Gluten Free', 'gluten_free')}</MenuItem>
+                <MenuItem value="nut_allergy">{dietLabel('Nut Allergy', 'nut_allergy')}</MenuItem>
+                <MenuItem value="shellfish_allergy">{dietLabel('Shellfish Allergy', 'shellfish_allergy')}</MenuItem>
+                <MenuItem value="vegan">{dietLabel('Vegan', 'vegan')}</MenuItem>
+                <MenuItem value="vegetarian">{dietLabel('Vegetarian', 'vegetarian')}</MenuItem>
               </Select>
             </FormControl>
           </Grid>
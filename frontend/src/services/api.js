@@ -44,13 +44,20 @@ export const authService = {
   verify: async () => {
     const response = await api.get('/auth/verify');
     return response.data;
+  },
+  logout: async (token) => {
+    // The token is passed explicitly because it is cleared from storage right away
+    const response = await api.post('/auth/logout', null, {
+      headers: { Authorization: `Bearer ${token}` }
+    });
+    return response.data;
   }
 };
 
 export const recipeService = {
   getRecommendations: async (userId) => {
     const response = await api.get('/recipes/recommendations', {
-      params: { user_id: userId }
+      params: { user_id: userId, expand: true }
     });
     return response.data;
   },
@@ -94,7 +101,7 @@ export const recipeService = {
   getRecentRecipes: async (userId) => {
     try {
       const response = await api.get('/recipes/recent', {
-        params: { user_id: userId }
+        params: { user_id: userId, expand: true }
       });
       console.log('Recent recipes response:', response.data); // Debug log
       return response.data;
@@ -169,6 +176,16 @@ export const ratingService = {
       console.error('Error getting average rating:', error);
       throw error;
     }
+  },
+  // Averages, counts and the user's own ratings for many recipes in one call
+  getRatingsBatch: async (recipeIds) => {
+    try {
+      const response = await api.post('/rating/batch', { recipe_ids: recipeIds });
+      return response.data;
+    } catch (error) {
+      console.error('Error getting ratings batch:', error);
+      throw error;
+    }
   }
 };
 
@@ -0,0 +1,53 @@
+-- Split rating into the current rating per (user, recipe) and an append-only history.
+--
+-- rating used to be keyed by (user_id, recipe_id, created_at), so every re-rate
+-- added a row and the aggregates counted old ratings too. Run this once against
+-- an existing database (new databases get both tables from create_the_db.sql),
+-- then recount the per-recipe totals:
+--
+--     flask --app app backfill-rating-stats
+
+-- 1. Keep every existing rating as history
+CREATE TABLE dbs.rating_history (
+    rating_history_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,                   -- Reference to the user
+    recipe_id INT NOT NULL,                 -- Reference to the recipe
+    rating TINYINT UNSIGNED CHECK (rating BETWEEN 1 AND 5), -- Rating value (1-5)
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_rating_history_user_recipe (user_id, recipe_id, created_at),
+    FOREIGN KEY (user_id) REFERENCES dbs.user(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (recipe_id) REFERENCES dbs.recipe(recipe_id) ON DELETE CASCADE
+);
+
+INSERT INTO dbs.rating_history (user_id, recipe_id, rating, created_at)
+SELECT user_id, recipe_id, rating, created_at
+FROM dbs.rating
+ORDER BY created_at, user_id, recipe_id;
+
+-- 2. Compact rating to the latest row per user and recipe
+CREATE TABLE dbs.rating_compact (
+    user_id INT NOT NULL,                   -- Reference to the user
+    recipe_id INT NOT NULL,                 -- Reference to the recipe
+    rating TINYINT UNSIGNED CHECK (rating BETWEEN 1 AND 5), -- Rating value (1-5)
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- When the current rating was given
+    PRIMARY KEY (user_id, recipe_id),
+    FOREIGN KEY (user_id) REFERENCES dbs.user(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (recipe_id) REFERENCES dbs.recipe(recipe_id) ON DELETE CASCADE
+);
+
+INSERT INTO dbs.rating_compact (user_id, recipe_id, rating, created_at)
+SELECT user_id, recipe_id, rating, created_at
+FROM (
+    SELECT
+        user_id,
+        recipe_id,
+        rating,
+        created_at,
+        ROW_NUMBER() OVER (PARTITION BY user_id, recipe_id ORDER BY created_at DESC) AS newest
+    FROM dbs.rating
+) ranked
+WHERE newest = 1;
+
+-- 3. Swap the tables in one step, so writers never see a missing rating table
+RENAME TABLE dbs.rating TO dbs.rating_uncompacted, dbs.rating_compact TO dbs.rating;
+DROP TABLE dbs.rating_uncompacted;
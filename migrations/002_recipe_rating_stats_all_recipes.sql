@@ -0,0 +1,15 @@
+-- Give every recipe a recipe_rating_stats row, with avg_rating 0 until rated.
+--
+-- Search sorted by rating walks idx_recipe_rating_stats_avg from the stats
+-- table alone, so a recipe without a row would never be listed. Run this once
+-- against an existing database (new databases get the column from
+-- create_the_db.sql); `flask --app app backfill-rating-stats` gives the same result.
+
+ALTER TABLE dbs.recipe_rating_stats
+    MODIFY avg_rating DECIMAL(6, 4) AS (IF(rating_count > 0, rating_sum / rating_count, 0)) STORED NOT NULL;
+
+INSERT INTO dbs.recipe_rating_stats (recipe_id)
+SELECT r.recipe_id
+FROM dbs.recipe r
+LEFT JOIN dbs.recipe_rating_stats rs ON rs.recipe_id = r.recipe_id
+WHERE rs.recipe_id IS NULL;
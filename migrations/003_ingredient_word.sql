@@ -0,0 +1,13 @@
+-- Add the unstemmed ingredient vocabulary used for prefix matching.
+--
+-- recipe_ingredient only stores stemmed tokens, and the stem of a partly typed
+-- word is not always a prefix of the full word's stem ("bakin" vs "bak"). Run
+-- this once against an existing database (new databases get the table from
+-- create_the_db.sql), then fill it:
+--
+--     flask --app app backfill-recipe-ingredients
+
+CREATE TABLE dbs.ingredient_word (
+    word VARCHAR(45) PRIMARY KEY,           -- Lowercased, unstemmed ingredient word
+    token VARCHAR(45) NOT NULL              -- The word's token in recipe_ingredient
+);
@@ -1,5 +1,11 @@
 import csv
 import json
+import os
+import sys
+
+# Share the ingredient tokenizer with the backend so ETL and API agree on tokens
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from utils.text import ingredient_tokens  # noqa: E402
 
 # Updated function to calculate the time
 def extract_ready_in_time(directions):
@@ -25,14 +31,17 @@ def extract_ready_in_time(directions):
 # File paths
 input_file = "core-data_recipe.csv"
 output_file = "recipes.csv"
+ingredients_file = "recipe_ingredient.csv"
 
 # Reading from input and writing to output file
-with open(input_file, mode="r", encoding="utf-8") as infile, open(output_file, mode="w", newline="", encoding="utf-8") as outfile:
+with open(input_file, mode="r", encoding="utf-8") as infile, open(output_file, mode="w", newline="", encoding="utf-8") as outfile, open(ingredients_file, mode="w", newline="", encoding="utf-8") as tokens_outfile:
     reader = csv.DictReader(infile)
     writer = csv.writer(outfile)
+    tokens_writer = csv.writer(tokens_outfile)
 
-    # Write header to the output file
+    # Write header to the output files
     writer.writerow(["recipe_id", "recipe_name", "total_time", "image", "directions", "ingredients"])
+    tokens_writer.writerow(["recipe_id", "token"])
 
     for row in reader:
         recipe_id = int(row["recipe_id"])
@@ -68,4 +77,9 @@ with open(input_file, mode="r", encoding="utf-8") as infile, open(output_file, m
         # Write processed data to the output file
         writer.writerow([recipe_id, recipe_name, total_time, image_url, directions_text, ingredients])
 
-print(f"CSV file '{output_file}' created successfully!")
\ No newline at end of file
+        # One row per distinct ingredient token for the recipe_ingredient table
+        for token in ingredient_tokens(ingredients):
+            tokens_writer.writerow([recipe_id, token])
+
+print(f"CSV file '{output_file}' created successfully!")
+print(f"CSV file '{ingredients_file}' created successfully!")
\ No newline at end of file